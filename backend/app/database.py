@@ -1,11 +1,150 @@
 import os
+import threading
+import time
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
 
 MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017")
-DB_NAME = "ys_hr_db"
+DB_NAME = os.getenv("MONGO_DB_NAME", "ys_hr_db")
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Tracks checked-out connections, wait-queue length and checkout latency."""
+
+    # Upper bounds (seconds) for the checkout latency histogram
+    LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Motor runs PyMongo on executor threads; a checkout starts and finishes on the same one
+        self._local = threading.local()
+        self.open_connections = 0
+        self.checked_out = 0
+        self.wait_queue = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.checkout_seconds_total = 0.0
+        self.checkout_buckets = [0] * len(self.LATENCY_BUCKETS)
+
+    def _checkout_finished(self, failed: bool):
+        started = getattr(self._local, "started", None)
+        elapsed = time.perf_counter() - started if started is not None else 0.0
+        self._local.started = None
+        with self._lock:
+            self.wait_queue = max(0, self.wait_queue - 1)
+            if failed:
+                self.checkout_failures += 1
+                return
+            self.checked_out += 1
+            self.checkouts += 1
+            self.checkout_seconds_total += elapsed
+            for i, bound in enumerate(self.LATENCY_BUCKETS):
+                if elapsed <= bound:
+                    self.checkout_buckets[i] += 1
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+        with self._lock:
+            self.wait_queue += 1
+
+    def connection_checked_out(self, event):
+        self._checkout_finished(failed=False)
+
+    def connection_check_out_failed(self, event):
+        self._checkout_finished(failed=True)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out = max(0, self.checked_out - 1)
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections = max(0, self.open_connections - 1)
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "open_connections": self.open_connections,
+                "checked_out": self.checked_out,
+                "wait_queue_length": self.wait_queue,
+                "checkouts_total": self.checkouts,
+                "checkout_failures_total": self.checkout_failures,
+                "checkout_latency_avg_ms": round(self.checkout_seconds_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "checkout_latency_seconds_sum": self.checkout_seconds_total,
+                "checkout_latency_buckets": dict(zip(self.LATENCY_BUCKETS, self.checkout_buckets)),
+            }
+
+
+class MongoConnectionManager:
+    """
+    Owns the single Motor client per worker. Both access styles share it:
+    `request.app.database` (set at startup) and `Depends(get_database)`.
+    """
+
+    def __init__(self, url: str = MONGO_URL, db_name: str = DB_NAME):
+        self.url = url
+        self.db_name = db_name
+        self.max_pool_size = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+        self.min_pool_size = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+        self.wait_queue_timeout_ms = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "10000"))
+        self.pool_listener = PoolMetricsListener()
+        self.event_listeners = [self.pool_listener]
+        self.client = None
+        self.db = None
+
+    def add_listener(self, listener):
+        """Register a PyMongo monitoring listener; must happen before connect()."""
+        self.event_listeners.append(listener)
+
+    def connect(self):
+        if self.client is None:
+            self.client = AsyncIOMotorClient(
+                self.url,
+                serverSelectionTimeoutMS=5000,
+                maxPoolSize=self.max_pool_size,
+                minPoolSize=self.min_pool_size,
+                waitQueueTimeoutMS=self.wait_queue_timeout_ms,
+                event_listeners=self.event_listeners,
+            )
+            self.db = self.client[self.db_name]
+        return self.db
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+            self.db = None
+
+    def pool_stats(self) -> dict:
+        return {
+            "max_pool_size": self.max_pool_size,
+            "min_pool_size": self.min_pool_size,
+            "wait_queue_timeout_ms": self.wait_queue_timeout_ms,
+            **self.pool_listener.snapshot(),
+        }
+
+
+db_manager = MongoConnectionManager()
 
-client = AsyncIOMotorClient(MONGO_URL)
-db = client[DB_NAME]
 
 async def get_database():
-    return db
+    return db_manager.connect()
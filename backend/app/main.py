@@ -1,20 +1,27 @@
+from dotenv import load_dotenv
+load_dotenv() # Load environment variables from .env (before app modules read them)
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles  # Moved import to top
-from motor.motor_asyncio import AsyncIOMotorClient
 import socketio
 import os
+import asyncio
 from bson import ObjectId
 
 # Import Routes
 from .routes import auth
-from app.routes import employees, payroll, attendance, recruitment, finance, cms, leaves, dashboard, chat
-
-MONGO_URL = os.getenv("MONGO_URL", "mongodb://127.0.0.1:27017")
-
-
-from dotenv import load_dotenv
-load_dotenv() # Load environment variables from .env
+from app.routes import employees, payroll, attendance, recruitment, finance, cms, leaves, dashboard, chat, metrics
+from app.database import db_manager
+from app.services.password_hasher import password_hasher
+from app.services.payslips import payslip_renderer
+from app.services.attendance_events import attendance_deriver
+from app.services.on_duty import EMPLOYER_ROOM, on_duty_registry
+from app.services.payroll_jobs import payroll_job_runner
+from app.services.timesheets import timesheet_engine
+from app.services.index_registry import IndexBuildError, index_registry
+from app.services.id_resolver import count_legacy_ids
+from app.services.metrics import RequestMetricsMiddleware, command_counter
 
 app = FastAPI(title="YS HR Management System", version="1.0.0")
 
@@ -35,8 +42,13 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Timesheets-Stale"],
 )
 
+# Per-route latency and Mongo round-trip counts, exposed at /metrics
+app.add_middleware(RequestMetricsMiddleware)
+db_manager.add_listener(command_counter)
+
 # Ensure upload directory exists
 if not os.path.exists("uploads"):
     os.makedirs("uploads")
@@ -45,35 +57,70 @@ if not os.path.exists("uploads"):
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 
 # Socket.IO setup for real-time chat
+# With several workers, REDIS_URL makes every emit reach clients connected to any of them
 sio = socketio.AsyncServer(
     async_mode='asgi',
+    client_manager=socketio.AsyncRedisManager(os.environ["REDIS_URL"]) if os.getenv("REDIS_URL") else None,
     cors_allowed_origins='*',
     logger=True,
     engineio_logger=True
 )
 app.sio = sio
+# Check-in/out deltas are pushed to employer dashboards over this server
+on_duty_registry.attach(sio)
+payroll_job_runner.attach(sio)
 
 # Wrap FastAPI app with Socket.IO
 socket_app = socketio.ASGIApp(sio, app)
 
-DB_NAME = "ys_hr_db"
-
 @app.on_event("startup")
 async def startup_db_client():
-    app.mongodb_client = AsyncIOMotorClient(MONGO_URL, serverSelectionTimeoutMS=5000)
-    app.database = app.mongodb_client[DB_NAME]
+    # One pooled client per worker, shared with routers that use Depends(get_database)
+    app.database = db_manager.connect()
+    app.mongodb_client = db_manager.client
     try:
         await app.database.command("ping")
-        print(f"Successfully connected to MongoDB at {MONGO_URL}")
+        print(f"Successfully connected to MongoDB at {db_manager.url}")
+        await index_registry.ensure_indexes(app.database)
+        if os.getenv("ID_MIGRATION_CHECK_ON_STARTUP", "0") == "1":
+            app.id_migration_task = asyncio.create_task(report_legacy_ids(app.database))
+        # Folds the attendance_events punch log into day records and rollups
+        attendance_deriver.start(app.database)
+        await on_duty_registry.start()
+        await on_duty_registry.load(app.database)
+        # Picks up payroll jobs left queued or interrupted by a previous process
+        payroll_job_runner.start(app.database)
+    except IndexBuildError:
+        # Without its unique indexes the app could write duplicate records: refuse to start
+        raise
     except Exception as e:
         print(f"CRITICAL: Could not connect to MongoDB: {e}")
 
+    # Warm the bcrypt pool so the first logins don't pay for process start-up
+    password_hasher.start()
+
+async def report_legacy_ids(db):
+    """Opt-in startup check; the conversion itself only runs from migrate_ids.py (see services/id_resolver.py)"""
+    try:
+        remaining = await count_legacy_ids(db)
+        if any(remaining.values()):
+            print(f"Legacy-typed ids found {remaining}: stop the app and run migrate_ids.py")
+    except Exception as e:
+        print(f"Legacy id check failed: {e}")
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    app.mongodb_client.close()
+    await attendance_deriver.stop()
+    await on_duty_registry.stop()
+    await payroll_job_runner.stop(app.database)
+    await timesheet_engine.shutdown()
+    db_manager.close()
+    password_hasher.shutdown()
+    await payslip_renderer.shutdown()
 
 from jose import JWTError, jwt
 from app.auth_utils import SECRET_KEY, ALGORITHM
+from app.services.principal_cache import principal_cache
 from datetime import datetime
 
 # Global state for tracking online users
@@ -113,6 +160,10 @@ async def connect(sid, environ, auth=None):
                         {"_id": user["_id"]},
                         {"$set": {"is_online": True, "current_status": "online", "last_seen": datetime.utcnow().isoformat()}}
                     )
+                    principal_cache.invalidate(user["email"])
+                    if user.get("role") == "Employer":
+                        # Live on-duty updates for the dashboard
+                        await sio.enter_room(sid, EMPLOYER_ROOM)
                     
                     # Notify others
                     await sio.emit('status_update', {
@@ -146,6 +197,7 @@ async def disconnect(sid):
                     {"_id": ObjectId(user_id)},
                     {"$set": {"is_online": False, "current_status": "offline", "last_seen": datetime.utcnow().isoformat()}}
                 )
+                principal_cache.invalidate_id(user_id)
                 await sio.emit('status_update', {
                     "user_id": user_id,
                     "is_online": False,
@@ -197,6 +249,7 @@ async def update_status(sid, data):
             {"_id": ObjectId(user_id)},
             {"$set": {"current_status": new_status}}
         )
+        principal_cache.invalidate_id(user_id)
         await sio.emit('status_update', {
             "user_id": user_id,
             "is_online": new_status != 'offline',
@@ -266,6 +319,7 @@ app.include_router(cms.router, prefix="/cms", tags=["cms"])
 app.include_router(chat.router, prefix="/chat", tags=["chat"])
 
 app.include_router(dashboard.router, prefix="/dashboard", tags=["dashboard"])
+app.include_router(metrics.router, tags=["metrics"])
 
 # Register Reports Router
 from app.routes import reports
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Literal, Optional
 from datetime import datetime
 from bson import ObjectId
 
@@ -23,3 +23,12 @@ class AttendanceRecord(BaseModel):
 class AttendanceAction(BaseModel):
     employee_id: str
     timestamp: Optional[datetime] = None
+
+class Punch(BaseModel):
+    employee_id: str
+    timestamp: datetime
+    direction: Literal["in", "out"]
+    device: Optional[str] = None
+
+class PunchBatch(BaseModel):
+    punches: List[Punch] = Field(..., max_length=5000)
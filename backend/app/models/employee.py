@@ -2,6 +2,7 @@ from pydantic import BaseModel, EmailStr, Field
 from typing import Optional
 from datetime import datetime, date
 from bson import ObjectId
+from app.models.payroll import SalaryStructure
 
 class PyObjectId(ObjectId):
     @classmethod
@@ -30,6 +31,7 @@ class EmployeeBase(BaseModel):
     date_of_joining: date
     relieving_date: Optional[date] = None
     salary: float
+    salary_structure: Optional[SalaryStructure] = Field(default=None, description="Monthly components; defaults to a split of salary")
 
     class Config:
         populate_by_name = True
@@ -49,6 +51,7 @@ class EmployeeUpdate(BaseModel):
     department: Optional[str] = None
     status: Optional[str] = None
     salary: Optional[float] = None
+    salary_structure: Optional[SalaryStructure] = None
     password: Optional[str] = None
     relieving_date: Optional[date] = None
 
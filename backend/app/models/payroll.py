@@ -4,6 +4,7 @@ from datetime import datetime
 from bson import ObjectId
 
 class SalaryStructure(BaseModel):
+    # Monthly amounts
     basic_salary: float
     hra: float = 0.0
     special_allowance: float = 0.0
@@ -16,12 +17,16 @@ class PayrollRecord(BaseModel):
     id: str = Field(default_factory=str, alias="_id")
     employee_id: str
     employee_name: str
-    month: str # e.g., "November 2024"
+    month: str # month name, e.g. "November"
     year: int
     basic_salary: float
     total_allowances: float
     total_deductions: float
     net_salary: float
+    days_present: Optional[float] = None
+    leave_days: Optional[float] = None # approved, working days only
+    lop_days: Optional[float] = None
+    lop_deduction: float = 0.0
     status: str = "Processed" # Processed, Paid
     generated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -30,5 +35,6 @@ class PayrollRecord(BaseModel):
         json_encoders = {ObjectId: str}
 
 class PayrollGenerateRequest(BaseModel):
-    month: str
+    month: str # "November" or 11; stored as the month name
     year: int
+    force: bool = False # recompute employees whose inputs haven't changed too
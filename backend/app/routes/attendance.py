@@ -1,206 +1,313 @@
-from fastapi import APIRouter, Body, Request, HTTPException
-from typing import List
-from app.models.attendance import AttendanceRecord, AttendanceAction
+from fastapi import APIRouter, Body, Request, HTTPException, Query
+from typing import List, Optional
+from app.models.attendance import AttendanceRecord, AttendanceAction, PunchBatch
 from datetime import datetime, date, timezone
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+import asyncio
+import base64
+from app.services.index_registry import index_registry
+from app.services.id_resolver import id_match
+from app.services.serialization import MongoJSONResponse
+from app.services.export import export_response
+from app.services.employee_directory import employee_directory
+from app.services.attendance_events import EVENTS_COLLECTION, punch_event
+from app.services.on_duty import on_duty_registry
+from app.services.timesheets import TIMESHEET_COLLECTION, month_range, timesheet_engine, timesheets_current
+from app.services.attendance_schema import is_current, normalize_attendance, parse_punch_time
 
 router = APIRouter()
 
-@router.post("/checkin", response_description="Employee Check-in", response_model=AttendanceRecord)
-async def check_in(request: Request, payload: dict = Body(...)):
-    today = date.today().isoformat()
-    employee_id = payload.get("employee_id")
-    location = payload.get("location", "Office")
-    
-    # Check if already checked in
-    existing = await request.app.database["attendance"].find_one({
-        "employee_id": employee_id,
-        "date": today
-    })
-    
-    # If exists and already checked in (no check_out), don't allow
-    if existing and existing.get("check_out") is None:
-        raise HTTPException(status_code=400, detail="Already checked in. Please check out first.")
-    
-    # If exists and checked out, allow new check-in (for breaks/lunch)
-    if existing and existing.get("check_out") is not None:
-        # Update existing record - set new check_in and clear check_out
-        await request.app.database["attendance"].update_one(
-            {"_id": existing["_id"]},
-            {"$set": {
-                "check_in": datetime.now(timezone.utc),
-                "check_out": None
-            }}
-        )
-        updated_record = await request.app.database["attendance"].find_one({"_id": existing["_id"]})
-        updated_record["_id"] = str(updated_record["_id"])
-        return updated_record
-
-    # Fetch employee details for new record
-    emp = await request.app.database["employees"].find_one({"_id": employee_id})
-    if not emp:
-        from bson import ObjectId
-        try:
-            emp = await request.app.database["employees"].find_one({"_id": ObjectId(employee_id)})
-        except:
-            pass
+MONTH_PATTERN = r"^\d{4}-\d{2}$"
+# Page size of the attendance history once a client pages with a cursor but sends no limit
+HISTORY_PAGE_SIZE = 200
+
+# Hot query shapes: per-employee day lookups (check-in/out, today) and per-day counts (dashboard)
+# Unique: one derived record per employee per day
+index_registry.register_index("attendance", [("employee_id", 1), ("date", 1)], unique=True)
+index_registry.register_index("attendance", [("date", 1), ("status", 1)])
+index_registry.register_query("attendance", {"employee_id": "000000000000000000000000", "date": "2026-01-01"})
+index_registry.register_query("attendance", {"date": "2026-01-01", "status": "Present"})
+# Daily rollups: one document per (date, department), read by the dashboard and reports
+index_registry.register_index("attendance_daily", [("date", 1), ("department", 1)], unique=True)
+index_registry.register_query("attendance_daily", {"date": {"$in": ["2026-01-01"]}}, name="attendance_daily:dates")
+# Punch log: a punch is identified by who, when and which way, so resends are rejected as duplicates
+index_registry.register_index("attendance_events", [("employee_id", 1), ("at", 1), ("direction", 1)], unique=True)
+# The deriver's work queue: only events still waiting to be derived are in this index
+index_registry.register_index("attendance_events", [("derived", 1), ("_id", 1)], name="pending_derivation", partialFilterExpression={"derived": False})
+index_registry.register_query("attendance_events", {"derived": False}, sort=[("_id", 1)], name="attendance_events:pending")
+index_registry.register_query("attendance_events", {"employee_id": "000000000000000000000000", "date": "2026-01-01"}, sort=[("at", -1), ("direction", -1)], name="attendance_events:last-punch")
+# Check-in/out chain each punch to the one it follows; two requests racing from the same state share
+# `after`, so only one gets in. Terminal batches don't carry it and are not chained.
+index_registry.register_index("attendance_events", [("employee_id", 1), ("date", 1), ("after", 1)], name="punch_chain", unique=True, partialFilterExpression={"after": {"$exists": True}})
+# The on-duty registry's startup load: each employee's latest punch of the day
+index_registry.register_index("attendance_events", [("date", 1), ("employee_id", 1), ("at", -1), ("direction", -1)])
+# Timesheets: one document per (employee, month)
+index_registry.register_index("timesheets", [("month", 1), ("employee_id", 1)], unique=True)
+# History listing: keyset pagination on (date, _id), optionally within a department
+index_registry.register_index("attendance", [("date", -1), ("_id", -1)])
+index_registry.register_index("attendance", [("department", 1), ("date", -1), ("_id", -1)])
+index_registry.register_query("attendance", {}, sort=[("date", -1), ("_id", -1)], name="attendance:history")
+index_registry.register_query("attendance", {"department": "Engineering"}, sort=[("date", -1), ("_id", -1)], name="attendance:history-by-department")
+
+# Why a check-in or check-out is refused: the day is already in the state it would move to
+PUNCH_REJECTIONS = {
+    "in": "Already checked in. Please check out first.",
+    "out": "No check-in record found for today",
+}
 
+
+async def _record_punch(request: Request, payload: dict, direction: str) -> dict:
+    """
+    Append one punch to attendance_events (a single insert) and answer with the
+    session it opens or closes; the deriver folds it into the day record shortly
+    after. The day's last punch decides whether this one is allowed, and the
+    punch_chain index makes that check and the insert one atomic step.
+    """
+    db = request.app.database
+    emp = await employee_directory.get(db, payload.get("employee_id"))
     if not emp:
          raise HTTPException(status_code=404, detail="Employee not found")
 
-    # Create new record
-    new_record = {
-        "employee_id": str(emp["_id"]),
-        "employee_name": payload.get("employee_name") or f"{emp['first_name']} {emp['last_name']}",
-        "department": emp.get("department", "N/A"),
-        "date": today,
-        "check_in": datetime.now(timezone.utc),
-        "check_out": None,
+    event = punch_event(emp, datetime.now(timezone.utc), direction, device=payload.get("device"), location=payload.get("location"))
+    if payload.get("employee_name"):
+        event["employee_name"] = payload["employee_name"]
+
+    # Same order the punch pipeline pairs sessions in, newest first
+    last = await db[EVENTS_COLLECTION].find_one(
+        {"employee_id": emp["_id"], "date": event["date"]},
+        {"direction": 1, "at": 1},
+        sort=[("at", -1), ("direction", -1)]
+    )
+    checked_in = last is not None and last["direction"] == "in"
+    if (direction == "in" and checked_in) or (direction == "out" and not checked_in):
+        raise HTTPException(status_code=400, detail=PUNCH_REJECTIONS[direction])
+
+    event["after"] = last["_id"] if last is not None else None
+    try:
+        await db[EVENTS_COLLECTION].insert_one(event)
+    except DuplicateKeyError:
+        # Another request made this transition from the same last punch first (a double tap, two devices)
+        raise HTTPException(status_code=400, detail=PUNCH_REJECTIONS[direction])
+    await on_duty_registry.apply(event)
+
+    # The session as of this punch; work_hours is the session's, the day's total arrives with derivation
+    check_in = event["at"] if direction == "in" else parse_punch_time(last["at"])
+    return {
+        "_id": str(event["_id"]),
+        "employee_id": emp["_id"],
+        "employee_name": event["employee_name"],
+        "department": event["department"],
+        "date": event["date"],
+        "check_in": check_in,
+        "check_out": event["at"] if direction == "out" else None,
         "status": "Present",
-        "work_hours": 0.0,
+        "work_hours": round((event["at"] - check_in).total_seconds() / 3600, 2) if direction == "out" else 0.0,
         "break_time": 0,
-        "location": location
+        "location": event["location"],
     }
-    
-    result = await request.app.database["attendance"].insert_one(new_record)
-    created_record = await request.app.database["attendance"].find_one({"_id": result.inserted_id})
-    created_record["_id"] = str(created_record["_id"])
-    return created_record
+
+@router.post("/checkin", response_description="Employee Check-in", response_model=AttendanceRecord)
+async def check_in(request: Request, payload: dict = Body(...)):
+    return await _record_punch(request, payload, "in")
 
 @router.post("/checkout", response_description="Employee Check-out", response_model=AttendanceRecord)
 async def check_out(request: Request, payload: dict = Body(...)):
-    today = date.today().isoformat()
-    employee_id = payload.get("employee_id")
-    
-    # Support both string and ObjectId for employee_id lookup
-    record = await request.app.database["attendance"].find_one({
-        "employee_id": str(employee_id),
-        "date": today
-    })
-    
-    if not record:
-        from bson import ObjectId
-        try:
-            record = await request.app.database["attendance"].find_one({
-                "employee_id": ObjectId(employee_id),
-                "date": today
-            })
-        except:
-            pass
-
-    if not record:
-        raise HTTPException(status_code=400, detail="No check-in record found for today")
-        
-    check_out_time = datetime.now(timezone.utc)
-    
-    # Calculate hours - handle timezone-aware and timezone-naive datetimes
-    check_in_time = record["check_in"]
-    
-    # If check_in is timezone-naive, make it timezone-aware (assume UTC)
-    if isinstance(check_in_time, datetime):
-        if check_in_time.tzinfo is None:
-            check_in_time = check_in_time.replace(tzinfo=timezone.utc)
-    else:
-        # If it's a string, parse it
+    return await _record_punch(request, payload, "out")
+
+@router.post("/punches:batch", response_description="Append a batch of terminal punches")
+async def ingest_punches(request: Request, batch: PunchBatch = Body(...)):
+    db = request.app.database
+    punches = batch.punches
+    directory = await employee_directory.get_many(db, [p.employee_id for p in punches])
+
+    results = [None] * len(punches)
+    events, event_items = [], []
+    for index, punch in enumerate(punches):
+        employee = directory.get(punch.employee_id)
+        if employee is None:
+            results[index] = {"index": index, "status": "rejected", "detail": "Employee not found"}
+            continue
+        events.append(punch_event(employee, punch.timestamp, punch.direction, device=punch.device))
+        event_items.append(index)
+
+    errors = {}
+    if events:
         try:
-            check_in_time = datetime.fromisoformat(str(check_in_time))
-            if check_in_time.tzinfo is None:
-                check_in_time = check_in_time.replace(tzinfo=timezone.utc)
-        except:
-            raise HTTPException(status_code=400, detail="Invalid check-in time format")
-    
-    duration = check_out_time - check_in_time
-    session_hours = round(duration.total_seconds() / 3600, 2)
-    
-    # Get existing work hours and add this session
-    existing_work_hours = record.get("work_hours", 0.0)
-    total_work_hours = round(existing_work_hours + session_hours, 2)
-    
-    # If total work hours >= 8, consider it a full day and set to 9 hours
-    if total_work_hours >= 8:
-        total_work_hours = 9.0
-    
-    # Calculate break time based on work hours (1 hour break for 9 hours)
-    break_time = 60 if total_work_hours >= 9 else 30 if total_work_hours >= 4 else 0
-    
-    update_result = await request.app.database["attendance"].update_one(
-        {"_id": record["_id"]},
-        {"$set": {
-            "check_out": check_out_time,
-            "work_hours": total_work_hours,
-            "break_time": break_time
-        }}
-    )
-    
-    updated_record = await request.app.database["attendance"].find_one({"_id": record["_id"]})
-    updated_record["_id"] = str(updated_record["_id"])
-    return updated_record
+            await db[EVENTS_COLLECTION].insert_many(events, ordered=False)
+        except BulkWriteError as e:
+            errors = {error["index"]: error for error in e.details.get("writeErrors", [])}
+
+    await on_duty_registry.apply_many([event for position, event in enumerate(events) if position not in errors])
+
+    for position, index in enumerate(event_items):
+        error = errors.get(position)
+        if error is None:
+            results[index] = {"index": index, "status": "accepted"}
+        elif error.get("code") == 11000:
+            # Already in the log: resending a punch is a no-op
+            results[index] = {"index": index, "status": "duplicate"}
+        else:
+            results[index] = {"index": index, "status": "failed", "detail": error.get("errmsg")}
+
+    summary = {status: sum(1 for r in results if r["status"] == status) for status in ("accepted", "duplicate", "rejected", "failed")}
+    return {**summary, "results": results}
 
 @router.get("/today/{employee_id}", response_description="Get today's attendance for employee")
 async def get_today_attendance(request: Request, employee_id: str):
     today = date.today().isoformat()
     
     record = await request.app.database["attendance"].find_one({
-        "employee_id": employee_id,
+        "employee_id": id_match(employee_id),
         "date": today
     })
     
-    if not record:
-        from bson import ObjectId
-        try:
-            record = await request.app.database["attendance"].find_one({
-                "employee_id": ObjectId(employee_id),
-                "date": today
-            })
-        except:
-            pass
-    
     if record:
         record["_id"] = str(record["_id"])
         return record
     
     return None
 
-@router.get("/", response_description="List attendance history")
-async def list_attendance(request: Request):
+def _encode_cursor(document) -> str:
+    return base64.urlsafe_b64encode(f"{document['date']}|{document['_id']}".encode()).decode()
+
+
+def _decode_cursor(cursor: str):
+    try:
+        day, object_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return day, ObjectId(object_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("/", response_description="List attendance history (newest first, keyset paginated)", response_model=List[AttendanceRecord], response_class=MongoJSONResponse)
+async def list_attendance(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size; without limit or cursor the whole history is returned"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    date_from: Optional[str] = Query(None, description="YYYY-MM-DD, inclusive"),
+    date_to: Optional[str] = Query(None, description="YYYY-MM-DD, inclusive"),
+    employee_id: Optional[str] = None,
+    department: Optional[str] = None,
+    status: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+):
+    query = {}
+    if date_from or date_to:
+        query["date"] = {}
+        if date_from:
+            query["date"]["$gte"] = date_from
+        if date_to:
+            query["date"]["$lte"] = date_to
+    if employee_id:
+        query["employee_id"] = id_match(employee_id)
+    if department:
+        query["department"] = department
+    if status:
+        query["status"] = status
+
+    # Keyset on (date, _id): resume strictly after the last row of the previous page
+    if cursor:
+        last_date, last_id = _decode_cursor(cursor)
+        query = {"$and": [query, {"$or": [
+            {"date": {"$lt": last_date}},
+            {"date": last_date, "_id": {"$lt": last_id}},
+        ]}]}
+
+    projection = None
+    requested = None
+    if fields:
+        requested = {f.strip() for f in fields.split(",") if f.strip()}
+        # date and _id build the next cursor; schema_version picks the read path
+        projection = {f: 1 for f in requested | {"date", "_id", "schema_version"}}
+
+    found = request.app.database["attendance"].find(query, projection).sort([("date", -1), ("_id", -1)])
+    headers = {}
+    if limit is None and cursor is None:
+        # Unpaged, as before pagination existed: callers that never send a limit still get every row
+        page = await found.to_list(None)
+    else:
+        limit = limit or HISTORY_PAGE_SIZE
+        page = await found.limit(limit + 1).to_list(limit + 1)
+        if len(page) > limit:
+            page = page[:limit]
+            headers["X-Next-Cursor"] = _encode_cursor(page[-1])
+
     attendance_list = []
-    cursor = request.app.database["attendance"].find().sort("date", -1)
-    async for document in cursor:
-        # Skip records with invalid check_in format
-        if "check_in" in document:
-            check_in = document["check_in"]
-            # Skip if check_in is just a time string like "09:00"
-            if isinstance(check_in, str) and len(check_in) < 10:
-                continue
-            # Convert string to datetime if needed
-            if isinstance(check_in, str):
-                try:
-                    document["check_in"] = datetime.fromisoformat(check_in)
-                except:
-                    continue
-        
-        # Same for check_out
-        if "check_out" in document and document["check_out"]:
-            check_out = document["check_out"]
-            if isinstance(check_out, str) and len(check_out) < 10:
-                document["check_out"] = None
-            elif isinstance(check_out, str):
-                try:
-                    document["check_out"] = datetime.fromisoformat(check_out)
-                except:
-                    document["check_out"] = None
-        
-        # Add missing fields with defaults
-        if "department" not in document:
-            document["department"] = "N/A"
-        if "break_time" not in document:
-            document["break_time"] = 0
-        if "location" not in document:
-            document["location"] = "Office"
-            
-        document["_id"] = str(document["_id"])
+    for document in page:
+        # Migrated documents are already typed; only unversioned rows need repair
+        if not is_current(document):
+            for field, value in normalize_attendance(document).items():
+                if requested is None or field in requested:
+                    document[field] = value
+        if requested is not None and "schema_version" not in requested:
+            document.pop("schema_version", None)
         attendance_list.append(document)
     
-    return attendance_list
+    # A field selection returns only those fields, so defaults fill full rows only
+    return MongoJSONResponse(attendance_list, headers=headers, model=AttendanceRecord if requested is None else None)
+
+EXPORT_COLUMNS = ["_id", "employee_id", "employee_name", "department", "date", "check_in", "check_out", "status", "work_hours", "break_time", "location"]
+
+
+def _export_row(document: dict) -> dict:
+    if not is_current(document):
+        document.update(normalize_attendance(document))
+    return document
+
+
+@router.get("/export", response_description="Stream attendance as CSV or NDJSON")
+async def export_attendance(
+    request: Request,
+    format: str = Query("csv", description="csv or ndjson"),
+    month: Optional[str] = Query(None, description="YYYY-MM", pattern=MONTH_PATTERN),
+    employee_id: Optional[str] = None,
+    department: Optional[str] = None,
+):
+    query = {}
+    if month:
+        query["date"] = month_range(month)
+    if employee_id:
+        query["employee_id"] = id_match(employee_id)
+    if department:
+        query["department"] = department
+
+    cursor = request.app.database["attendance"].find(query).sort([("date", 1), ("_id", 1)])
+    return export_response(cursor, EXPORT_COLUMNS, format, f"attendance-{month or 'all'}", transform=_export_row)
+
+@router.post("/timesheet:compute", response_description="Compute and store monthly timesheets")
+async def compute_timesheets(request: Request, month: str = Query(..., description="YYYY-MM", pattern=MONTH_PATTERN), department: Optional[str] = None):
+    written = await timesheet_engine.run(request.app.database, month, department)
+    return {"month": month, "timesheets": written}
+
+@router.get("/timesheet", response_description="Monthly timesheets per employee", response_class=MongoJSONResponse)
+async def get_timesheets(
+    request: Request,
+    month: str = Query(..., description="YYYY-MM", pattern=MONTH_PATTERN),
+    employee_id: Optional[str] = None,
+    department: Optional[str] = None,
+):
+    db = request.app.database
+    query = {"month": month}
+    if employee_id:
+        query["employee_id"] = employee_id
+    if department:
+        query["department"] = department
+
+    timesheets = await db[TIMESHEET_COLLECTION].find(query, {"_id": 0}).sort("employee_id", 1).to_list(None)
+    if await timesheets_current(db, month):
+        return MongoJSONResponse(timesheets)
+
+    # Attendance derived since the last compute (or none yet): one shared recompute per month
+    refresh = timesheet_engine.refresh(db, month)
+    if timesheets:
+        # Serve what is stored rather than hold every reader for a month-wide recompute
+        return MongoJSONResponse(timesheets, headers={"X-Timesheets-Stale": "true"})
+    # Nothing stored to serve yet. Shielded: a reader disconnecting must not cancel the others' recompute
+    await asyncio.shield(refresh)
+    timesheets = await db[TIMESHEET_COLLECTION].find(query, {"_id": 0}).sort("employee_id", 1).to_list(None)
+    return MongoJSONResponse(timesheets)
+
 @router.get("/today", response_description="List today's attendance", response_model=List[AttendanceRecord])
 async def list_today_attendance(request: Request):
     today = date.today().isoformat()
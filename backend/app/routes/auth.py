@@ -1,13 +1,19 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 from ..models.user import UserCreate, UserLogin, UserResponse, UserInDB, UserUpdate, PasswordResetRequest, PasswordResetConfirm
-from ..auth_utils import get_password_hash, verify_password, create_access_token, create_reset_token, verify_reset_token, SECRET_KEY, ALGORITHM
+from ..auth_utils import create_access_token, create_reset_token, verify_reset_token, SECRET_KEY, ALGORITHM
 from ..database import get_database
+from ..services.principal_cache import principal_cache
+from ..services.password_hasher import password_hasher
+from ..services.index_registry import index_registry
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from datetime import timedelta
 from jose import JWTError, jwt
 
 router = APIRouter()
 
+index_registry.register_index("users", [("email", 1)])
+index_registry.register_query("users", {"email": "someone@example.com"})
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
 async def get_current_user(token: str = Depends(oauth2_scheme), db=Depends(get_database)):
@@ -23,9 +29,13 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db=Depends(get_d
             raise credentials_exception
     except JWTError:
         raise credentials_exception
+    user = principal_cache.get(email)
+    if user is not None:
+        return user
     user = await db["users"].find_one({"email": email})
     if user is None:
         raise credentials_exception
+    principal_cache.set(email, user)
     return user
 
 @router.post("/signup", response_model=UserResponse)
@@ -38,7 +48,7 @@ async def create_user(user: UserCreate, db=Depends(get_database)):
             detail="User with this email already exists"
         )
     
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await password_hasher.hash(user.password)
     user_in_db = UserInDB(
         **user.dict(exclude={"password"}),
         hashed_password=hashed_password
@@ -54,7 +64,7 @@ async def create_user(user: UserCreate, db=Depends(get_database)):
 @router.post("/token")
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db=Depends(get_database)):
     user = await db["users"].find_one({"email": form_data.username})
-    if not user or not verify_password(form_data.password, user["hashed_password"]):
+    if not user or not await password_hasher.verify(form_data.password, user["hashed_password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -86,6 +96,7 @@ async def update_profile(
             {"_id": current_user["_id"]},
             {"$set": update_data}
         )
+        principal_cache.invalidate(current_user["email"])
     
     updated_user = await db["users"].find_one({"_id": current_user["_id"]})
     if updated_user:
@@ -121,12 +132,13 @@ async def reset_password(request: PasswordResetConfirm, db=Depends(get_database)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
         
-    hashed_password = get_password_hash(request.new_password)
+    hashed_password = await password_hasher.hash(request.new_password)
     
     await db["users"].update_one(
         {"email": email},
         {"$set": {"hashed_password": hashed_password}}
     )
+    principal_cache.invalidate(email)
     
     return {"message": "Password updated successfully"}
 
@@ -139,6 +151,7 @@ async def request_password_reset(
         {"_id": current_user["_id"]},
         {"$set": {"password_reset_requested": True}}
     )
+    principal_cache.invalidate(current_user["email"])
     # Mocking notification to employer
     print(f"NOTIFICATION: User {current_user['email']} requested a password reset.")
     return {"message": "Reset request sent to your employer"}
@@ -153,6 +166,7 @@ async def toggle_2fa(
         {"_id": current_user["_id"]},
         {"$set": {"two_factor_enabled": new_status}}
     )
+    principal_cache.invalidate(current_user["email"])
     return {
         "message": f"2FA {'enabled' if new_status else 'disabled'} successfully",
         "two_factor_enabled": new_status
@@ -212,6 +226,15 @@ async def resolve_notification(
     
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="User not found or already resolved")
+    principal_cache.invalidate_id(user_id)
         
     return {"message": "Notification resolved successfully"}
 
+
+
+@router.get("/cache-stats")
+async def get_principal_cache_stats(current_user: dict = Depends(get_current_user)):
+    """Hit/miss counters for the principal cache, used to size PRINCIPAL_CACHE_SIZE/TTL"""
+    if current_user.get("role") != "Employer":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return principal_cache.stats()
@@ -6,9 +6,15 @@ from ..models.chat import Message, Conversation, MessageCreate, ConversationCrea
 from .auth import get_current_user
 import asyncio
 from ..services.ai_service import ai_service
+from ..services.index_registry import index_registry
 
 router = APIRouter()
 
+index_registry.register_index("messages", [("conversation_id", 1), ("deleted", 1), ("timestamp", -1)])
+index_registry.register_index("conversations", [("participants", 1), ("updated_at", -1)])
+index_registry.register_query("messages", {"conversation_id": "000000000000000000000000", "deleted": False}, sort=[("timestamp", -1)])
+index_registry.register_query("conversations", {"participants": "000000000000000000000000"}, sort=[("updated_at", -1)])
+
 
 
 # Helper for AI Response
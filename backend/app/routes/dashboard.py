@@ -6,6 +6,9 @@ router = APIRouter()
 
 from typing import Optional
 from .auth import get_current_user
+from app.services.attendance_schema import parse_punch_time
+from app.services.attendance_rollups import get_daily_totals
+from app.services.on_duty import on_duty_registry
 
 @router.get("/stats", response_description="Get Dashboard Statistics")
 async def get_dashboard_stats(
@@ -62,13 +65,11 @@ async def get_dashboard_stats(
             
             hours = 0
             if day_record and day_record.get("check_in") and day_record.get("check_out"):
-                try:
-                    fmt = "%H:%M" # Assuming HH:MM format from previous edits
-                    start = datetime.strptime(day_record["check_in"], fmt)
-                    end = datetime.strptime(day_record["check_out"], fmt)
-                    delta = end - start
-                    hours = round(delta.total_seconds() / 3600, 1)
-                except:
+                start = parse_punch_time(day_record["check_in"], day_record.get("date"))
+                end = parse_punch_time(day_record["check_out"], day_record.get("date"))
+                if start and end:
+                    hours = round((end - start).total_seconds() / 3600, 1)
+                else:
                     hours = 8 # Fallback if time parsing fails but record exists
             elif day_record and day_record.get("status") == "Present":
                 hours = 8 # High level fallback
@@ -121,27 +122,22 @@ async def get_dashboard_stats(
     if department and department != "All":
         attendance_query["employee_id"] = {"$in": employee_ids}
 
-    # Live On Duty (Actually Checked In right now)
-    live_on_duty_cursor = db["attendance"].find({
-        **attendance_query, 
-        "check_in": {"$exists": True}, 
-        "check_out": {"$exists": False}
-    })
-    live_on_duty = []
-    async for doc in live_on_duty_cursor:
-        live_on_duty.append({
-            "name": doc.get("employee_name", "Unknown"),
-            "time": doc.get("check_in"),
-            "location": doc.get("location", "N/A")
-        })
+    # Live On Duty (Actually Checked In right now), kept current by the punch handlers
+    live_on_duty = on_duty_registry.snapshot(department if department and department != "All" else None)
 
-    present_count = await db["attendance"].count_documents({**attendance_query, "status": "Present"})
+    # Present / on-leave counts for today and the 7-day trend come from the daily rollups
+    trend_days = [date.today() - timedelta(days=i) for i in range(6, -1, -1)]
+    daily_totals = await get_daily_totals(
+        db, [d.isoformat() for d in trend_days], department if department and department != "All" else None
+    )
+
+    present_count = daily_totals[today]["present"]
     # Override present count with actual live count if present_count is just status based
     if present_count == 0:
         present_count = len(live_on_duty)
     
     # Logic for absent/leave as before, but scoped to department
-    attendance_on_leave = await db["attendance"].count_documents({**attendance_query, "status": "On Leave"})
+    attendance_on_leave = daily_totals[today]["on_leave"]
     
     # Employee status "On Leave"
     employee_on_leave_query = {**emp_query, "status": "On Leave"}
@@ -327,17 +323,9 @@ async def get_dashboard_stats(
     
     # 10. Attendance Trend (Last 7 Days)
     attendance_trend = []
-    for i in range(6, -1, -1):
-        day_date = date.today() - timedelta(days=i)
+    for day_date in trend_days:
         day_label = day_date.strftime("%a")  # Mon, Tue, etc.
-        
-        # Count attendance for this day
-        day_attendance = await db["attendance"].count_documents({
-            "date": day_date.isoformat(),
-            "status": "Present"
-        })
-        
-        attendance_trend.append({"name": day_label, "value": day_attendance})
+        attendance_trend.append({"name": day_label, "value": daily_totals[day_date.isoformat()]["present"]})
     
 
     return {
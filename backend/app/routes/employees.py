@@ -2,7 +2,12 @@ from fastapi import APIRouter, Body, Request, HTTPException, status
 from fastapi.encoders import jsonable_encoder
 from typing import List
 from app.models.employee import Employee, EmployeeCreate, EmployeeUpdate
-from app.auth_utils import get_password_hash
+from app.services.principal_cache import principal_cache
+from app.services.employee_directory import employee_directory
+from app.services.password_hasher import password_hasher
+from app.services.id_resolver import id_match
+from app.services.serialization import MongoJSONResponse, model_projection
+from pymongo import ReturnDocument
 
 router = APIRouter()
 
@@ -18,7 +23,7 @@ async def create_employee(request: Request, employee: EmployeeCreate = Body(...)
         # Check if user exists
         existing_user = await request.app.database["users"].find_one({"email": employee.email})
         if not existing_user:
-            hashed_password = get_password_hash(password)
+            hashed_password = await password_hasher.hash(password)
             user_doc = {
                 "email": employee.email,
                 "full_name": f"{employee.first_name} {employee.last_name}",
@@ -40,17 +45,11 @@ async def create_employee(request: Request, employee: EmployeeCreate = Body(...)
         
     return created_employee
 
-@router.get("/", response_description="List all employees", response_model=List[Employee])
+@router.get("/", response_description="List all employees", response_model=List[Employee], response_class=MongoJSONResponse)
 async def list_employees(request: Request):
     try:
-        employees = []
-        cursor = request.app.database["employees"].find()
-        async for document in cursor:
-            # Map _id to id handling
-            if "_id" in document:
-                document["_id"] = str(document["_id"])
-            employees.append(document)
-        return employees
+        cursor = request.app.database["employees"].find({}, model_projection(Employee))
+        return MongoJSONResponse(await cursor.to_list(None), model=Employee)
     except Exception as e:
         import traceback
         with open("backend_error.log", "w") as f:
@@ -59,20 +58,10 @@ async def list_employees(request: Request):
 
 @router.get("/{id}", response_description="Get a single employee", response_model=Employee)
 async def show_employee(id: str, request: Request):
-    if (employee := await request.app.database["employees"].find_one({"_id": id})) is not None:
+    if (employee := await request.app.database["employees"].find_one({"_id": id_match(id)})) is not None:
         employee["_id"] = str(employee["_id"])
         return employee
-        
-    # Try ObjectId convert
-    from bson import ObjectId
-    try:
-        obj_id = ObjectId(id)
-        if (employee := await request.app.database["employees"].find_one({"_id": obj_id})) is not None:
-            employee["_id"] = str(employee["_id"])
-            return employee
-    except:
-        pass
-        
+
     raise HTTPException(status_code=404, detail=f"Employee {id} not found")
 
 
@@ -80,97 +69,69 @@ async def show_employee(id: str, request: Request):
 async def update_employee(id: str, request: Request, employee: EmployeeUpdate = Body(...)):
     employee_data = {k: v for k, v in employee.dict().items() if v is not None}
     
+    # We need the current employee record to get the email (primary key for user)
+    current_employee = await request.app.database["employees"].find_one({"_id": id_match(id)})
+    if not current_employee:
+        raise HTTPException(status_code=404, detail=f"Employee {id} not found")
+
     if len(employee_data) >= 1:
         # Handle User Update if relevant fields are changed
         password = employee_data.pop("password", None)
         
-        # We need the current employee record to get the email (primary key for user)
-        # Try direct string find
-        current_employee = await request.app.database["employees"].find_one({"_id": id})
-        if not current_employee:
-             from bson import ObjectId
-             try:
-                 current_employee = await request.app.database["employees"].find_one({"_id": ObjectId(id)})
-             except:
-                 pass
+        user_update_data = {}
+        if password:
+            user_update_data["hashed_password"] = await password_hasher.hash(password)
         
-        if current_employee:
-            user_update_data = {}
-            if password:
-                user_update_data["hashed_password"] = get_password_hash(password)
-            
-            # Update name if changed
-            if "first_name" in employee_data or "last_name" in employee_data:
-                fname = employee_data.get("first_name", current_employee.get("first_name"))
-                lname = employee_data.get("last_name", current_employee.get("last_name"))
-                user_update_data["full_name"] = f"{fname} {lname}"
-                
-            # Update designation if role changed
-            if "role" in employee_data:
-                user_update_data["designation"] = employee_data["role"]
+        # Update name if changed
+        if "first_name" in employee_data or "last_name" in employee_data:
+            fname = employee_data.get("first_name", current_employee.get("first_name"))
+            lname = employee_data.get("last_name", current_employee.get("last_name"))
+            user_update_data["full_name"] = f"{fname} {lname}"
             
-            # Update department if changed
-            if "department" in employee_data:
-                user_update_data["department"] = employee_data["department"]
+        # Update designation if role changed
+        if "role" in employee_data:
+            user_update_data["designation"] = employee_data["role"]
+        
+        # Update department if changed
+        if "department" in employee_data:
+            user_update_data["department"] = employee_data["department"]
+        
+        if user_update_data:
+            # Find user by email (assuming email doesn't change for now, or if it does, handle that separately)
+            # If email changes, we'd need to update the user's email too.
+            current_email = current_employee.get("email")
+            if "email" in employee_data:
+                 user_update_data["email"] = employee_data["email"]
             
-            if user_update_data:
-                # Find user by email (assuming email doesn't change for now, or if it does, handle that separately)
-                # If email changes, we'd need to update the user's email too.
-                current_email = current_employee.get("email")
-                if "email" in employee_data:
-                     user_update_data["email"] = employee_data["email"]
-                
-                await request.app.database["users"].update_one(
-                    {"email": current_email},
-                    {"$set": user_update_data}
-                )
+            await request.app.database["users"].update_one(
+                {"email": current_email},
+                {"$set": user_update_data}
+            )
+            principal_cache.invalidate(current_email)
+            principal_cache.invalidate(user_update_data.get("email"))
 
-        # Update Employee Record
-        # Try direct string find
-        update_result = await request.app.database["employees"].update_one(
-            {"_id": id}, {"$set": employee_data}
+    if employee_data:
+        # Update Employee Record (keyed by the stored _id, whatever its type)
+        current_employee = await request.app.database["employees"].find_one_and_update(
+            {"_id": current_employee["_id"]},
+            {"$set": employee_data},
+            return_document=ReturnDocument.AFTER
         )
-        
-        if update_result.matched_count == 0:
-             # Try ObjectId
-             from bson import ObjectId
-             try:
-                update_result = await request.app.database["employees"].update_one(
-                    {"_id": ObjectId(id)}, {"$set": employee_data}
-                )
-             except:
-                pass
+        if current_employee is None:
+            raise HTTPException(status_code=404, detail=f"Employee {id} not found")
+        employee_directory.invalidate(current_employee["_id"])
 
-    if (employee := await request.app.database["employees"].find_one({"_id": id})) is not None:
-        employee["_id"] = str(employee["_id"])
-        return employee
-        
-    from bson import ObjectId
-    try:
-        obj_id = ObjectId(id)
-        if (employee := await request.app.database["employees"].find_one({"_id": obj_id})) is not None:
-            employee["_id"] = str(employee["_id"])
-            return employee
-    except:
-        pass
+    current_employee["_id"] = str(current_employee["_id"])
+    return current_employee
 
-    raise HTTPException(status_code=404, detail=f"Employee {id} not found")
 @router.delete("/{id}", response_description="Delete an employee")
 async def delete_employee(id: str, request: Request):
-    # Try direct string find
-    delete_result = await request.app.database["employees"].delete_one({"_id": id})
+    deleted = await request.app.database["employees"].find_one_and_delete({"_id": id_match(id)}, {"email": 1})
     
-    if delete_result.deleted_count == 1:
+    if deleted is not None:
+        employee_directory.invalidate(deleted["_id"])
+        # As on update: the employee's login must not keep resolving from the cache
+        principal_cache.invalidate(deleted.get("email"))
         return {"message": "Employee deleted successfully"}
 
-    # Try ObjectId conversion
-    from bson import ObjectId
-    try:
-        obj_id = ObjectId(id)
-        delete_result = await request.app.database["employees"].delete_one({"_id": obj_id})
-        if delete_result.deleted_count == 1:
-            return {"message": "Employee deleted successfully"}
-    except:
-        pass
-
     raise HTTPException(status_code=404, detail=f"Employee {id} not found")
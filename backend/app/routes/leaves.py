@@ -4,6 +4,7 @@ from datetime import datetime
 from bson import ObjectId
 from app.database import get_database
 from app.routes.auth import get_current_user
+from app.services.index_registry import index_registry
 from app.models.leave import (
     LeaveRequestCreate, 
     LeaveRequestResponse, 
@@ -13,6 +14,9 @@ from app.models.leave import (
 
 router = APIRouter()
 
+index_registry.register_index("leaves", [("user_id", 1), ("status", 1)])
+index_registry.register_query("leaves", {"user_id": "000000000000000000000000", "status": "Pending"})
+
 @router.post("/", response_model=LeaveRequestResponse)
 async def create_leave_request(
     leave_in: LeaveRequestCreate,
@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from typing import Dict, Any
+from app.database import db_manager, get_database
+from app.services.id_resolver import count_legacy_ids
+from app.services.metrics import render_prometheus
+from app.services.principal_cache import principal_cache
+from app.services.password_hasher import password_hasher
+from app.services.employee_directory import employee_directory
+from app.services.attendance_events import attendance_deriver
+from app.services.on_duty import on_duty_registry
+from app.services.payslips import payslip_renderer
+
+router = APIRouter()
+
+@router.get("/metrics/pool", response_description="MongoDB connection pool metrics")
+async def get_pool_metrics() -> Dict[str, Any]:
+    return db_manager.pool_stats()
+
+@router.get("/metrics/legacy-ids", response_description="Documents still storing legacy-typed employee ids")
+async def get_legacy_id_counts(db=Depends(get_database)) -> Dict[str, int]:
+    return await count_legacy_ids(db)
+
+@router.get("/metrics", response_class=PlainTextResponse, response_description="Prometheus metrics")
+async def get_prometheus_metrics():
+    pool = db_manager.pool_stats()
+    cache = principal_cache.stats()
+    hasher = password_hasher.stats()
+    directory = employee_directory.stats()
+    deriver = attendance_deriver.stats()
+    gauges = {
+        "mongo_pool_max_size": ("Configured maxPoolSize", "gauge", pool["max_pool_size"]),
+        "mongo_pool_open_connections": ("Open pool connections", "gauge", pool["open_connections"]),
+        "mongo_pool_checked_out": ("Connections currently checked out", "gauge", pool["checked_out"]),
+        "mongo_pool_wait_queue_length": ("Operations waiting for a connection", "gauge", pool["wait_queue_length"]),
+        "mongo_pool_checkouts_total": ("Successful connection checkouts", "counter", pool["checkouts_total"]),
+        "mongo_pool_checkout_failures_total": ("Failed connection checkouts", "counter", pool["checkout_failures_total"]),
+        "mongo_pool_checkout_seconds_sum": ("Total time spent checking out connections", "counter", pool["checkout_latency_seconds_sum"]),
+        "principal_cache_size": ("Cached principals", "gauge", cache["size"]),
+        "principal_cache_hits_total": ("Principal cache hits", "counter", cache["hits"]),
+        "principal_cache_misses_total": ("Principal cache misses", "counter", cache["misses"]),
+        "employee_directory_size": ("Cached employee directory entries", "gauge", directory["size"]),
+        "employee_directory_hits_total": ("Employee directory hits", "counter", directory["hits"]),
+        "employee_directory_misses_total": ("Employee directory misses", "counter", directory["misses"]),
+        "attendance_on_duty": ("Employees checked in right now (every worker's punches when REDIS_URL is set)", "gauge", on_duty_registry.stats()["on_duty"]),
+        "attendance_deriver_leader": ("1 if this worker holds the attendance deriver lease", "gauge", int(deriver["leader"])),
+        "attendance_events_derived_total": ("Punch events folded into day records", "counter", deriver["derived"]),
+        "attendance_derive_failures_total": ("Failed punch derivation passes", "counter", deriver["failures"]),
+        "payslips_rendered_total": ("Payslip PDFs rendered by this worker", "counter", payslip_renderer.stats()["rendered"]),
+        "password_hasher_in_flight": ("bcrypt jobs queued or running", "gauge", hasher["in_flight"]),
+        "password_hasher_rejected_total": ("bcrypt jobs rejected for queue depth", "counter", hasher["rejected"]),
+    }
+    return PlainTextResponse(render_prometheus(gauges), media_type="text/plain; version=0.0.4")
@@ -1,71 +1,126 @@
-from fastapi import APIRouter, Body, Request, HTTPException
-from typing import List
+from fastapi import APIRouter, Body, Request, HTTPException, Query
+from fastapi.responses import FileResponse
+from typing import List, Optional
 from app.models.payroll import PayrollRecord, PayrollGenerateRequest
 from app.models.employee import Employee
-from datetime import datetime
+from bson import ObjectId
+from app.services.index_registry import index_registry
+from app.services.serialization import MongoJSONResponse, fill_defaults, model_projection
+from app.services.export import export_response
+from app.services.id_resolver import canonical_id, id_candidates, id_match
+from app.services.payroll_attendance import month_name, period_month
+from app.services.payroll_jobs import JOBS_COLLECTION, payroll_job_runner
+from app.services.payslips import payslip_renderer
 
 router = APIRouter()
 
-@router.post("/generate", response_description="Generate payroll for a month", response_model=List[PayrollRecord])
+index_registry.register_index("payroll", [("employee_id", 1), ("month", 1), ("year", 1)])
+index_registry.register_index("payroll", [("generated_at", -1)])
+index_registry.register_query("payroll", {"employee_id": "000000000000000000000000", "month": "January", "year": 2026})
+index_registry.register_query("payroll", {}, sort=[("generated_at", -1)], name="payroll:list")
+# Job runs walk active employees in _id order, and read a run back by period
+index_registry.register_index("employees", [("status", 1), ("_id", 1)])
+index_registry.register_index("payroll_jobs", [("month", 1), ("year", 1)], name="month_1_year_1_active", unique=True, partialFilterExpression={"active": True})
+index_registry.register_index("payroll", [("month", 1), ("year", 1), ("generated_at", -1)])
+index_registry.register_query("payroll", {"month": "January", "year": 2026}, name="payroll:period")
+# Runs sum a month's approved leave (attendance is served by its (date, status) index)
+index_registry.register_index("leaves", [("status", 1), ("start_date", 1), ("end_date", 1)])
+index_registry.register_query("leaves", {"status": "Approved", "start_date": {"$lte": "2026-01-31"}, "end_date": {"$gte": "2026-01-01"}}, name="leaves:period")
+# Re-runs read a chunk's stored fingerprints in one query
+index_registry.register_query("payroll", {"month": "January", "year": 2026, "employee_id": {"$in": ["000000000000000000000000"]}}, name="payroll:fingerprints")
+
+def _job_object_id(job_id: str) -> ObjectId:
+    if not ObjectId.is_valid(job_id):
+        raise HTTPException(status_code=404, detail=f"Payroll job {job_id} not found")
+    return ObjectId(job_id)
+
+@router.post("/generate", response_description="Queue payroll generation for a month", status_code=202)
 async def generate_payroll(request: Request, payload: PayrollGenerateRequest = Body(...)):
-    # 1. Fetch all Active Employees
-    cursor = request.app.database["employees"].find({"status": "Active"})
-    employees = await cursor.to_list(length=1000)
-    
-    generated_records = []
-    
-    for emp in employees:
-        # Simplistic Salary Calculation Logic
-        # In a real app, this would use the SalaryStructure model linked to the employee
-        annual_salary = emp.get("salary", 0)
-        monthly_gross = annual_salary / 12
-        
-        # Standard Assumptions for Demo
-        basic = monthly_gross * 0.5
-        hra = monthly_gross * 0.2
-        special = monthly_gross * 0.3
-        
-        pf = basic * 0.12
-        pt = 200 # Flat PT
-        tds = monthly_gross * 0.1 # Flat 10% TDS for demo
-        
-        total_deductions = pf + pt + tds
-        net_salary = monthly_gross - total_deductions
-        
-        record = {
-            "employee_id": str(emp["_id"]),
-            "employee_name": f"{emp['first_name']} {emp['last_name']}",
-            "month": payload.month,
-            "year": payload.year,
-            "basic_salary": round(basic, 2),
-            "total_allowances": round(hra + special, 2),
-            "total_deductions": round(total_deductions, 2),
-            "net_salary": round(net_salary, 2),
-            "status": "Processed",
-            "generated_at": datetime.utcnow()
-        }
-        
-        # Insert or Update
-        await request.app.database["payroll"].update_one(
-            {"employee_id": record["employee_id"], "month": payload.month, "year": payload.year},
-            {"$set": record},
-            upsert=True
-        )
-        
-        # Fetch the complete object to return
-        saved_record = await request.app.database["payroll"].find_one(
-            {"employee_id": record["employee_id"], "month": payload.month, "year": payload.year}
-        )
-        saved_record["_id"] = str(saved_record["_id"])
-        generated_records.append(saved_record)
+    try:
+        period_month(payload.month, payload.year)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Jobs and records store the canonical name, so "march" and "3" reuse the "March" period
+    month = month_name(payload.month)
+    # Retrying while a run for the period is in flight returns the same job
+    job = await payroll_job_runner.submit(request.app.database, month, payload.year, force=payload.force)
+    return MongoJSONResponse({"job_id": str(job["_id"]), "status": job["status"], "total": job["total"]}, status_code=202)
 
-    return generated_records
+@router.get("/jobs/{job_id}", response_description="Payroll job status", response_class=MongoJSONResponse)
+async def get_payroll_job(job_id: str, request: Request):
+    job = await request.app.database[JOBS_COLLECTION].find_one({"_id": _job_object_id(job_id)}, {"lease_until": 0, "lease_token": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Payroll job {job_id} not found")
+    return MongoJSONResponse(job)
 
-@router.get("/", response_description="List payroll history", response_model=List[PayrollRecord])
+@router.get("/jobs/{job_id}/records", response_description="Payroll records for a job's period", response_model=List[PayrollRecord], response_class=MongoJSONResponse)
+async def get_payroll_job_records(job_id: str, request: Request):
+    db = request.app.database
+    job = await db[JOBS_COLLECTION].find_one({"_id": _job_object_id(job_id)})
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Payroll job {job_id} not found")
+    # The period's records: rewritten ones carry this run's generated_at, skipped ones keep theirs
+    records = await db["payroll"].find(
+        {"month": job["month"], "year": job["year"]},
+        model_projection(PayrollRecord)
+    ).to_list(None)
+    return MongoJSONResponse(records, model=PayrollRecord)
+
+@router.get("/", response_description="List payroll history", response_model=List[PayrollRecord], response_class=MongoJSONResponse)
 async def list_payroll(request: Request):
-    payroll_list = []
-    cursor = request.app.database["payroll"].find().sort("generated_at", -1)
-    async for document in cursor:
-        document["_id"] = str(document["_id"])
-        payroll_list.append(document)
-    return payroll_list
+    cursor = request.app.database["payroll"].find({}, model_projection(PayrollRecord)).sort("generated_at", -1)
+    return MongoJSONResponse(await cursor.to_list(None), model=PayrollRecord)
+
+EXPORT_COLUMNS = ["_id", "employee_id", "employee_name", "month", "year", "basic_salary", "total_allowances", "total_deductions", "net_salary", "days_present", "leave_days", "lop_days", "lop_deduction", "status", "generated_at"]
+
+def _export_row(document: dict) -> dict:
+    # Records written before a field existed export its default, as the list endpoints do
+    return fill_defaults(document, PayrollRecord)
+
+@router.get("/export", response_description="Stream the payroll register as CSV or NDJSON")
+async def export_payroll(
+    request: Request,
+    format: str = Query("csv", description="csv or ndjson"),
+    month: Optional[str] = Query(None, description="Month name or number, as POST /payroll/generate accepts"),
+    year: Optional[int] = None,
+    employee_id: Optional[str] = None,
+    department: Optional[str] = None,
+):
+    db = request.app.database
+    query = {}
+    if month:
+        # Records store the canonical name, so "3" and "march" find the "March" period
+        try:
+            month = month_name(month)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        query["month"] = month
+    if year:
+        query["year"] = year
+    if employee_id:
+        query["employee_id"] = id_match(employee_id)
+    if department:
+        # Payroll rows don't carry a department; resolve it to employee ids first
+        members = {str(m) for m in await db["employees"].distinct("_id", {"department": department})}
+        if employee_id:
+            # Both given: just that employee, and only if they're in the department
+            query["employee_id"] = {"$in": id_candidates(employee_id) if canonical_id(employee_id) in members else []}
+        else:
+            query["employee_id"] = {"$in": list(members)}
+
+    # employee_id order walks the (employee_id, month, year) index instead of sorting in memory
+    cursor = db["payroll"].find(query, model_projection(PayrollRecord)).sort("employee_id", 1)
+    filename = "-".join(str(part) for part in ("payroll", month, year) if part)
+    return export_response(cursor, EXPORT_COLUMNS, format, filename, transform=_export_row)
+
+@router.get("/{id}/payslip", response_description="Payslip PDF for a payroll record", response_class=FileResponse)
+async def get_payslip(id: str, request: Request):
+    record = None
+    if ObjectId.is_valid(id):
+        record = await request.app.database["payroll"].find_one({"_id": ObjectId(id)})
+    if not record:
+        raise HTTPException(status_code=404, detail=f"Payroll record {id} not found")
+    # Pre-rendered after the payroll run; rendered once here if it isn't on disk yet
+    path = await payslip_renderer.ensure(request.app.database, record)
+    filename = f"payslip-{record['employee_id']}-{record['month']}-{record['year']}.pdf"
+    return FileResponse(path, media_type="application/pdf", filename=filename)
@@ -2,9 +2,14 @@ from fastapi import APIRouter, Body, Request, HTTPException
 from typing import List
 from app.models.recruitment import JobPosting, Candidate
 from datetime import datetime
+from app.services.index_registry import index_registry
+from app.services.serialization import MongoJSONResponse, model_projection
 
 router = APIRouter()
 
+index_registry.register_index("candidates", [("job_id", 1), ("applied_at", -1)])
+index_registry.register_query("candidates", {"job_id": "000000000000000000000000"}, sort=[("applied_at", -1)])
+
 # --- Job Postings ---
 
 @router.post("/jobs", response_description="Create a new job posting", response_model=JobPosting)
@@ -17,14 +22,10 @@ async def create_job(request: Request, job: JobPosting = Body(...)):
     created_job["_id"] = str(created_job["_id"])
     return created_job
 
-@router.get("/jobs", response_description="List all job postings", response_model=List[JobPosting])
+@router.get("/jobs", response_description="List all job postings", response_model=List[JobPosting], response_class=MongoJSONResponse)
 async def list_jobs(request: Request):
-    jobs = []
-    cursor = request.app.database["jobs"].find().sort("created_at", -1)
-    async for document in cursor:
-        document["_id"] = str(document["_id"])
-        jobs.append(document)
-    return jobs
+    cursor = request.app.database["jobs"].find({}, model_projection(JobPosting)).sort("created_at", -1)
+    return MongoJSONResponse(await cursor.to_list(None), model=JobPosting)
 
 # --- Candidates ---
 
@@ -38,12 +39,8 @@ async def add_candidate(request: Request, candidate: Candidate = Body(...)):
     created_candidate["_id"] = str(created_candidate["_id"])
     return created_candidate
 
-@router.get("/candidates", response_description="List candidates", response_model=List[Candidate])
+@router.get("/candidates", response_description="List candidates", response_model=List[Candidate], response_class=MongoJSONResponse)
 async def list_candidates(request: Request, job_id: str = None):
-    candidates = []
     query = {"job_id": job_id} if job_id else {}
-    cursor = request.app.database["candidates"].find(query).sort("applied_at", -1)
-    async for document in cursor:
-        document["_id"] = str(document["_id"])
-        candidates.append(document)
-    return candidates
+    cursor = request.app.database["candidates"].find(query, model_projection(Candidate)).sort("applied_at", -1)
+    return MongoJSONResponse(await cursor.to_list(None), model=Candidate)
@@ -1,6 +1,9 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from typing import Dict, Any
 from app.database import get_database
+from app.routes.auth import get_current_user
+from app.services.index_registry import index_registry
+from app.services.attendance_rollups import get_daily_totals
 from datetime import date
 
 router = APIRouter()
@@ -28,7 +31,7 @@ async def get_system_summary(db=Depends(get_database)) -> Dict[str, Any]:
     total_candidates = await db["candidates"].count_documents({})
     
     # 4. Attendance (Present Today)
-    present_today = await db["attendance"].count_documents({"date": today, "status": "Present"})
+    present_today = (await get_daily_totals(db, [today]))[today]["present"]
 
     return {
         "employees": {
@@ -48,3 +51,16 @@ async def get_system_summary(db=Depends(get_database)) -> Dict[str, Any]:
         },
         "generated_at": today
     }
+
+@router.get("/index-advisor", response_description="Explain registered query shapes and flag collection scans")
+async def get_index_advisor(db=Depends(get_database), current_user: dict = Depends(get_current_user)) -> Dict[str, Any]:
+    if current_user.get("role") != "Employer":
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    queries = await index_registry.explain_queries(db)
+    return {
+        "queries": queries,
+        "collscans": [q["query"] for q in queries if q.get("collscan")],
+        # Missing or conflicting definitions; startup never drops these, check_indexes.py --rebuild does
+        "indexes": await index_registry.index_status(db)
+    }
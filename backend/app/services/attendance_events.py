@@ -0,0 +1,207 @@
+import asyncio
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from app.services.attendance_rollups import apply_rollup_deltas, rollup_deltas
+from app.services.punches import punch_day, punch_pipeline
+from app.services.timesheets import mark_months_stale
+
+EVENTS_COLLECTION = "attendance_events"
+# The deriver's document in `checkpoints`: holds the leader lease (and, on old deployments, an _id checkpoint)
+CHECKPOINT_ID = "attendance_events"
+
+
+def punch_event(employee: dict, at: datetime, direction: str, device: Optional[str] = None, location: Optional[str] = None) -> dict:
+    """An attendance_events document: one punch, with the employee details the day record copies."""
+    if at.tzinfo is None:
+        at = at.replace(tzinfo=timezone.utc)
+    return {
+        "employee_id": employee["_id"],
+        "employee_name": employee["name"],
+        "department": employee["department"],
+        "date": punch_day(at),
+        "at": at,
+        "direction": direction,
+        "device": device,
+        "location": location or "Office",
+        "received_at": datetime.now(timezone.utc),
+        # Set once the deriver has folded the punch into its day record
+        "derived": False,
+    }
+
+
+async def backfill_derived_flags(db) -> int:
+    """
+    One-off: events logged before the `derived` flag existed were tracked by an
+    _id checkpoint. Flag everything up to it as derived and the rest as pending,
+    then drop the checkpoint.
+    """
+    checkpoints = db["checkpoints"]
+    state = await checkpoints.find_one({"_id": CHECKPOINT_ID, "last_id": {"$exists": True}})
+    if state is None:
+        return 0
+    events = db[EVENTS_COLLECTION]
+    unflagged = {"derived": {"$exists": False}}
+    await events.update_many({**unflagged, "_id": {"$lte": state["last_id"]}}, {"$set": {"derived": True}})
+    result = await events.update_many(unflagged, {"$set": {"derived": False}})
+    await checkpoints.update_one({"_id": CHECKPOINT_ID}, {"$unset": {"last_id": ""}})
+    return result.modified_count
+
+
+async def derive_pending(db, batch_size: int = 5000) -> int:
+    """
+    Fold events not yet derived into their day records: one punch-pipeline
+    upsert per (employee, day), a single bulk_write, then $inc deltas for the
+    rollups those day records moved and the stale timesheet months, and finally
+    flag the events as derived. Returns the number of events consumed.
+
+    Each event carries its own flag rather than sitting behind an _id
+    high-water mark, so an event whose _id sorts before ones already derived
+    (clock skew between workers, a slow commit) is still picked up. A crash
+    before the flags are set re-derives the batch, which is harmless: the
+    day's punch log is a set, and the re-derived records come out unchanged
+    so they add no rollup delta. A crash between the day-record write and the
+    rollup $inc loses that batch's delta; rebuild_rollups.py recounts the days.
+    """
+    events = await db[EVENTS_COLLECTION].find({"derived": False}).sort("_id", 1).limit(batch_size).to_list(batch_size)
+    if not events:
+        return 0
+
+    days = {}
+    for event in events:
+        days.setdefault((event["employee_id"], event["date"]), []).append(event)
+
+    operations = []
+    for (employee_id, day), day_events in days.items():
+        first = day_events[0]
+        employee = {"name": first["employee_name"], "department": first["department"]}
+        operations.append(UpdateOne(
+            {"employee_id": employee_id, "date": day},
+            punch_pipeline(day_events, employee, location=first.get("location") or "Office"),
+            upsert=True
+        ))
+    before = await _day_records(db, days)
+    await db["attendance"].bulk_write(operations, ordered=False)
+    await apply_rollup_deltas(db, rollup_deltas(before, await _day_records(db, days)))
+    await mark_months_stale(db, {day[:7] for _, day in days})
+
+    await db[EVENTS_COLLECTION].update_many(
+        {"_id": {"$in": [event["_id"] for event in events]}},
+        {"$set": {"derived": True}}
+    )
+    return len(events)
+
+
+async def _day_records(db, keys) -> list:
+    """The stored day records for (employee_id, date) keys, with just the fields the rollups count."""
+    query = {
+        "employee_id": {"$in": list({employee_id for employee_id, _ in keys})},
+        "date": {"$in": list({day for _, day in keys})},
+    }
+    projection = {"employee_id": 1, "date": 1, "department": 1, "status": 1, "check_in": 1, "check_out": 1, "work_hours": 1}
+    records = await db["attendance"].find(query, projection).to_list(None)
+    # The $in pair also matches other employees' records on the same days
+    return [record for record in records if (record["employee_id"], record["date"]) in keys]
+
+
+class AttendanceEventDeriver:
+    """
+    Background task that keeps attendance day records (and their rollups) derived
+    from the append-only attendance_events log. Punch handlers only insert events.
+
+    Every worker starts one, but only the holder of the lease on the checkpoint
+    document derives; the others retry the lease each interval and take over
+    when it lapses. Should a pass outlive the lease, the overlap is harmless:
+    derivation is idempotent.
+    """
+
+    def __init__(self, interval_seconds: float = 1.0, batch_size: int = 5000, lease_seconds: float = 15.0):
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.leader = False
+        self.derived = 0
+        self.failures = 0
+        self._task = None
+        self._db = None
+
+    def start(self, db):
+        if self._task is None:
+            self._db = db
+            self._task = asyncio.create_task(self._run(db))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.leader and self._db is not None:
+            # Hand over straight away instead of making the next leader wait out the lease
+            try:
+                await self._db["checkpoints"].update_one(
+                    {"_id": CHECKPOINT_ID, "owner": self.worker_id},
+                    {"$set": {"lease_until": None}}
+                )
+            except Exception as e:
+                print(f"Attendance deriver lease release failed: {e}")
+            self.leader = False
+
+    async def _acquire(self, db) -> bool:
+        """Take or renew the lease; False while another worker holds it."""
+        now = datetime.utcnow()
+        try:
+            lease = await db["checkpoints"].find_one_and_update(
+                {"_id": CHECKPOINT_ID, "$or": [{"owner": self.worker_id}, {"lease_until": None}, {"lease_until": {"$lt": now}}]},
+                {"$set": {"owner": self.worker_id, "lease_until": now + timedelta(seconds=self.lease_seconds)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # The document exists and the filter didn't match it: someone else's live lease
+            return False
+        return lease is not None
+
+    async def _run(self, db):
+        while True:
+            consumed = 0
+            try:
+                was_leader = self.leader
+                self.leader = await self._acquire(db)
+                if self.leader:
+                    if not was_leader:
+                        print(f"Attendance deriver: {self.worker_id} is now the leader")
+                        await backfill_derived_flags(db)
+                    consumed = await derive_pending(db, self.batch_size)
+                    self.derived += consumed
+            except Exception as e:
+                self.failures += 1
+                print(f"Attendance event derivation failed: {e}")
+            # A full batch means there is a backlog: keep going without sleeping
+            if consumed < self.batch_size:
+                await asyncio.sleep(self.interval_seconds)
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "leader": self.leader,
+            "derived": self.derived,
+            "failures": self.failures,
+        }
+
+
+# Singleton instance
+attendance_deriver = AttendanceEventDeriver(
+    interval_seconds=float(os.getenv("ATTENDANCE_DERIVE_INTERVAL", "1")),
+    batch_size=int(os.getenv("ATTENDANCE_DERIVE_BATCH_SIZE", "5000")),
+    lease_seconds=float(os.getenv("ATTENDANCE_DERIVE_LEASE", "15")),
+)
@@ -0,0 +1,102 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from pymongo import DeleteMany, ReplaceOne, UpdateOne
+
+ROLLUP_COLLECTION = "attendance_daily"
+ROLLUP_COUNTERS = ("present", "on_leave", "live", "total_hours")
+
+
+async def rebuild_rollups(db, dates: Iterable[str]) -> int:
+    """
+    Recompute the rollups for `dates` from the attendance records themselves.
+    rebuild_rollups.py runs this over history; the event deriver only applies
+    deltas (see rollup_deltas).
+    """
+    dates = sorted(set(dates))
+    if not dates:
+        return 0
+
+    groups = await db["attendance"].aggregate([
+        {"$match": {"date": {"$in": dates}}},
+        {"$group": {
+            "_id": {"date": "$date", "department": {"$ifNull": ["$department", "N/A"]}},
+            "present": {"$sum": {"$cond": [{"$eq": ["$status", "Present"]}, 1, 0]}},
+            "on_leave": {"$sum": {"$cond": [{"$eq": ["$status", "On Leave"]}, 1, 0]}},
+            "live": {"$sum": {"$cond": [
+                {"$and": [{"$ne": [{"$ifNull": ["$check_in", None]}, None]}, {"$eq": [{"$ifNull": ["$check_out", None]}, None]}]}, 1, 0
+            ]}},
+            "total_hours": {"$sum": {"$ifNull": ["$work_hours", 0]}},
+        }}
+    ]).to_list(None)
+
+    now = datetime.utcnow()
+    # Drop rollups for departments that no longer have records on those days
+    stale = {"date": {"$in": dates}}
+    if groups:
+        stale["$nor"] = [{"date": g["_id"]["date"], "department": g["_id"]["department"]} for g in groups]
+    operations = [DeleteMany(stale)]
+    for group in groups:
+        key = {"date": group["_id"]["date"], "department": group["_id"]["department"]}
+        counters = {name: group[name] for name in ROLLUP_COUNTERS}
+        operations.append(ReplaceOne(key, {**key, **counters, "updated_at": now}, upsert=True))
+
+    await db[ROLLUP_COLLECTION].bulk_write(operations, ordered=False)
+    return len(groups)
+
+
+def rollup_counts(record: dict) -> Tuple[Tuple[str, str], dict]:
+    """The (date, department) a day record belongs to and what it adds to that rollup."""
+    department = record.get("department")
+    key = (record["date"], "N/A" if department is None else department)
+    return key, {
+        "present": 1 if record.get("status") == "Present" else 0,
+        "on_leave": 1 if record.get("status") == "On Leave" else 0,
+        "live": 1 if record.get("check_in") is not None and record.get("check_out") is None else 0,
+        "total_hours": record.get("work_hours") or 0,
+    }
+
+
+def rollup_deltas(before: Iterable[dict], after: Iterable[dict]) -> Dict[Tuple[str, str], dict]:
+    """
+    Counter changes per (date, department) when the day records `before` are
+    replaced by `after` (a record missing from `before` is new). Rollups that
+    come out unchanged are left out.
+    """
+    deltas = {}
+    for records, sign in ((before, -1), (after, 1)):
+        for record in records:
+            key, counts = rollup_counts(record)
+            delta = deltas.setdefault(key, {name: 0 for name in ROLLUP_COUNTERS})
+            for name in ROLLUP_COUNTERS:
+                delta[name] += sign * counts[name]
+    for delta in deltas.values():
+        # Hours are stored to two places; drop the float noise of adding and subtracting them
+        delta["total_hours"] = round(delta["total_hours"], 2)
+    return {key: delta for key, delta in deltas.items() if any(delta.values())}
+
+
+async def apply_rollup_deltas(db, deltas: Dict[Tuple[str, str], dict]) -> int:
+    """$inc each rollup by its delta in one bulk_write, creating rollups for new (date, department) pairs."""
+    if not deltas:
+        return 0
+    now = datetime.utcnow()
+    operations: List[UpdateOne] = [
+        UpdateOne({"date": day, "department": department}, {"$inc": delta, "$set": {"updated_at": now}}, upsert=True)
+        for (day, department), delta in deltas.items()
+    ]
+    await db[ROLLUP_COLLECTION].bulk_write(operations, ordered=False)
+    return len(operations)
+
+
+async def get_daily_totals(db, dates: Iterable[str], department: Optional[str] = None) -> Dict[str, dict]:
+    """Counters per date (summed over departments unless one is given); missing days are zero."""
+    dates = list(dates)
+    query = {"date": {"$in": dates}}
+    if department:
+        query["department"] = department
+
+    totals = {day: {name: 0 for name in ROLLUP_COUNTERS} for day in dates}
+    async for rollup in db[ROLLUP_COLLECTION].find(query):
+        for name in ROLLUP_COUNTERS:
+            totals[rollup["date"]][name] += rollup.get(name, 0)
+    return totals
@@ -0,0 +1,143 @@
+from datetime import datetime, timezone
+from typing import Optional
+from pymongo import DeleteOne, UpdateOne
+
+# Bump when the stored attendance shape changes; readers trust documents stamped with it
+ATTENDANCE_SCHEMA_VERSION = 1
+MIGRATION_ID = f"attendance_schema_v{ATTENDANCE_SCHEMA_VERSION}"
+
+# Optional fields older rows may lack, with the value readers used to fill in
+FIELD_DEFAULTS = {
+    "department": "N/A",
+    "break_time": 0,
+    "location": "Office",
+    "work_hours": 0.0,
+}
+
+
+def parse_punch_time(value, day: Optional[str] = None) -> Optional[datetime]:
+    """
+    Coerce a stored check_in/check_out to an aware UTC datetime. Handles datetimes
+    (naive ones are UTC), ISO strings, and legacy "HH:MM" strings (combined with `day`).
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if not isinstance(value, str):
+        return None
+    try:
+        if len(value) < 10:
+            if not day:
+                return None
+            parsed = datetime.strptime(f"{day} {value}", "%Y-%m-%d %H:%M")
+        else:
+            parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def normalize_attendance(document: dict) -> dict:
+    """The typed fields (plus version stamp) a legacy attendance document should store."""
+    day = document.get("date")
+    normalized = {
+        "check_in": parse_punch_time(document.get("check_in"), day),
+        "check_out": parse_punch_time(document.get("check_out"), day),
+        "schema_version": ATTENDANCE_SCHEMA_VERSION,
+    }
+    if document.get("employee_id") is not None:
+        normalized["employee_id"] = str(document["employee_id"])
+    for field, default in FIELD_DEFAULTS.items():
+        value = document.get(field)
+        normalized[field] = default if value is None else value
+    normalized["work_hours"] = float(normalized["work_hours"])
+    normalized["break_time"] = int(normalized["break_time"])
+    # A row without a status was present if it has a check-in, as the punch handlers record it
+    status = document.get("status")
+    if status is None:
+        status = "Present" if normalized["check_in"] is not None else "Absent"
+    normalized["status"] = status
+    return normalized
+
+
+def is_current(document: dict) -> bool:
+    return document.get("schema_version") == ATTENDANCE_SCHEMA_VERSION
+
+
+async def migrate_attendance(db, batch_size: int = 1000, restart: bool = False, log=print) -> int:
+    """
+    Rewrite every unversioned attendance document to the typed schema, in _id
+    order. Progress is checkpointed in `migrations` so an interrupted run resumes.
+    """
+    checkpoints = db["migrations"]
+    if restart:
+        await checkpoints.delete_one({"_id": MIGRATION_ID})
+    state = await checkpoints.find_one({"_id": MIGRATION_ID}) or {}
+    last_id = state.get("last_id")
+    migrated = state.get("migrated", 0)
+    if last_id is not None:
+        log(f"Resuming {MIGRATION_ID} after {last_id} ({migrated} migrated so far)")
+
+    while True:
+        query = {"schema_version": {"$ne": ATTENDANCE_SCHEMA_VERSION}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await db["attendance"].find(query).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+
+        operations = [
+            UpdateOne(
+                # Skip rows a live writer stamped since we read them
+                {"_id": doc["_id"], "schema_version": {"$ne": ATTENDANCE_SCHEMA_VERSION}},
+                {"$set": normalize_attendance(doc)}
+            )
+            for doc in batch
+        ]
+        result = await db["attendance"].bulk_write(operations, ordered=False)
+        migrated += result.modified_count
+        last_id = batch[-1]["_id"]
+
+        await checkpoints.update_one(
+            {"_id": MIGRATION_ID},
+            {"$set": {"last_id": last_id, "migrated": migrated, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+        log(f"{MIGRATION_ID}: {migrated} documents migrated (last _id {last_id})")
+
+    await checkpoints.update_one(
+        {"_id": MIGRATION_ID},
+        {"$set": {"completed_at": datetime.utcnow()}},
+        upsert=True
+    )
+    return migrated
+
+
+async def dedupe_attendance_days(db, log=print) -> int:
+    """
+    Collapse duplicate (employee_id, date) records left by racing check-ins so the
+    unique index can be built. The record with the most work hours is kept, and
+    the day's punch events are queued for derivation again so it regains every punch.
+    """
+    duplicates = db["attendance"].aggregate([
+        {"$group": {
+            "_id": {"employee_id": "$employee_id", "date": "$date"},
+            "records": {"$push": {"_id": "$_id", "work_hours": "$work_hours"}},
+            "count": {"$sum": 1}
+        }},
+        {"$match": {"count": {"$gt": 1}}}
+    ], allowDiskUse=True)
+
+    operations, days = [], []
+    async for group in duplicates:
+        records = sorted(group["records"], key=lambda r: float(r.get("work_hours") or 0), reverse=True)
+        operations.extend(DeleteOne({"_id": r["_id"]}) for r in records[1:])
+        days.append(group["_id"])
+
+    if not operations:
+        return 0
+    result = await db["attendance"].bulk_write(operations, ordered=False)
+    log(f"Removed {result.deleted_count} duplicate attendance records")
+    await db["attendance_events"].update_many({"$or": days}, {"$set": {"derived": False}})
+    return result.deleted_count
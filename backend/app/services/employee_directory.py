@@ -0,0 +1,108 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+from app.services.id_resolver import canonical_id, id_candidates, id_match
+
+# The only employee fields an attendance record denormalises
+DIRECTORY_PROJECTION = {"first_name": 1, "last_name": 1, "department": 1}
+
+
+class EmployeeDirectory:
+    """
+    In-process TTL + LRU cache of the employee details punches copy onto
+    attendance records (canonical id, name, department), keyed by canonical id
+    whatever form the client sent it in. Keeps the employees lookup off the
+    check-in hot path.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 300.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # employee id -> (expires_at, entry)
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def _store(self, key: str, employee: dict) -> dict:
+        entry = {
+            "_id": str(employee["_id"]),
+            "name": f"{employee.get('first_name', '')} {employee.get('last_name', '')}".strip(),
+            "department": employee.get("department") or "N/A",
+        }
+        if self.max_size > 0:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return entry
+
+    async def get(self, db, employee_id) -> Optional[dict]:
+        """{"_id", "name", "department"} for an employee, or None if it doesn't exist."""
+        key = canonical_id(employee_id)
+        entry = self._cached(key)
+        if entry is not None:
+            return entry
+
+        employee = await db["employees"].find_one({"_id": id_match(employee_id)}, DIRECTORY_PROJECTION)
+        if employee is None:
+            # Misses aren't cached: a new hire must be able to punch straight away
+            return None
+        return self._store(key, employee)
+
+    async def get_many(self, db, employee_ids) -> Dict[str, dict]:
+        """
+        Entries for several employees keyed by the ids as given, fetching every
+        uncached one in a single query.
+        """
+        keys = {employee_id: canonical_id(employee_id) for employee_id in employee_ids}
+        entries, missing = {}, []
+        for key in set(keys.values()):
+            entry = self._cached(key)
+            if entry is not None:
+                entries[key] = entry
+            else:
+                missing.append(key)
+
+        if missing:
+            candidates = [c for key in missing for c in id_candidates(key)]
+            async for employee in db["employees"].find({"_id": {"$in": candidates}}, DIRECTORY_PROJECTION):
+                key = canonical_id(employee["_id"])
+                entries[key] = self._store(key, employee)
+        return {employee_id: entries[key] for employee_id, key in keys.items() if key in entries}
+
+    def invalidate(self, employee_id):
+        employee_id = canonical_id(employee_id)
+        self._entries.pop(employee_id, None)
+        for key, (_, entry) in list(self._entries.items()):
+            if entry["_id"] == employee_id:
+                del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Singleton instance
+employee_directory = EmployeeDirectory(
+    max_size=int(os.getenv("EMPLOYEE_DIRECTORY_SIZE", "10000")),
+    ttl_seconds=float(os.getenv("EMPLOYEE_DIRECTORY_TTL", "300")),
+)
@@ -0,0 +1,79 @@
+import csv
+import io
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, List, Optional
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from app.services.serialization import dump_json
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+# Documents fetched per getMore; bounds memory no matter how large the range is
+EXPORT_BATCH_SIZE = 1000
+# Rows are coalesced into chunks of roughly this size before being sent
+CHUNK_BYTES = 64 * 1024
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        # Stored datetimes are naive UTC; say so, as the JSON responses do
+        return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).isoformat()
+    if isinstance(value, (int, float, str)):
+        return value
+    return str(value)
+
+
+async def _csv_lines(cursor, columns: List[str], transform: Optional[Callable]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush() -> str:
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return line
+
+    writer.writerow(columns)
+    # Send the header straight away so the download starts before the first batch
+    yield flush()
+    async for document in cursor:
+        if transform:
+            document = transform(document)
+        writer.writerow([_cell(document.get(column)) for column in columns])
+        if buffer.tell() >= CHUNK_BYTES:
+            yield flush()
+    yield flush()
+
+
+async def _ndjson_lines(cursor, columns: List[str], transform: Optional[Callable]) -> AsyncIterator[bytes]:
+    chunk = bytearray()
+    async for document in cursor:
+        if transform:
+            document = transform(document)
+        chunk += dump_json({column: document.get(column) for column in columns}) + b"\n"
+        if len(chunk) >= CHUNK_BYTES:
+            yield bytes(chunk)
+            chunk.clear()
+    if chunk:
+        yield bytes(chunk)
+
+
+def export_response(cursor, columns: List[str], format: str, filename: str, transform: Optional[Callable] = None) -> StreamingResponse:
+    """
+    Stream `cursor` as CSV or NDJSON, one row per document as it arrives from
+    Mongo. `transform` may adjust each document before its `columns` are written.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format '{format}'")
+    cursor = cursor.batch_size(EXPORT_BATCH_SIZE)
+    rows = _csv_lines(cursor, columns, transform) if format == "csv" else _ndjson_lines(cursor, columns, transform)
+    return StreamingResponse(
+        rows,
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'},
+    )
@@ -0,0 +1,99 @@
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+# (collection, field, canonical BSON type, legacy BSON type)
+# Employees are keyed by ObjectId; everything that references an employee stores the hex string.
+ID_FIELDS = [
+    ("employees", "_id", "objectId", "string"),
+    ("attendance", "employee_id", "string", "objectId"),
+    ("payroll", "employee_id", "string", "objectId"),
+]
+
+# Only hex strings can become ObjectIds; any other string _id is left alone (and not counted)
+OBJECT_ID_PATTERN = "^[0-9a-fA-F]{24}$"
+
+
+def legacy_id_filter(field: str, legacy_type: str) -> dict:
+    """Documents whose `field` still holds a legacy-typed id the migration can convert."""
+    if legacy_type == "string":
+        return {field: {"$type": "string", "$regex": OBJECT_ID_PATTERN}}
+    return {field: {"$type": legacy_type}}
+
+
+def canonical_id(value) -> str:
+    """The hex string a reference stores for an id, whether it arrived as an ObjectId or in either case."""
+    if isinstance(value, ObjectId):
+        return str(value)
+    value = str(value)
+    return str(ObjectId(value)) if ObjectId.is_valid(value) else value
+
+
+def id_candidates(value) -> list:
+    """Every stored representation an id may have: the hex string and/or the ObjectId."""
+    if isinstance(value, ObjectId):
+        return [value, str(value)]
+    value = str(value)
+    if ObjectId.is_valid(value):
+        return [value, ObjectId(value)]
+    return [value]
+
+
+def id_match(value):
+    """Query value that matches an id stored either as a string or as an ObjectId, in one round trip."""
+    candidates = id_candidates(value)
+    if len(candidates) == 1:
+        return candidates[0]
+    return {"$in": candidates}
+
+
+async def count_legacy_ids(db) -> dict:
+    """How many documents per collection still store a legacy-typed id the migration would convert."""
+    counts = {}
+    for collection, field, _, legacy_type in ID_FIELDS:
+        counts[f"{collection}.{field}"] = await db[collection].count_documents(legacy_id_filter(field, legacy_type))
+    return counts
+
+
+async def migrate_legacy_ids(db, batch_size: int = 500) -> dict:
+    """
+    Rewrite legacy-typed ids to their canonical type. Safe to re-run: each pass
+    only touches documents still matching the legacy type. Run it from
+    migrate_ids.py with the app stopped: employees._id is rewritten by
+    insert-then-delete, which isn't atomic. A run interrupted between the two
+    leaves both copies; the next run finds the ObjectId copy and only deletes
+    the string one.
+    """
+    migrated = {}
+
+    # Reference fields: converted server-side, no documents cross the wire
+    for collection, field, canonical_type, legacy_type in ID_FIELDS:
+        if field == "_id":
+            continue
+        converter = "$toString" if canonical_type == "string" else "$toObjectId"
+        result = await db[collection].update_many(
+            legacy_id_filter(field, legacy_type),
+            [{"$set": {field: {converter: f"${field}"}}}]
+        )
+        migrated[f"{collection}.{field}"] = result.modified_count
+
+    # employees._id can't be updated in place: re-insert under the ObjectId, then drop the string copy
+    converted = 0
+    while True:
+        batch = await db["employees"].find(legacy_id_filter("_id", "string")).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+        for doc in batch:
+            legacy_id = doc["_id"]
+            doc["_id"] = ObjectId(legacy_id)
+            try:
+                await db["employees"].insert_one(doc)
+            except DuplicateKeyError:
+                # Only a clash on _id means the ObjectId copy exists; any other unique index must not cost the employee
+                if await db["employees"].count_documents({"_id": doc["_id"]}, limit=1) == 0:
+                    raise
+                print(f"ID migration: employees {legacy_id} exists under both types, keeping the ObjectId copy")
+            await db["employees"].delete_one({"_id": legacy_id})
+            converted += 1
+    migrated["employees._id"] = converted
+
+    return migrated
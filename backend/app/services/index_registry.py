@@ -0,0 +1,199 @@
+from typing import List, Optional, Tuple
+from pymongo import IndexModel
+from pymongo.errors import OperationFailure
+
+# IndexOptionsConflict / IndexKeySpecsConflict: same name or keys, different definition
+INDEX_CONFLICT_CODES = (85, 86)
+# Index options whose difference makes an existing index a conflict
+COMPARED_OPTIONS = ("unique", "sparse", "partialFilterExpression", "expireAfterSeconds")
+
+
+def _keys(keys) -> List[Tuple[str, int]]:
+    return [(field, int(direction) if isinstance(direction, (int, float)) else direction) for field, direction in keys]
+
+
+class IndexBuildError(RuntimeError):
+    """A unique index couldn't be put in place, so the constraint it enforces doesn't hold."""
+
+
+class IndexSpec:
+    def __init__(self, collection: str, keys: List[Tuple[str, int]], name: Optional[str] = None, **options):
+        self.collection = collection
+        self.keys = keys
+        self.name = name or "_".join(f"{field}_{direction}" for field, direction in keys)
+        self.options = options
+
+    def model(self) -> IndexModel:
+        return IndexModel(self.keys, name=self.name, **self.options)
+
+
+class QueryShape:
+    def __init__(self, collection: str, filter: dict, sort: Optional[List[Tuple[str, int]]] = None, name: Optional[str] = None):
+        self.collection = collection
+        self.filter = filter
+        self.sort = sort
+        self.name = name or f"{collection}:{','.join(filter.keys()) or '*'}"
+
+
+class IndexRegistry:
+    """
+    Declarative list of the indexes (and the hot query shapes they serve) that
+    router modules contribute at import time. Applied idempotently on startup.
+    """
+
+    def __init__(self):
+        self.indexes = {}  # (collection, name) -> IndexSpec
+        self.queries = []
+        self.failures = []  # from the last ensure_indexes()
+
+    def register_index(self, collection: str, keys: List[Tuple[str, int]], name: Optional[str] = None, **options) -> IndexSpec:
+        spec = IndexSpec(collection, keys, name=name, **options)
+        self.indexes[(collection, spec.name)] = spec
+        return spec
+
+    def register_query(self, collection: str, filter: dict, sort: Optional[List[Tuple[str, int]]] = None, name: Optional[str] = None) -> QueryShape:
+        shape = QueryShape(collection, filter, sort=sort, name=name)
+        self.queries.append(shape)
+        return shape
+
+    async def ensure_indexes(self, db) -> List[dict]:
+        """
+        Create every registered index; existing identical indexes are a no-op.
+        An existing index with a different definition is left alone and
+        reported: rebuilding means dropping a live index, which only
+        rebuild_indexes() (check_indexes.py --rebuild) does. Returns the failures,
+        and raises IndexBuildError if any of them is a unique index.
+        """
+        failures = []
+        for spec in self.indexes.values():
+            try:
+                await db[spec.collection].create_indexes([spec.model()])
+            except OperationFailure as e:
+                conflict = e.code in INDEX_CONFLICT_CODES
+                failures.append({"collection": spec.collection, "index": spec.name, "conflict": conflict, "error": str(e)})
+                if conflict:
+                    print(f"Index {spec.collection}.{spec.name} exists with a different definition; "
+                          f"kept as is, run check_indexes.py --rebuild: {e}")
+                else:
+                    print(f"Index {spec.collection}.{spec.name} could not be created: {e}")
+        self.failures = failures
+
+        unique = [f"{f['collection']}.{f['index']}" for f in failures
+                  if self.indexes[(f["collection"], f["index"])].options.get("unique")]
+        if unique:
+            raise IndexBuildError(
+                f"Unique index(es) {', '.join(unique)} could not be created; duplicates must be removed "
+                f"first (migrate_attendance.py for attendance) and conflicts rebuilt (check_indexes.py --rebuild)"
+            )
+        return failures
+
+    async def index_status(self, db) -> List[dict]:
+        """Registered indexes that are missing or differ from what the database has, without changing anything."""
+        report = []
+        existing_by_collection = {}
+        for spec in self.indexes.values():
+            if spec.collection not in existing_by_collection:
+                existing_by_collection[spec.collection] = await db[spec.collection].index_information()
+            existing = existing_by_collection[spec.collection]
+
+            current = existing.get(spec.name)
+            if current is None:
+                same_keys = [name for name, info in existing.items() if _keys(info["key"]) == _keys(spec.keys)]
+                if same_keys:
+                    report.append({"collection": spec.collection, "index": spec.name, "state": "conflict",
+                                   "detail": f"same keys exist as {same_keys[0]}"})
+                else:
+                    report.append({"collection": spec.collection, "index": spec.name, "state": "missing"})
+                continue
+
+            differences = []
+            if _keys(current["key"]) != _keys(spec.keys):
+                differences.append("keys")
+            for option in COMPARED_OPTIONS:
+                if current.get(option) != spec.options.get(option):
+                    differences.append(option)
+            if differences:
+                report.append({"collection": spec.collection, "index": spec.name, "state": "conflict",
+                               "detail": f"differs in {', '.join(differences)}"})
+        return report
+
+    async def rebuild_indexes(self, db, names: Optional[List[str]] = None) -> List[str]:
+        """
+        Explicit migration step: drop and recreate every conflicting registered
+        index (or just `names`, as "collection.index"). Never falls back to a
+        weaker definition; a failed rebuild raises with the index left dropped,
+        so fix the data (e.g. duplicates) and run it again.
+        """
+        rebuilt = []
+        for entry in await self.index_status(db):
+            if entry["state"] != "conflict":
+                continue
+            qualified = f"{entry['collection']}.{entry['index']}"
+            if names is not None and qualified not in names:
+                continue
+            spec = self.indexes[(entry["collection"], entry["index"])]
+            collection = db[spec.collection]
+            information = await collection.index_information()
+            # A same-keys index under another name blocks the create just the same
+            for name, info in information.items():
+                if name == spec.name or (name != "_id_" and _keys(info["key"]) == _keys(spec.keys)):
+                    await collection.drop_index(name)
+            await collection.create_indexes([spec.model()])
+            rebuilt.append(qualified)
+        return rebuilt
+
+    async def explain_queries(self, db) -> List[dict]:
+        """Run explain() on every registered query shape and report its winning plan stages."""
+        report = []
+        for shape in self.queries:
+            cursor = db[shape.collection].find(shape.filter)
+            if shape.sort:
+                cursor = cursor.sort(shape.sort)
+            try:
+                plan = await cursor.explain()
+            except OperationFailure as e:
+                report.append({"query": shape.name, "collection": shape.collection, "error": str(e)})
+                continue
+
+            winning_plan = plan.get("queryPlanner", {}).get("winningPlan", {})
+            stages = _collect_stages(winning_plan)
+            report.append({
+                "query": shape.name,
+                "collection": shape.collection,
+                "filter": list(shape.filter.keys()),
+                "sort": [field for field, _ in shape.sort] if shape.sort else [],
+                "stages": stages,
+                "index": _collect_index_names(winning_plan),
+                "collscan": "COLLSCAN" in stages,
+            })
+        return report
+
+
+def _collect_stages(plan) -> List[str]:
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_collect_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(_collect_stages(item))
+    return stages
+
+
+def _collect_index_names(plan) -> List[str]:
+    names = []
+    if isinstance(plan, dict):
+        if "indexName" in plan:
+            names.append(plan["indexName"])
+        for value in plan.values():
+            names.extend(_collect_index_names(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            names.extend(_collect_index_names(item))
+    return names
+
+
+# Singleton instance
+index_registry = IndexRegistry()
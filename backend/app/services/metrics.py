@@ -0,0 +1,186 @@
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+from pymongo import monitoring
+from app.services.n_plus_one import n_plus_one_detector
+
+# Upper bounds for the per-route histograms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COMMAND_COUNT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250)
+
+
+class RequestStats:
+    """Per-request counters; Motor copies the context into its executor threads, so listeners can reach it."""
+
+    def __init__(self):
+        self.commands = 0
+        self.profile = n_plus_one_detector.start()
+        self._lock = threading.Lock()
+
+    def record_command(self, event):
+        with self._lock:
+            self.commands += 1
+        if self.profile is not None:
+            self.profile.record(event)
+
+
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.series = {}  # labels tuple -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float):
+        with self._lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self, name: str, label_names: tuple, lines: list):
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self.series.items()]
+        for labels, series in sorted(items):
+            base = _labels(label_names, labels)
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{name}_bucket{{{base},le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{{base},le="+Inf"}} {series[-1]}')
+            lines.append(f"{name}_sum{{{base}}} {series[-2]}")
+            lines.append(f"{name}_count{{{base}}} {series[-1]}")
+
+
+class Counter:
+    def __init__(self):
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple, amount: float = 1):
+        with self._lock:
+            self.series[labels] = self.series.get(labels, 0) + amount
+
+    def render(self, name: str, label_names: tuple, lines: list):
+        with self._lock:
+            items = sorted(self.series.items())
+        for labels, value in items:
+            lines.append(f"{name}{{{_labels(label_names, labels)}}} {value}")
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts Mongo commands globally and against the request that issued them."""
+
+    def __init__(self):
+        self.commands = Counter()
+        self.failures = Counter()
+
+    def started(self, event):
+        self.commands.inc((event.command_name,))
+        stats = current_request_stats.get()
+        if stats is not None:
+            stats.record_command(event)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        self.failures.inc((event.command_name,))
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.mongo_commands = Histogram(COMMAND_COUNT_BUCKETS)
+        self.requests = Counter()
+
+    def observe(self, method: str, route: str, status_code: int, seconds: float, commands: int):
+        self.latency.observe((method, route), seconds)
+        self.mongo_commands.observe((method, route), commands)
+        self.requests.inc((method, route, str(status_code)))
+
+
+class RequestMetricsMiddleware:
+    """
+    Plain ASGI middleware (not BaseHTTPMiddleware) so the handler runs in the
+    same task and context as the RequestStats it sets up.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_request_stats.reset(token)
+            # The router stores the matched route in the scope; use its template, not the raw path
+            route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+            request_metrics.observe(scope["method"], route, status_code, elapsed, stats.commands)
+            n_plus_one_detector.finish(stats.profile, f"{scope['method']} {route}")
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def render_prometheus(extra_gauges: dict) -> str:
+    """Prometheus text exposition (format 0.0.4) of every metric this worker tracks."""
+    lines = []
+
+    lines.append("# HELP http_request_duration_seconds Request latency by route template")
+    lines.append("# TYPE http_request_duration_seconds histogram")
+    request_metrics.latency.render("http_request_duration_seconds", ("method", "route"), lines)
+
+    lines.append("# HELP http_request_mongo_commands Mongo commands issued per request by route template")
+    lines.append("# TYPE http_request_mongo_commands histogram")
+    request_metrics.mongo_commands.render("http_request_mongo_commands", ("method", "route"), lines)
+
+    lines.append("# HELP http_requests_total Requests by route template and status")
+    lines.append("# TYPE http_requests_total counter")
+    request_metrics.requests.render("http_requests_total", ("method", "route", "status"), lines)
+
+    lines.append("# HELP mongo_commands_total Mongo commands started, by command name")
+    lines.append("# TYPE mongo_commands_total counter")
+    command_counter.commands.render("mongo_commands_total", ("command",), lines)
+
+    lines.append("# HELP mongo_command_failures_total Mongo commands failed, by command name")
+    lines.append("# TYPE mongo_command_failures_total counter")
+    command_counter.failures.render("mongo_command_failures_total", ("command",), lines)
+
+    for name, (help_text, metric_type, value) in extra_gauges.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        lines.append(f"{name} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+# Singleton instances
+request_metrics = RequestMetrics()
+command_counter = CommandCounter()
@@ -0,0 +1,136 @@
+import asyncio
+import os
+import threading
+import traceback
+from typing import List, Optional
+
+# Cursor housekeeping and handshakes are not query shapes
+IGNORED_COMMANDS = {"getMore", "killCursors", "endSessions", "ping", "hello", "isMaster", "ismaster", "saslStart", "saslContinue"}
+
+# Where each command keeps its predicate
+FILTER_KEYS = {"find": "filter", "count": "query", "distinct": "query", "findAndModify": "query"}
+
+
+def _shape(value):
+    """Replace literal values with placeholders so identical query structures compare equal."""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _shape(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_shape(item) for item in value)
+    return "?"
+
+
+def command_shape(event) -> Optional[tuple]:
+    name = event.command_name
+    if name in IGNORED_COMMANDS:
+        return None
+    command = event.command
+    collection = command.get(name)
+    if name in FILTER_KEYS:
+        predicate = command.get(FILTER_KEYS[name])
+    elif name in ("update", "delete"):
+        statements = command.get("updates" if name == "update" else "deletes") or [{}]
+        predicate = statements[0].get("q")
+    elif name == "aggregate":
+        predicate = [list(stage.keys()) for stage in command.get("pipeline", [])]
+    else:
+        predicate = None
+    return (name, collection, _shape(predicate))
+
+
+def _format_shape(shape: tuple) -> str:
+    name, collection, predicate = shape
+
+    def render(value):
+        if isinstance(value, tuple) and value and all(isinstance(item, tuple) and len(item) == 2 and isinstance(item[0], str) for item in value):
+            return "{" + ", ".join(f"{key}: {render(item)}" for key, item in value) + "}"
+        if isinstance(value, tuple):
+            return "[" + ", ".join(render(item) for item in value) + "]"
+        return str(value)
+
+    return f"{name} {collection} {render(predicate)}"
+
+
+def _call_site(task) -> List[str]:
+    """The handler's await chain at the time of the command (frames inside the app only)."""
+    lines = []
+    coro = task.get_coro() if task is not None else None
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        filename = frame.f_code.co_filename
+        if "site-packages" not in filename:
+            lines.append(f'  File "{filename}", line {frame.f_lineno}, in {frame.f_code.co_name}')
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return lines
+
+
+class QueryProfile:
+    """Command shapes seen within one request context."""
+
+    def __init__(self, threshold: int):
+        self.threshold = threshold
+        self.task = asyncio.current_task()
+        self.counts = {}
+        self.call_sites = {}
+        self._lock = threading.Lock()
+
+    def record(self, event):
+        shape = command_shape(event)
+        if shape is None:
+            return
+        with self._lock:
+            count = self.counts.get(shape, 0) + 1
+            self.counts[shape] = count
+        # Capture the stack once, while the offending await is still suspended
+        if count == self.threshold:
+            self.call_sites[shape] = _call_site(self.task)
+
+    def violations(self) -> List[dict]:
+        return [
+            {"shape": _format_shape(shape), "count": count, "call_site": self.call_sites.get(shape, [])}
+            for shape, count in self.counts.items()
+            if count >= self.threshold
+        ]
+
+
+class NPlusOneDetector:
+    """
+    Opt-in (N_PLUS_ONE_DETECTION=1) detector for handlers that issue the same
+    query shape once per row. Violations are printed with the route and call site
+    and kept in `violations` so the pytest fixture can fail on them.
+    """
+
+    def __init__(self, enabled: bool = False, threshold: int = 5):
+        self.enabled = enabled
+        self.threshold = threshold
+        self.violations = []
+
+    def start(self) -> Optional[QueryProfile]:
+        if not self.enabled:
+            return None
+        return QueryProfile(self.threshold)
+
+    def finish(self, profile: Optional[QueryProfile], route: str):
+        if profile is None:
+            return
+        for violation in profile.violations():
+            violation["route"] = route
+            self.violations.append(violation)
+            print(f"WARNING: N+1 query in {route}: {violation['shape']} ran {violation['count']} times")
+            if violation["call_site"]:
+                print("\n".join(violation["call_site"]))
+
+    def format_violations(self, violations: List[dict]) -> str:
+        return "\n".join(
+            f"{v['route']}: {v['shape']} x{v['count']}\n" + "\n".join(v["call_site"])
+            for v in violations
+        )
+
+
+# Singleton instance
+n_plus_one_detector = NPlusOneDetector(
+    enabled=os.getenv("N_PLUS_ONE_DETECTION", "0") == "1",
+    threshold=int(os.getenv("N_PLUS_ONE_THRESHOLD", "5")),
+)
@@ -0,0 +1,223 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+import orjson
+
+try:
+    from redis import asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+from app.services.attendance_schema import parse_punch_time
+from app.services.punches import punch_day
+
+# Socket.IO room employer clients join on connect
+EMPLOYER_ROOM = "employers"
+# Redis channel workers share check-in/out deltas on
+ON_DUTY_CHANNEL = "on_duty"
+
+# Each employee's latest punch today, from the punch log
+LAST_PUNCH_PIPELINE = [
+    {"$sort": {"employee_id": 1, "at": -1, "direction": -1}},
+    {"$group": {"_id": "$employee_id", "last": {"$first": "$$ROOT"}}},
+    {"$replaceWith": "$last"},
+]
+
+
+def _today() -> str:
+    """Today's attendance date, on the same clock punch events are dated with."""
+    return punch_day(datetime.now(timezone.utc))
+
+
+class OnDutyRegistry:
+    """
+    In-process view of who is checked in right now, rebuilt at startup from
+    today's attendance_events (plus open attendance records that predate the
+    punch log) and kept current by the punch handlers. Each change is pushed
+    to the employer room as an `on_duty_update` event so dashboards subscribe
+    once instead of polling. Only today's punches count; entries left over
+    from earlier days are dropped.
+
+    With several workers, set `redis_url`: every change is published on
+    ON_DUTY_CHANNEL and each worker folds the others' changes into its view.
+    The Socket.IO server uses the same Redis as its client manager, so the
+    update emitted by the worker that took the punch reaches every dashboard.
+    """
+
+    def __init__(self, redis_url: Optional[str] = None):
+        self.redis_url = redis_url
+        self.worker_id = uuid.uuid4().hex
+        self._entries = {}  # employee_id -> entry
+        self._last_punch = {}  # employee_id -> time of the latest punch applied
+        self._day = None
+        self._redis = None
+        self._listener = None
+        self.sio = None
+
+    def attach(self, sio):
+        self.sio = sio
+
+    async def start(self):
+        """Subscribe to the other workers' deltas (before loading, so none are missed)."""
+        if not self.redis_url or self._listener is not None:
+            return
+        if aioredis is None:
+            raise RuntimeError("REDIS_URL is set but the redis package is not installed")
+        self._redis = aioredis.from_url(self.redis_url)
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(ON_DUTY_CHANNEL)
+        self._listener = asyncio.create_task(self._listen(pubsub))
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    async def load(self, db):
+        today = _today()
+        # Cleared up front: deltas that arrive while loading are folded in alongside
+        self._day = today
+        self._entries.clear()
+        self._last_punch.clear()
+        seen = set()
+        async for event in db["attendance_events"].aggregate([{"$match": {"date": today}}, *LAST_PUNCH_PIPELINE]):
+            seen.add(event["employee_id"])
+            self._fold(event["direction"], self._entry(event))
+
+        # Days checked in before the punch log existed only have their record
+        cursor = db["attendance"].find(
+            {"date": today, "check_in": {"$ne": None}, "check_out": None},
+            {"employee_id": 1, "employee_name": 1, "department": 1, "check_in": 1, "location": 1}
+        )
+        async for doc in cursor:
+            employee_id = str(doc["employee_id"])
+            if employee_id in seen:
+                continue
+            self._fold("in", {
+                "employee_id": employee_id,
+                "name": doc.get("employee_name", "Unknown"),
+                "department": doc.get("department") or "N/A",
+                "date": today,
+                "time": parse_punch_time(doc.get("check_in"), today),
+                "location": doc.get("location", "N/A"),
+            })
+        print(f"On-duty registry loaded: {len(self._entries)} checked in")
+
+    def _entry(self, event: dict) -> dict:
+        return {
+            "employee_id": str(event["employee_id"]),
+            "name": event.get("employee_name", "Unknown"),
+            "department": event.get("department") or "N/A",
+            "date": event["date"],
+            "time": parse_punch_time(event["at"]),
+            "location": event.get("location", "N/A"),
+        }
+
+    def _prune(self) -> str:
+        """Today's date; on the first call of a new day, entries and punches from earlier days are dropped."""
+        today = _today()
+        if today != self._day:
+            self._day = today
+            self._entries = {key: entry for key, entry in self._entries.items() if entry["date"] == today}
+            self._last_punch = {key: at for key, at in self._last_punch.items() if at is not None and punch_day(at) == today}
+        return today
+
+    def _fold(self, direction: str, entry: dict) -> Optional[Tuple[str, dict]]:
+        """
+        Fold one of today's punches into the view. Punches older than the latest
+        one seen for the employee are ignored. Returns the (action, entry) to
+        announce, or None if nothing changed.
+        """
+        if entry["date"] != self._prune() or entry["time"] is None:
+            return None
+        employee_id = entry["employee_id"]
+        last = self._last_punch.get(employee_id)
+        if last is not None and entry["time"] < last:
+            return None
+        self._last_punch[employee_id] = entry["time"]
+
+        if direction == "in":
+            if employee_id in self._entries:
+                return None
+            self._entries[employee_id] = entry
+            return "checked_in", entry
+        checked_in = self._entries.pop(employee_id, None)
+        if checked_in is None:
+            return None
+        return "checked_out", checked_in
+
+    async def apply(self, event: dict):
+        """Apply a punch event, announce the change and share it with the other workers."""
+        change = self._fold(event["direction"], self._entry(event))
+        if change is None:
+            return
+        await self._publish(event["direction"], self._entry(event))
+        await self._emit(*change)
+
+    async def apply_many(self, events: List[dict]):
+        for event in sorted(events, key=lambda e: e["at"]):
+            await self.apply(event)
+
+    async def _publish(self, direction: str, entry: dict):
+        if self._redis is None:
+            return
+        try:
+            await self._redis.publish(ON_DUTY_CHANNEL, orjson.dumps({"worker": self.worker_id, "direction": direction, "entry": entry}))
+        except Exception as e:
+            # The other workers catch up from the punch log on their next load
+            print(f"On-duty delta not published: {e}")
+
+    async def _listen(self, pubsub):
+        while True:
+            try:
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    delta = orjson.loads(message["data"])
+                    if delta["worker"] == self.worker_id:
+                        continue
+                    entry = delta["entry"]
+                    entry["time"] = parse_punch_time(entry["time"])
+                    # The worker that took the punch already emitted the update to every dashboard
+                    self._fold(delta["direction"], entry)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"On-duty delta listener failed: {e}")
+                await asyncio.sleep(1)
+
+    async def _emit(self, action: str, entry: dict):
+        if self.sio is None:
+            return
+        await self.sio.emit("on_duty_update", {
+            "action": action,
+            "employee_id": entry["employee_id"],
+            "name": entry["name"],
+            "department": entry["department"],
+            "time": entry["time"].isoformat() if isinstance(entry["time"], datetime) else entry["time"],
+            "location": entry["location"],
+        }, room=EMPLOYER_ROOM)
+
+    def snapshot(self, department: Optional[str] = None) -> List[dict]:
+        """Today's checked-in employees, in the shape the dashboard's live_on_duty list uses."""
+        self._prune()
+        return [
+            {"name": entry["name"], "time": entry["time"], "location": entry["location"]}
+            for entry in self._entries.values()
+            if not department or entry["department"] == department
+        ]
+
+    def stats(self) -> dict:
+        self._prune()
+        return {"on_duty": len(self._entries), "shared": self._redis is not None}
+
+
+# Singleton instance
+on_duty_registry = OnDutyRegistry(redis_url=os.getenv("REDIS_URL") or None)
@@ -0,0 +1,59 @@
+import os
+from fastapi import HTTPException, status
+
+from app.auth_utils import get_password_hash, verify_password
+from app.services.process_pool import ProcessPool
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing/verification in a bounded process pool so a login wave
+    doesn't freeze the event loop (and every socket on the worker) with it.
+    """
+
+    def __init__(self, pool_size: int = 2, max_queue: int = 64):
+        self.pool = ProcessPool(pool_size)
+        self.max_queue = max_queue
+        self._in_flight = 0
+        self.rejected = 0
+
+    def start(self):
+        self.pool.start()
+
+    def shutdown(self):
+        self.pool.shutdown()
+
+    async def _run(self, fn, *args):
+        if self._in_flight >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication service is busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+        self._in_flight += 1
+        try:
+            return await self.pool.run(fn, *args)
+        finally:
+            self._in_flight -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        return {
+            "pool_size": self.pool.size,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "rejected": self.rejected,
+        }
+
+
+# Singleton instance
+password_hasher = PasswordHasher(
+    pool_size=int(os.getenv("BCRYPT_POOL_SIZE", "2")),
+    max_queue=int(os.getenv("BCRYPT_MAX_QUEUE", "64")),
+)
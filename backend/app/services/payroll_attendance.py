@@ -0,0 +1,166 @@
+import calendar
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.services.timesheets import month_range
+
+# Attendance statuses that count towards days present, and how much of a day each is
+PRESENT_WEIGHTS = {"Present": 1.0, "Half-Day": 0.5}
+
+
+def month_name(month) -> str:
+    """
+    The canonical month name ("January") for an exact month name in any case,
+    or a month number from 1 to 12. Anything else raises ValueError.
+    """
+    value = str(month).strip()
+    if value.isdigit() and 1 <= int(value) <= 12:
+        return calendar.month_name[int(value)]
+    for number in range(1, 13):
+        if value.lower() == calendar.month_name[number].lower():
+            return calendar.month_name[number]
+    raise ValueError(f"Unknown payroll month {month!r}: use a month name or a number from 1 to 12")
+
+
+def period_month(month, year: int) -> str:
+    """YYYY-MM for a payroll period; `month` as accepted by month_name()."""
+    if not 1 <= int(year) <= 9999:
+        raise ValueError(f"Invalid payroll year {year!r}")
+    number = list(calendar.month_name).index(month_name(month))
+    return f"{int(year):04d}-{number:02d}"
+
+
+def _weekdays(start: dict, end: dict) -> dict:
+    """Aggregation expression: Mon-Fri days from `start` to `end` inclusive (both dates)."""
+    span = {"$ifNull": [{"$dateDiff": {"startDate": start, "endDate": end, "unit": "day"}}, -1]}
+    return {"$size": {"$filter": {
+        "input": {"$range": [0, {"$add": [span, 1]}]},
+        "as": "offset",
+        "cond": {"$lte": [{"$isoDayOfWeek": {"$dateAdd": {"startDate": start, "unit": "day", "amount": "$$offset"}}}, 5]}
+    }}}
+
+
+def _as_date(value: str) -> dict:
+    return {"$dateFromString": {"dateString": value, "format": "%Y-%m-%d", "onError": None, "onNull": None}}
+
+
+def attendance_pipeline(first: str, through: str) -> List[dict]:
+    """
+    Days present and approved leave days per employee between two YYYY-MM-DD
+    dates, in one $group over attendance with leaves unioned in. Leaves belong
+    to users, so their rows are keyed by the user's email instead of employee_id.
+    """
+    return [
+        {"$match": {"date": {"$gte": first, "$lte": through}, "status": {"$in": list(PRESENT_WEIGHTS)}}},
+        {"$project": {
+            "_id": 0,
+            "employee_id": 1,
+            "present": {"$switch": {
+                "branches": [{"case": {"$eq": ["$status", status]}, "then": weight} for status, weight in PRESENT_WEIGHTS.items()],
+                "default": 0
+            }},
+            "leave": {"$literal": 0},
+        }},
+        {"$unionWith": {"coll": "leaves", "pipeline": [
+            {"$match": {"status": "Approved", "start_date": {"$lte": through}, "end_date": {"$gte": first}}},
+            {"$lookup": {
+                "from": "users",
+                "let": {"user_id": {"$convert": {"input": "$user_id", "to": "objectId", "onError": None, "onNull": None}}},
+                "pipeline": [{"$match": {"$expr": {"$eq": ["$_id", "$$user_id"]}}}, {"$project": {"_id": 0, "email": 1}}],
+                "as": "user"
+            }},
+            {"$project": {
+                "_id": 0,
+                "email": {"$first": "$user.email"},
+                "present": {"$literal": 0},
+                # Only the working days of the leave that fall inside the period
+                "leave": _weekdays(_as_date({"$max": ["$start_date", first]}), _as_date({"$min": ["$end_date", through]})),
+            }},
+        ]}},
+        {"$group": {
+            "_id": {"employee_id": "$employee_id", "email": "$email"},
+            "days_present": {"$sum": "$present"},
+            "leave_days": {"$sum": "$leave"},
+        }},
+    ]
+
+
+class MonthAttendance:
+    """
+    One month's attendance inputs for payroll, loaded with a single aggregation
+    and then joined in memory with each employee batch.
+
+    Working days are Mon-Fri from the later of the month start and the joining
+    date, up to the earlier of the month end and today, so a run part-way
+    through a month only charges for days that have passed. Loss-of-pay days
+    are the working days not covered by attendance or approved leave.
+    """
+
+    def __init__(self, month: str, by_employee: Dict[str, dict], by_email: Dict[str, dict], today: Optional[date] = None):
+        self.month = month
+        self.by_employee = by_employee
+        self.by_email = by_email
+        first = np.datetime64(f"{month}-01", "D")
+        self.first = first
+        self.end = (first.astype("datetime64[M]") + 1).astype("datetime64[D]")  # exclusive
+        self.through = min(self.end, np.datetime64(today or date.today(), "D") + 1)  # exclusive
+        # Per-day rate denominator: every working day of the month
+        self.month_working_days = int(np.busday_count(self.first, self.end))
+
+    @classmethod
+    async def load(cls, db, month: str, today: Optional[date] = None) -> "MonthAttendance":
+        today = today or date.today()
+        bounds = month_range(month)
+        last_day = (date.fromisoformat(bounds["$lt"]) - timedelta(days=1)).isoformat()
+        first, through = bounds["$gte"], min(last_day, today.isoformat())
+        by_employee, by_email = {}, {}
+        if first <= through:
+            async for row in db["attendance"].aggregate(attendance_pipeline(first, through), allowDiskUse=True):
+                key = row["_id"]
+                totals = {"days_present": row["days_present"], "leave_days": row["leave_days"]}
+                if key.get("employee_id") is not None:
+                    by_employee[str(key["employee_id"])] = totals
+                elif key.get("email"):
+                    by_email[key["email"].lower()] = totals
+        return cls(month, by_employee, by_email, today)
+
+    def _joined(self, emp: dict) -> np.datetime64:
+        try:
+            joined = np.datetime64(str(emp.get("date_of_joining"))[:10], "D")
+        except ValueError:
+            return self.first
+        return max(joined, self.first)
+
+    def columns(self, employees: List[dict]) -> Dict[str, np.ndarray]:
+        """Row-aligned days_present, leave_days, working_days and lop_days for a batch."""
+        count = len(employees)
+        present = np.zeros(count, dtype=np.float64)
+        leave = np.zeros(count, dtype=np.float64)
+        starts = np.empty(count, dtype="datetime64[D]")
+        for row, emp in enumerate(employees):
+            attended = self.by_employee.get(str(emp["_id"]))
+            if attended:
+                present[row] = attended["days_present"]
+            applied = self.by_email.get((emp.get("email") or "").lower())
+            if applied:
+                leave[row] = applied["leave_days"]
+            starts[row] = self._joined(emp)
+
+        working = np.busday_count(np.minimum(starts, self.through), self.through).astype(np.float64)
+        return {
+            "days_present": present,
+            "leave_days": leave,
+            "working_days": working,
+            "lop_days": np.clip(working - present - leave, 0, None),
+        }
+
+    def inputs(self, columns: Dict[str, np.ndarray], row: int) -> dict:
+        """One employee's attendance inputs, as stored on the record and fingerprinted."""
+        return {
+            "days_present": float(columns["days_present"][row]),
+            "leave_days": float(columns["leave_days"][row]),
+            "lop_days": float(columns["lop_days"][row]),
+            "month_working_days": self.month_working_days,
+        }
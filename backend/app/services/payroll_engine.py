@@ -0,0 +1,168 @@
+import hashlib
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import orjson
+
+from app.models.payroll import SalaryStructure
+
+# Bump whenever the calculation rules change, so every fingerprint changes with them
+PAYROLL_ENGINE_VERSION = 2
+
+# SalaryStructure components, in column order
+COMPONENTS = ("basic_salary", "hra", "special_allowance", "medical_allowance", "pf_deduction", "professional_tax", "tds")
+
+# Standard split for employees without a salary_structure
+DEFAULT_BASIC_SHARE = 0.5
+DEFAULT_HRA_SHARE = 0.2
+DEFAULT_SPECIAL_SHARE = 0.3
+DEFAULT_PF_RATE = 0.12  # of basic
+DEFAULT_PROFESSIONAL_TAX = 200.0  # flat
+DEFAULT_TDS_RATE = 0.1  # of gross
+
+
+def default_structure(annual_salary: float) -> SalaryStructure:
+    monthly_gross = (annual_salary or 0) / 12
+    basic = monthly_gross * DEFAULT_BASIC_SHARE
+    return SalaryStructure(
+        basic_salary=basic,
+        hra=monthly_gross * DEFAULT_HRA_SHARE,
+        special_allowance=monthly_gross * DEFAULT_SPECIAL_SHARE,
+        pf_deduction=basic * DEFAULT_PF_RATE,
+        professional_tax=DEFAULT_PROFESSIONAL_TAX,
+        tds=monthly_gross * DEFAULT_TDS_RATE,
+    )
+
+
+def reference_payroll(emp: dict, inputs: Optional[dict] = None) -> dict:
+    """Scalar, one-employee-at-a-time calculation; the vectorised engine is checked against it."""
+    if emp.get("salary_structure"):
+        structure = SalaryStructure(**emp["salary_structure"])
+    else:
+        structure = default_structure(emp.get("salary", 0))
+
+    allowances = structure.hra + structure.special_allowance + structure.medical_allowance
+    gross = structure.basic_salary + allowances
+    lop = 0.0
+    if inputs and inputs.get("month_working_days"):
+        lop = min(gross, gross / inputs["month_working_days"] * inputs["lop_days"])
+    deductions = structure.pf_deduction + structure.professional_tax + structure.tds + lop
+    return {
+        "basic_salary": round(structure.basic_salary, 2),
+        "total_allowances": round(allowances, 2),
+        "total_deductions": round(deductions, 2),
+        "net_salary": round(gross - deductions, 2),
+        "lop_deduction": round(lop, 2),
+    }
+
+
+def payroll_fingerprint(emp: dict, inputs: Optional[dict] = None) -> str:
+    """
+    Digest of everything a payroll record is computed from: the employee's name,
+    salary and structure, any per-period `inputs`, and the engine version.
+    """
+    payload = {
+        "engine": PAYROLL_ENGINE_VERSION,
+        "name": [emp.get("first_name"), emp.get("last_name")],
+        "salary": emp.get("salary"),
+        "structure": emp.get("salary_structure"),
+        "inputs": inputs or {},
+    }
+    return hashlib.sha1(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+class PayrollEngine:
+    """
+    Company-wide payroll in one vectorised pass: salary structures are loaded
+    into a (employees x components) array, employees without a structure get
+    the default split computed column-wise, and totals are row reductions.
+    Loss-of-pay days, when given, are deducted at gross / working days per day.
+    """
+
+    def load(self, employees: List[dict], inputs: Optional[List[dict]] = None) -> Dict[str, np.ndarray]:
+        count = len(employees)
+        structures = np.zeros((count, len(COMPONENTS)), dtype=np.float64)
+        has_structure = np.zeros(count, dtype=bool)
+        annual = np.zeros(count, dtype=np.float64)
+        for row, emp in enumerate(employees):
+            annual[row] = emp.get("salary") or 0
+            structure = emp.get("salary_structure")
+            if structure:
+                has_structure[row] = True
+                structures[row] = [structure.get(name) or 0 for name in COMPONENTS]
+        lop_days = np.zeros(count, dtype=np.float64)
+        working_days = np.zeros(count, dtype=np.float64)
+        for row, values in enumerate(inputs or ()):
+            lop_days[row] = values.get("lop_days") or 0
+            working_days[row] = values.get("month_working_days") or 0
+        return {"structures": structures, "has_structure": has_structure, "annual_salary": annual,
+                "lop_days": lop_days, "month_working_days": working_days}
+
+    def compute(self, columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        structures = columns["structures"].copy()
+        missing = ~columns["has_structure"]
+
+        if missing.any():
+            monthly_gross = columns["annual_salary"][missing] / 12
+            basic = monthly_gross * DEFAULT_BASIC_SHARE
+            structures[missing] = np.column_stack([
+                basic,
+                monthly_gross * DEFAULT_HRA_SHARE,
+                monthly_gross * DEFAULT_SPECIAL_SHARE,
+                np.zeros_like(basic),
+                basic * DEFAULT_PF_RATE,
+                np.full_like(basic, DEFAULT_PROFESSIONAL_TAX),
+                monthly_gross * DEFAULT_TDS_RATE,
+            ])
+
+        basic = structures[:, 0]
+        allowances = structures[:, 1:4].sum(axis=1)
+        gross = basic + allowances
+
+        lop = np.zeros_like(gross)
+        working = columns.get("month_working_days")
+        if working is not None:
+            charged = working > 0
+            lop[charged] = np.minimum(gross[charged], gross[charged] / working[charged] * columns["lop_days"][charged])
+
+        deductions = structures[:, 4:7].sum(axis=1) + lop
+        return {
+            "basic_salary": basic,
+            "total_allowances": allowances,
+            "total_deductions": deductions,
+            "net_salary": gross - deductions,
+            "lop_deduction": lop,
+        }
+
+    def records(self, employees: List[dict], month: str, year: int, generated_at: datetime,
+                inputs: Optional[List[dict]] = None, fingerprints: Optional[List[str]] = None) -> List[dict]:
+        """
+        Payroll records for a batch of employees (needs _id, names, salary, salary_structure),
+        with `inputs` the row-aligned attendance inputs from MonthAttendance.inputs.
+        """
+        if not employees:
+            return []
+        totals = {name: np.round(values, 2).tolist() for name, values in self.compute(self.load(employees, inputs)).items()}
+        return [
+            {
+                **(inputs[row] if inputs else {}),
+                "employee_id": str(emp["_id"]),
+                "employee_name": f"{emp['first_name']} {emp['last_name']}",
+                "month": month,
+                "year": year,
+                "basic_salary": totals["basic_salary"][row],
+                "total_allowances": totals["total_allowances"][row],
+                "total_deductions": totals["total_deductions"][row],
+                "net_salary": totals["net_salary"][row],
+                "lop_deduction": totals["lop_deduction"][row],
+                "status": "Processed",
+                "generated_at": generated_at,
+                "input_fingerprint": fingerprints[row] if fingerprints else payroll_fingerprint(emp, inputs[row] if inputs else None)
+            }
+            for row, emp in enumerate(employees)
+        ]
+
+
+# Singleton instance
+payroll_engine = PayrollEngine()
@@ -0,0 +1,287 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from app.services.on_duty import EMPLOYER_ROOM
+from app.services.payroll_attendance import MonthAttendance, month_name, period_month
+from app.services.payroll_engine import payroll_engine, payroll_fingerprint
+from app.services.payslips import payslip_renderer
+
+JOBS_COLLECTION = "payroll_jobs"
+PAYROLL_EMPLOYEE_PROJECTION = {"first_name": 1, "last_name": 1, "email": 1, "date_of_joining": 1, "salary": 1, "salary_structure": 1}
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class LeaseLost(Exception):
+    """Another worker claimed the job after this worker's lease lapsed."""
+
+
+async def upsert_payroll(db, records: List[dict]):
+    """
+    One unordered bulk_write for a chunk. If any record is rejected it raises
+    BulkWriteError after the others are written; the caller fails the job
+    without checkpointing the chunk, so a rerun covers the rejected ids.
+    """
+    await db["payroll"].bulk_write([
+        UpdateOne(
+            {"employee_id": record["employee_id"], "month": record["month"], "year": record["year"]},
+            {"$set": record},
+            upsert=True
+        )
+        for record in records
+    ], ordered=False)
+
+
+class PayrollJobRunner:
+    """
+    Runs payroll generation as background jobs stored in `payroll_jobs`.
+    Employees are processed in _id order, one bulk_write per chunk, and the
+    last employee of each chunk is checkpointed on the job, so a crashed run
+    resumes after its last completed chunk. A worker holds a lease on a job
+    while running it; a sweeper picks up jobs whose lease has lapsed.
+
+    Each claim carries its own lease token, renewed in the background while the
+    run is alive. Checkpoint and finish writes are filtered on it, so a worker
+    whose lease was taken over stops at its next write instead of advancing
+    the job alongside the new owner.
+    """
+
+    def __init__(self, chunk_size: int = 1000, lease_seconds: float = 60.0):
+        self.chunk_size = chunk_size
+        self.lease_seconds = lease_seconds
+        self.sio = None
+        self._tasks = {}  # job_id -> task
+        self._tokens = {}  # job_id -> lease token held by this worker
+        self._sweeper = None
+
+    def attach(self, sio):
+        self.sio = sio
+
+    def start(self, db):
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep(db))
+
+    async def stop(self, db=None):
+        tokens = dict(self._tokens)
+        tasks = ([self._sweeper] if self._sweeper else []) + list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if db is not None:
+            # Hand unfinished jobs straight back instead of waiting for the lease to lapse
+            for job_id, token in tokens.items():
+                await db[JOBS_COLLECTION].update_one(
+                    {"_id": job_id, "lease_token": token, "status": "running"},
+                    {"$set": {"lease_until": None, "lease_token": None}}
+                )
+        self._tasks.clear()
+        self._tokens.clear()
+        self._sweeper = None
+
+    async def submit(self, db, month: str, year: int, force: bool = False) -> dict:
+        """
+        Queue a run for the period, or return the one already queued or running.
+        Unless `force` is set, employees whose inputs are unchanged are skipped.
+        """
+        month = month_name(month)
+        period_month(month, year)  # raises ValueError for a year the engine can't date
+        existing = await db[JOBS_COLLECTION].find_one({"month": month, "year": year, "active": True})
+        if existing:
+            return existing
+
+        # Mongo stores milliseconds; truncate so the run's records can be found by generated_at
+        now = datetime.utcnow()
+        job = {
+            "month": month,
+            "year": year,
+            "status": "queued",
+            # Unique per period while set (partial index), so concurrent submits can't start two runs
+            "active": True,
+            "total": await db["employees"].count_documents({"status": "Active"}),
+            "force": force,
+            "processed": 0,
+            "written": 0,
+            "skipped": 0,
+            "last_employee_id": None,
+            "generated_at": now.replace(microsecond=now.microsecond // 1000 * 1000),
+            "created_at": now,
+            "updated_at": now,
+            "lease_until": None,
+            "lease_token": None,
+            "error": None,
+        }
+        try:
+            result = await db[JOBS_COLLECTION].insert_one(job)
+        except DuplicateKeyError:
+            return await db[JOBS_COLLECTION].find_one({"month": month, "year": year, "active": True})
+        job["_id"] = result.inserted_id
+        self._schedule(db, job["_id"])
+        return job
+
+    async def resume(self, db):
+        """Schedule every queued or running job whose lease has lapsed."""
+        cursor = db[JOBS_COLLECTION].find({"status": {"$in": list(ACTIVE_STATUSES)}}, {"_id": 1})
+        async for job in cursor:
+            self._schedule(db, job["_id"])
+
+    def _schedule(self, db, job_id):
+        task = self._tasks.get(job_id)
+        if task is None or task.done():
+            self._tasks[job_id] = asyncio.create_task(self._run(db, job_id))
+
+    async def _sweep(self, db):
+        while True:
+            try:
+                await self.resume(db)
+            except Exception as e:
+                print(f"Payroll job sweep failed: {e}")
+            await asyncio.sleep(self.lease_seconds)
+
+    async def _claim(self, db, job_id) -> Optional[dict]:
+        now = datetime.utcnow()
+        return await db[JOBS_COLLECTION].find_one_and_update(
+            {
+                "_id": job_id,
+                "status": {"$in": list(ACTIVE_STATUSES)},
+                "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}]
+            },
+            {"$set": {
+                "status": "running",
+                "lease_token": uuid.uuid4().hex,
+                "lease_until": now + timedelta(seconds=self.lease_seconds),
+                "updated_at": now
+            }},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _renew(self, db, job_id, token: str):
+        """Keep the lease alive between checkpoints (a slow attendance load or chunk); returns once it's lost."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            result = await db[JOBS_COLLECTION].update_one(
+                {"_id": job_id, "lease_token": token},
+                {"$set": {"lease_until": datetime.utcnow() + timedelta(seconds=self.lease_seconds)}}
+            )
+            if result.matched_count == 0:
+                return
+
+    async def _run(self, db, job_id):
+        job = await self._claim(db, job_id)
+        if job is None:
+            return  # finished, or another worker holds the lease
+        token = job["lease_token"]
+        self._tokens[job_id] = token
+        renewal = asyncio.create_task(self._renew(db, job_id, token))
+        await self._emit(job)
+        try:
+            # The month's attendance and leave totals in one aggregation, joined with each chunk in memory
+            attendance = await MonthAttendance.load(db, period_month(job["month"], job["year"]))
+            while True:
+                query = {"status": "Active"}
+                if job.get("last_employee_id") is not None:
+                    query["_id"] = {"$gt": job["last_employee_id"]}
+                employees = await db["employees"].find(query, PAYROLL_EMPLOYEE_PROJECTION).sort("_id", 1).limit(self.chunk_size).to_list(self.chunk_size)
+                if not employees:
+                    break
+                if renewal.done():
+                    raise LeaseLost()
+
+                columns = attendance.columns(employees)
+                inputs = [attendance.inputs(columns, row) for row in range(len(employees))]
+                changed, changed_inputs, fingerprints = await self._changed(db, job, employees, inputs)
+                if changed:
+                    await upsert_payroll(db, payroll_engine.records(changed, job["month"], job["year"], job["generated_at"], changed_inputs, fingerprints))
+
+                # Checkpoint after the write: a crash here re-runs at most this chunk, and upserts are idempotent
+                now = datetime.utcnow()
+                job = await db[JOBS_COLLECTION].find_one_and_update(
+                    {"_id": job_id, "lease_token": token},
+                    {
+                        "$set": {"last_employee_id": employees[-1]["_id"], "updated_at": now, "lease_until": now + timedelta(seconds=self.lease_seconds)},
+                        "$inc": {"processed": len(employees), "written": len(changed), "skipped": len(employees) - len(changed)}
+                    },
+                    return_document=ReturnDocument.AFTER
+                )
+                if job is None:
+                    raise LeaseLost()
+                await self._emit(job)
+
+            job = await self._finish(db, job_id, token, {"status": "completed", "completed_at": datetime.utcnow()})
+        except asyncio.CancelledError:
+            raise
+        except LeaseLost:
+            job = None
+        except Exception as e:
+            print(f"Payroll job {job_id} failed: {e}")
+            job = await self._finish(db, job_id, token, {"status": "failed", "error": str(e)})
+        finally:
+            renewal.cancel()
+            self._tasks.pop(job_id, None)
+            self._tokens.pop(job_id, None)
+        if job is None:
+            # The new owner carries on from the last checkpoint and reports progress
+            print(f"Payroll job {job_id}: lease taken over by another worker, stopping")
+            return
+        await self._emit(job)
+        if job["status"] == "completed":
+            # Payslips already on disk are skipped, so only new or changed records are rendered
+            payslip_renderer.schedule_period(db, job["month"], job["year"])
+
+    async def _changed(self, db, job: dict, employees: List[dict], inputs: List[dict]):
+        """The employees whose payroll inputs differ from their stored record, with their inputs and new fingerprints."""
+        fingerprints = [payroll_fingerprint(emp, values) for emp, values in zip(employees, inputs)]
+        if job.get("force"):
+            return employees, inputs, fingerprints
+
+        stored = {}
+        cursor = db["payroll"].find(
+            {"month": job["month"], "year": job["year"], "employee_id": {"$in": [str(emp["_id"]) for emp in employees]}},
+            {"employee_id": 1, "input_fingerprint": 1}
+        )
+        async for record in cursor:
+            stored[record["employee_id"]] = record.get("input_fingerprint")
+
+        changed, changed_inputs, changed_fingerprints = [], [], []
+        for emp, values, fingerprint in zip(employees, inputs, fingerprints):
+            if stored.get(str(emp["_id"])) != fingerprint:
+                changed.append(emp)
+                changed_inputs.append(values)
+                changed_fingerprints.append(fingerprint)
+        return changed, changed_inputs, changed_fingerprints
+
+    async def _finish(self, db, job_id, token: str, fields: dict) -> Optional[dict]:
+        """Close the job if this worker still holds it; None if the lease was taken over."""
+        return await db[JOBS_COLLECTION].find_one_and_update(
+            {"_id": job_id, "lease_token": token},
+            {"$set": {**fields, "active": False, "lease_until": None, "lease_token": None, "updated_at": datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _emit(self, job: Optional[dict]):
+        if self.sio is None or job is None:
+            return
+        await self.sio.emit("payroll_job_progress", {
+            "job_id": str(job["_id"]),
+            "month": job["month"],
+            "year": job["year"],
+            "status": job["status"],
+            "processed": job["processed"],
+            "written": job.get("written", 0),
+            "skipped": job.get("skipped", 0),
+            "total": job["total"],
+        }, room=EMPLOYER_ROOM)
+
+    def stats(self) -> dict:
+        return {"running": sum(1 for task in self._tasks.values() if not task.done())}
+
+
+# Singleton instance
+payroll_job_runner = PayrollJobRunner(
+    chunk_size=int(os.getenv("PAYROLL_CHUNK_SIZE", "1000")),
+    lease_seconds=float(os.getenv("PAYROLL_JOB_LEASE_SECONDS", "60")),
+)
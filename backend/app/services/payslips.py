@@ -0,0 +1,291 @@
+import asyncio
+import functools
+import hashlib
+import os
+import string
+from typing import List, Optional, Tuple
+
+import orjson
+
+from app.services.employee_directory import employee_directory
+from app.services.process_pool import ProcessPool
+
+PAYSLIP_DIR = os.path.join("uploads", "payslips")
+# Bump whenever LAYOUT or the PDF skeleton changes, so every payslip gets a new address
+TEMPLATE_VERSION = 1
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+LEFT, RIGHT, VALUES = 50, 545, 330
+
+# (x, y, size, bold, text): text is a literal with {field} slots filled per payslip
+LAYOUT = [
+    (LEFT, 780, 18, True, "{company}"),
+    (LEFT, 756, 12, False, "Payslip for {period}"),
+    (LEFT, 710, 10, True, "Employee"),
+    (VALUES, 710, 10, False, "{employee_name}"),
+    (LEFT, 692, 10, True, "Employee ID"),
+    (VALUES, 692, 10, False, "{employee_id}"),
+    (LEFT, 674, 10, True, "Department"),
+    (VALUES, 674, 10, False, "{department}"),
+    (LEFT, 630, 10, True, "Days present"),
+    (VALUES, 630, 10, False, "{days_present}"),
+    (LEFT, 612, 10, True, "Approved leave days"),
+    (VALUES, 612, 10, False, "{leave_days}"),
+    (LEFT, 594, 10, True, "Loss-of-pay days"),
+    (VALUES, 594, 10, False, "{lop_days}"),
+    (LEFT, 550, 10, False, "Basic salary"),
+    (VALUES, 550, 10, False, "{basic_salary}"),
+    (LEFT, 532, 10, False, "Allowances"),
+    (VALUES, 532, 10, False, "{total_allowances}"),
+    (LEFT, 514, 10, False, "Loss-of-pay deduction"),
+    (VALUES, 514, 10, False, "{lop_deduction}"),
+    (LEFT, 496, 10, False, "Total deductions"),
+    (VALUES, 496, 10, False, "{total_deductions}"),
+    (LEFT, 460, 12, True, "Net pay"),
+    (VALUES, 460, 12, True, "{net_salary}"),
+    (LEFT, 120, 8, False, "Generated {generated_on}. This is a system-generated payslip and needs no signature."),
+]
+RULES = [730, 650, 570, 480]  # y of horizontal rules between sections
+
+FIELDS = tuple(sorted({name for *_, text in LAYOUT for _, name, _, _ in string.Formatter().parse(text) if name}))
+
+
+def _pdf_text(value: str) -> bytes:
+    """A PDF literal-string body in WinAnsi (cp1252), with the delimiters escaped."""
+    encoded = str(value).encode("cp1252", errors="replace")
+    return encoded.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+@functools.lru_cache(maxsize=1)
+def compiled_template() -> Tuple[bytes, Tuple, List[int]]:
+    """
+    The payslip template compiled once per process: the static PDF objects
+    (catalog, page tree, page, fonts) as bytes with their xref offsets, and
+    the page's content stream as literal byte chunks interleaved with field
+    names. Rendering only joins the chunks and appends the stream and xref.
+    """
+    parts = [b"0.5 w\n"]
+    for y in RULES:
+        parts.append(f"{LEFT} {y} m {RIGHT} {y} l S\n".encode())
+    for x, y, size, bold, text in LAYOUT:
+        parts.append(f"BT /F{2 if bold else 1} {size} Tf {x} {y} Td (".encode())
+        for literal, name, _, _ in string.Formatter().parse(text):
+            if literal:
+                parts.append(_pdf_text(literal))
+            if name:
+                parts.append(name)
+        parts.append(b") Tj ET\n")
+
+    # Merge adjacent literals so a render touches as few chunks as possible
+    stream = []
+    for part in parts:
+        if isinstance(part, bytes) and stream and isinstance(stream[-1], bytes):
+            stream[-1] += part
+        else:
+            stream.append(part)
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+        f"/Resources << /Font << /F1 4 0 R /F2 5 0 R >> >> /Contents 6 0 R >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+    ]
+    head = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(head))
+        head += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    return bytes(head), tuple(stream), offsets
+
+
+def render_payslip(fields: dict) -> bytes:
+    """A one-page payslip PDF for `fields` (see FIELDS)."""
+    head, stream, offsets = compiled_template()
+    content = b"".join(part if isinstance(part, bytes) else _pdf_text(fields.get(part, "")) for part in stream)
+    body = head + b"6 0 obj\n<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream\nendobj\n"
+    xref = len(body)
+    entries = b"".join(b"%010d 00000 n \n" % offset for offset in offsets + [len(head)])
+    return (
+        body
+        + b"xref\n0 7\n0000000000 65535 f \n" + entries
+        + b"trailer\n<< /Size 7 /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % xref
+    )
+
+
+def render_batch(directory: str, items: List[Tuple[str, dict]]) -> int:
+    """Worker entry point: write each (address, fields) payslip that isn't on disk yet."""
+    os.makedirs(directory, exist_ok=True)
+    written = 0
+    for address, fields in items:
+        path = os.path.join(directory, f"{address}.pdf")
+        if os.path.exists(path):
+            continue
+        # Write-then-rename, so a concurrent reader never sees half a file
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(render_payslip(fields))
+        os.replace(temporary, path)
+        written += 1
+    return written
+
+
+def _amount(value) -> str:
+    return f"{float(value or 0):,.2f}"
+
+
+def _days(value) -> str:
+    return "-" if value is None else f"{float(value):g}"
+
+
+def payslip_fields(record: dict, employee: Optional[dict] = None, company: str = "") -> dict:
+    """Everything printed on a payroll record's payslip, as strings."""
+    generated = record.get("generated_at")
+    return {
+        "company": company,
+        "period": f"{record['month']} {record['year']}",
+        "employee_name": record.get("employee_name", ""),
+        "employee_id": str(record.get("employee_id", "")),
+        "department": (employee or {}).get("department") or "N/A",
+        "days_present": _days(record.get("days_present")),
+        "leave_days": _days(record.get("leave_days")),
+        "lop_days": _days(record.get("lop_days")),
+        "basic_salary": _amount(record.get("basic_salary")),
+        "total_allowances": _amount(record.get("total_allowances")),
+        "lop_deduction": _amount(record.get("lop_deduction")),
+        "total_deductions": _amount(record.get("total_deductions")),
+        "net_salary": _amount(record.get("net_salary")),
+        "generated_on": generated.strftime("%Y-%m-%d") if hasattr(generated, "strftime") else str(generated or ""),
+    }
+
+
+def payslip_address(fields: dict) -> str:
+    """
+    Content address of a payslip. Rendering is a pure function of the template
+    version and the fields, so identical payslips share one file and a changed
+    record gets a new one.
+    """
+    payload = orjson.dumps({"template": TEMPLATE_VERSION, "fields": fields}, option=orjson.OPT_SORT_KEYS)
+    return hashlib.sha256(payload).hexdigest()
+
+
+class PayslipRenderer:
+    """
+    Renders payslip PDFs in a process pool into content-addressed files under
+    uploads/payslips/. Whole payroll periods are pre-rendered in batches after
+    generation; a single payslip that isn't on disk yet is rendered on demand.
+    """
+
+    def __init__(self, pool_size: int = 2, batch_size: int = 200, directory: str = PAYSLIP_DIR, company: str = ""):
+        self.pool = ProcessPool(pool_size)
+        self.batch_size = batch_size
+        self.directory = directory
+        self.company = company
+        self._tasks = set()
+        self.rendered = 0
+
+    @property
+    def pool_size(self) -> int:
+        return self.pool.size
+
+    @pool_size.setter
+    def pool_size(self, size: int):
+        # Only takes effect before the pool starts (render_payslips.py sets it from --workers)
+        self.pool.size = max(1, size)
+
+    def start(self):
+        self.pool.start()
+
+    async def shutdown(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self.pool.shutdown()
+
+    def path(self, address: str) -> str:
+        return os.path.join(self.directory, f"{address}.pdf")
+
+    async def _render(self, items: List[Tuple[str, dict]]) -> int:
+        written = await self.pool.run(render_batch, self.directory, items)
+        self.rendered += written
+        return written
+
+    async def ensure(self, db, record: dict) -> str:
+        """Path of the record's payslip, rendering it first if it isn't on disk."""
+        employee = await employee_directory.get(db, record.get("employee_id"))
+        fields = payslip_fields(record, employee, self.company)
+        address = payslip_address(fields)
+        if not os.path.exists(self.path(address)):
+            await self._render([(address, fields)])
+        return self.path(address)
+
+    async def render_period(self, db, month: str, year: int) -> dict:
+        """Pre-render every payslip of a payroll period, one pool task per batch."""
+        batches = []
+        records = 0
+        rendered = 0
+        cursor = db["payroll"].find({"month": month, "year": year}).batch_size(self.batch_size)
+        batch = []
+        async for record in cursor:
+            batch.append(record)
+            records += 1
+            if len(batch) < self.batch_size:
+                continue
+            batches.append(batch)
+            batch = []
+            if len(batches) >= self.pool_size:
+                rendered += await self._render_records(db, batches)
+                batches = []
+        if batch:
+            batches.append(batch)
+        if batches:
+            rendered += await self._render_records(db, batches)
+        return {"month": month, "year": year, "records": records, "rendered": rendered}
+
+    async def _render_records(self, db, batches: List[List[dict]]) -> int:
+        """Render up to pool_size batches of records side by side, skipping payslips already on disk."""
+        work = []
+        for records in batches:
+            directory = await employee_directory.get_many(db, [r["employee_id"] for r in records])
+            items = []
+            for record in records:
+                fields = payslip_fields(record, directory.get(record["employee_id"]), self.company)
+                address = payslip_address(fields)
+                if not os.path.exists(self.path(address)):
+                    items.append((address, fields))
+            if items:
+                work.append(self._render(items))
+        return sum(await asyncio.gather(*work))
+
+    def schedule_period(self, db, month: str, year: int):
+        """Pre-render a period in the background (after a payroll run completes)."""
+        async def run():
+            try:
+                result = await self.render_period(db, month, year)
+                print(f"Payslips for {month} {year}: {result['rendered']} rendered, {result['records']} records")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Payslip rendering for {month} {year} failed: {e}")
+
+        task = asyncio.create_task(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def stats(self) -> dict:
+        return {
+            "pool_size": self.pool_size,
+            "in_progress": len(self._tasks),
+            "rendered": self.rendered,
+        }
+
+
+# Singleton instance
+payslip_renderer = PayslipRenderer(
+    pool_size=int(os.getenv("PAYSLIP_POOL_SIZE", str(os.cpu_count() or 2))),
+    batch_size=int(os.getenv("PAYSLIP_BATCH_SIZE", "200")),
+    directory=os.getenv("PAYSLIP_DIR", PAYSLIP_DIR),
+    company=os.getenv("PAYSLIP_COMPANY", "YS HR"),
+)
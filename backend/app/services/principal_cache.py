@@ -0,0 +1,81 @@
+import copy
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class PrincipalCache:
+    """
+    In-process TTL + LRU cache of resolved users, keyed by the token subject (email).
+    Saves the users lookup that get_current_user would otherwise do on every request.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 60.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # subject -> (expires_at, user)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, subject: str) -> Optional[dict]:
+        entry = self._entries.get(subject)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            del self._entries[subject]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(subject)
+        self.hits += 1
+        # Handlers mutate current_user, nested values included, so never hand out the cached one
+        return copy.deepcopy(user)
+
+    def set(self, subject: str, user: dict):
+        if self.max_size <= 0:
+            return
+        # A deep copy: later changes to the caller's document must not leak into the cache
+        self._entries[subject] = (time.monotonic() + self.ttl_seconds, copy.deepcopy(user))
+        self._entries.move_to_end(subject)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, subject: Optional[str]):
+        """Drop a cached principal by subject (email)."""
+        if subject:
+            self._entries.pop(subject, None)
+
+    def invalidate_id(self, user_id):
+        """Drop a cached principal by user _id (used where only the id is known)."""
+        user_id = str(user_id)
+        for subject, (_, user) in list(self._entries.items()):
+            if str(user.get("_id")) == user_id:
+                del self._entries[subject]
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Singleton instance
+principal_cache = PrincipalCache(
+    max_size=int(os.getenv("PRINCIPAL_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.getenv("PRINCIPAL_CACHE_TTL", "60")),
+)
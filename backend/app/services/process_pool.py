@@ -0,0 +1,34 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+class ProcessPool:
+    """
+    A process pool for CPU-bound work, started on first use. Workers are
+    spawned rather than forked: forking a process that already has Motor/IO
+    threads running is unsafe.
+    """
+
+    def __init__(self, size: int = 2):
+        self.size = max(1, size)
+        self._executor = None
+
+    def start(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.size,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+
+    async def run(self, fn, *args):
+        """Run fn(*args) in a worker process and await its result."""
+        self.start()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    def shutdown(self):
+        """Stop the workers without waiting; queued calls are cancelled."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
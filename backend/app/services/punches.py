@@ -0,0 +1,99 @@
+from datetime import datetime, timezone
+from typing import List
+
+from app.services.attendance_schema import ATTENDANCE_SCHEMA_VERSION
+
+MS_PER_HOUR = 3600 * 1000
+
+
+def work_hours_stages(total_hours) -> list:
+    """
+    Update-pipeline stages applying the attendance rules to a day's total hours
+    (an aggregation expression): a day of 8h or more counts as 9h, and the
+    break is 60 minutes from 9h, 30 from 4h, otherwise none.
+    """
+    return [
+        {"$set": {"work_hours": {"$let": {
+            "vars": {"total": total_hours},
+            "in": {"$cond": [{"$gte": ["$$total", 8]}, 9.0, "$$total"]}
+        }}}},
+        {"$set": {"break_time": {"$switch": {
+            "branches": [
+                {"case": {"$gte": ["$work_hours", 9]}, "then": 60},
+                {"case": {"$gte": ["$work_hours", 4]}, "then": 30}
+            ],
+            "default": 0
+        }}}}
+    ]
+
+
+def punch_day(timestamp: datetime) -> str:
+    """The attendance date a punch belongs to, in server-local time like date.today() (naive = UTC)."""
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.astimezone().date().isoformat()
+
+
+def punch_pipeline(punches: List[dict], employee: dict, location: str = "Office") -> list:
+    """
+    Update pipeline that merges `punches` ({"at", "direction", "device"}) into a
+    day record's punch log and re-derives check_in/check_out/work_hours from the
+    whole log. Because the log is a sorted set, replaying or reordering punches
+    gives the same result.
+    """
+    incoming = [
+        {"at": punch["at"], "direction": punch["direction"], "device": punch.get("device")}
+        for punch in punches
+    ]
+    # Days recorded before the punch log existed: start it from their stored punches
+    seed = {"$ifNull": ["$punches", {"$concatArrays": [
+        {"$cond": [{"$eq": [{"$type": "$check_in"}, "date"]}, [{"at": "$check_in", "direction": "in", "device": None}], []]},
+        {"$cond": [{"$eq": [{"$type": "$check_out"}, "date"]}, [{"at": "$check_out", "direction": "out", "device": None}], []]},
+    ]}]}
+
+    # Walk the log pairing each in with the next out; repeated ins and stray outs are ignored
+    sessions = {"$reduce": {
+        "input": "$punches",
+        "initialValue": {"open": None, "first_in": None, "last_in": None, "last_out": None, "ms": 0},
+        "in": {"$cond": [
+            {"$eq": ["$$this.direction", "in"]},
+            {
+                "open": {"$ifNull": ["$$value.open", "$$this.at"]},
+                "first_in": {"$ifNull": ["$$value.first_in", "$$this.at"]},
+                "last_in": {"$ifNull": ["$$value.open", "$$this.at"]},
+                "last_out": "$$value.last_out",
+                "ms": "$$value.ms"
+            },
+            {"$cond": [
+                {"$eq": ["$$value.open", None]},
+                "$$value",
+                {
+                    "open": None,
+                    "first_in": "$$value.first_in",
+                    "last_in": "$$value.last_in",
+                    "last_out": "$$this.at",
+                    "ms": {"$add": ["$$value.ms", {"$subtract": ["$$this.at", "$$value.open"]}]}
+                }
+            ]}
+        ]}
+    }}
+
+    return [
+        {"$set": {"punches": {"$sortArray": {
+            "input": {"$setUnion": [seed, incoming]},
+            "sortBy": {"at": 1, "direction": 1}
+        }}}},
+        {"$set": {"_sessions": sessions}},
+        {"$set": {
+            "employee_name": {"$ifNull": ["$employee_name", employee["name"]]},
+            "department": {"$ifNull": ["$department", employee["department"]]},
+            "location": {"$ifNull": ["$location", location]},
+            "status": "Present",
+            "first_check_in": "$_sessions.first_in",
+            "check_in": "$_sessions.last_in",
+            "check_out": {"$cond": [{"$eq": ["$_sessions.open", None]}, "$_sessions.last_out", None]},
+            "schema_version": ATTENDANCE_SCHEMA_VERSION
+        }},
+        *work_hours_stages({"$round": [{"$divide": ["$_sessions.ms", MS_PER_HOUR]}, 2]}),
+        {"$unset": "_sessions"}
+    ]
@@ -0,0 +1,82 @@
+import functools
+import orjson
+from bson import ObjectId
+from fastapi.responses import Response
+from pydantic import BaseModel
+from typing import Optional, Tuple, Type, get_args
+
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class MongoJSONResponse(Response):
+    """
+    Serialises trusted Mongo documents straight to JSON bytes with orjson:
+    ObjectId -> hex string, datetime -> ISO 8601 string (naive ones as UTC),
+    no per-row pydantic pass. Given the route's `model`, fields a document
+    lacks get the model's defaults, as the pydantic pass would have filled in.
+    Routes keep their response_model so the OpenAPI schema is unchanged.
+
+    Values are neither validated nor coerced: a field goes out as stored. A
+    legacy "HH:MM" check_in or a salary stored as "50000" reaches the client
+    as that string, where response_model would have coerced it or failed the
+    request. Keys are not filtered either, so routes pass a projection (see
+    model_projection) and serve collections the schema migrations keep in
+    canonical form.
+    """
+
+    media_type = "application/json"
+
+    def __init__(self, content=None, *args, model: Optional[Type[BaseModel]] = None, **kwargs):
+        self.model = model
+        super().__init__(content, *args, **kwargs)
+
+    def render(self, content) -> bytes:
+        if self.model is not None:
+            fill_defaults(content, self.model)
+        return dump_json(content)
+
+
+def dump_json(content) -> bytes:
+    """orjson with the Mongo type handling MongoJSONResponse uses."""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z)
+
+
+def _nested_model(annotation) -> Optional[Type[BaseModel]]:
+    for candidate in (annotation, *get_args(annotation)):
+        if isinstance(candidate, type) and issubclass(candidate, BaseModel):
+            return candidate
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def _model_fields(model: Type[BaseModel]) -> Tuple[tuple, ...]:
+    """(key, field, nested model) per field of `model`, keyed by alias."""
+    return tuple(
+        (field.alias or name, field, _nested_model(field.annotation))
+        for name, field in model.model_fields.items()
+    )
+
+
+def fill_defaults(content, model: Type[BaseModel]):
+    """Fill, in place, the defaults of `model` into a document or list of documents."""
+    documents = content if isinstance(content, list) else [content]
+    fields = _model_fields(model)
+    for document in documents:
+        if not isinstance(document, dict):
+            continue
+        for key, field, nested in fields:
+            if key not in document:
+                if not field.is_required():
+                    document[key] = field.get_default(call_default_factory=True)
+            elif nested is not None and isinstance(document[key], dict):
+                fill_defaults(document[key], nested)
+    return content
+
+
+def model_projection(model: Type[BaseModel]) -> dict:
+    """Mongo projection for exactly the fields a response model exposes (by alias)."""
+    return {field.alias or name: 1 for name, field in model.model_fields.items()}
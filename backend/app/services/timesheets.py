@@ -0,0 +1,205 @@
+import asyncio
+import os
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from pymongo import ReplaceOne
+
+TIMESHEET_COLLECTION = "timesheets"
+
+# Per-month state: when the month was last computed, and whether attendance changed since
+TIMESHEET_STATE_COLLECTION = "timesheet_months"
+
+
+def _epoch_ms(field) -> dict:
+    """Aggregation expression: a typed punch time as epoch milliseconds, NaN when missing or untyped."""
+    as_date = {"$convert": {"input": field, "to": "date", "onError": None, "onNull": None}}
+    return {"$ifNull": [{"$toDouble": as_date}, float("nan")]}
+
+
+# Only the fields the metrics need travel over the wire, already typed and defaulted by the server
+TIMESHEET_COLUMNS = {
+    "_id": 0,
+    "employee_id": {"$ifNull": [{"$toString": "$employee_id"}, ""]},
+    "employee_name": {"$ifNull": ["$employee_name", ""]},
+    "department": {"$ifNull": ["$department", "N/A"]},
+    "status": {"$ifNull": ["$status", "Absent"]},
+    "work_hours": {"$convert": {"input": "$work_hours", "to": "double", "onError": 0.0, "onNull": 0.0}},
+    "break_time": {"$convert": {"input": "$break_time", "to": "double", "onError": 0.0, "onNull": 0.0}},
+    # The day's first punch decides lateness; older rows only know the last session's
+    "start_ms": _epoch_ms({"$ifNull": ["$first_check_in", "$check_in"]}),
+    "end_ms": _epoch_ms("$check_out"),
+}
+OBJECT_COLUMNS = ("employee_id", "employee_name", "department", "status")
+FLOAT_COLUMNS = ("work_hours", "break_time", "start_ms", "end_ms")
+
+PRESENT_STATUSES = ("Present", "Half-Day")
+MS_PER_HOUR = 3600 * 1000
+MS_PER_MINUTE = 60 * 1000
+WRITE_BATCH_SIZE = 1000
+
+
+def month_range(month: str) -> dict:
+    """
+    Query on the YYYY-MM-DD `date` field for a YYYY-MM month: half-open, up to
+    the first of the next month, so no date string past the month's last day matches.
+    """
+    year, number = (int(part) for part in month.split("-"))
+    year, number = (year + 1, 1) if number == 12 else (year, number + 1)
+    return {"$gte": f"{month}-01", "$lt": f"{year:04d}-{number:02d}-01"}
+
+
+async def mark_months_stale(db, months: Iterable[str]):
+    """Flag computed months whose attendance changed; the next read recomputes them."""
+    months = sorted(set(months))
+    if months:
+        await db[TIMESHEET_STATE_COLLECTION].update_many({"_id": {"$in": months}}, {"$set": {"stale": True}})
+
+
+async def timesheets_current(db, month: str) -> bool:
+    """Whether the month's stored timesheets reflect all of its attendance."""
+    state = await db[TIMESHEET_STATE_COLLECTION].find_one({"_id": month}, {"stale": 1})
+    return state is not None and not state.get("stale", True)
+
+
+class TimesheetEngine:
+    """
+    Monthly per-employee timesheets. A month of attendance is read through one
+    projected cursor into columnar arrays, and every metric is computed with
+    NumPy group-by reductions rather than per-document Python logic.
+    """
+
+    def __init__(self, shift_start: str = "09:30", grace_minutes: int = 10, standard_hours: float = 8.0,
+                 overtime_after_hours: float = 9.0, utc_offset_minutes: Optional[int] = None):
+        hours, minutes = (int(part) for part in shift_start.split(":"))
+        self.shift_start_minutes = hours * 60 + minutes
+        self.grace_minutes = grace_minutes
+        self.standard_hours = standard_hours
+        self.overtime_after_hours = overtime_after_hours
+        if utc_offset_minutes is None:
+            # Server-local time, the same clock attendance dates use
+            utc_offset_minutes = int(datetime.now().astimezone().utcoffset().total_seconds() // 60)
+        self.utc_offset_minutes = utc_offset_minutes
+        # In-flight whole-month recomputes, one per month
+        self._refreshes: Dict[str, asyncio.Task] = {}
+
+    async def load_month(self, db, month: str, department: Optional[str] = None) -> Dict[str, np.ndarray]:
+        query = {"date": month_range(month)}
+        if department:
+            query["department"] = department
+
+        rows = await db["attendance"].aggregate(
+            [{"$match": query}, {"$project": TIMESHEET_COLUMNS}], batchSize=WRITE_BATCH_SIZE * 5
+        ).to_list(None)
+        columns = {name: np.array([row[name] for row in rows], dtype=object) for name in OBJECT_COLUMNS}
+        for name in FLOAT_COLUMNS:
+            columns[name] = np.fromiter((row[name] for row in rows), dtype=np.float64, count=len(rows))
+        return columns
+
+    def compute(self, columns: Dict[str, np.ndarray], month: str) -> List[dict]:
+        if len(columns["employee_id"]) == 0:
+            return []
+
+        employees, first_row, group = np.unique(columns["employee_id"], return_index=True, return_inverse=True)
+        count = len(employees)
+
+        def per_employee(values) -> np.ndarray:
+            return np.bincount(group, weights=values, minlength=count)
+
+        status = columns["status"]
+        hours = columns["work_hours"]
+        breaks = columns["break_time"]
+        start, end = columns["start_ms"], columns["end_ms"]
+
+        present = (status == PRESENT_STATUSES[0]) | (status == PRESENT_STATUSES[1])
+
+        with np.errstate(invalid="ignore"):
+            # Elapsed time on the clock less the break check_out deducted; falls back to stored hours
+            elapsed = (end - start) / MS_PER_HOUR - breaks / 60
+            clocked = np.where(np.isnan(elapsed), hours, elapsed)
+            overtime = np.clip(clocked - self.overtime_after_hours, 0, None)
+
+            minute_of_day = np.mod(np.floor(start / MS_PER_MINUTE) + self.utc_offset_minutes, 24 * 60)
+            late = minute_of_day > self.shift_start_minutes + self.grace_minutes
+
+        short = present & (hours > 0) & (hours < self.standard_hours)
+
+        days_present = per_employee(present.astype(np.float64))
+        total_hours = per_employee(hours)
+        overtime_hours = per_employee(overtime)
+        late_arrivals = per_employee(late.astype(np.float64))
+        short_days = per_employee(short.astype(np.float64))
+        break_minutes = per_employee(breaks)
+
+        generated_at = datetime.utcnow()
+        return [
+            {
+                "employee_id": employees[i],
+                "employee_name": columns["employee_name"][first_row[i]],
+                "department": columns["department"][first_row[i]],
+                "month": month,
+                "days_present": int(days_present[i]),
+                "total_hours": round(float(total_hours[i]), 2),
+                "overtime_hours": round(float(overtime_hours[i]), 2),
+                "late_arrivals": int(late_arrivals[i]),
+                "short_days": int(short_days[i]),
+                "break_minutes": int(break_minutes[i]),
+                "generated_at": generated_at,
+            }
+            for i in range(count)
+        ]
+
+    async def run(self, db, month: str, department: Optional[str] = None) -> int:
+        """Compute and store the timesheets for `month`; returns how many were written."""
+        if department is None:
+            # Cleared before reading, so attendance derived mid-run marks the month stale again
+            await db[TIMESHEET_STATE_COLLECTION].update_one(
+                {"_id": month}, {"$set": {"stale": False, "computed_at": datetime.utcnow()}}, upsert=True
+            )
+        try:
+            timesheets = self.compute(await self.load_month(db, month, department), month)
+            for start in range(0, len(timesheets), WRITE_BATCH_SIZE):
+                await db[TIMESHEET_COLLECTION].bulk_write([
+                    ReplaceOne({"employee_id": sheet["employee_id"], "month": month}, sheet, upsert=True)
+                    for sheet in timesheets[start:start + WRITE_BATCH_SIZE]
+                ], ordered=False)
+        except BaseException:
+            if department is None:
+                # The stored rows were not all rewritten: leave the month for the next read to retry
+                await mark_months_stale(db, [month])
+            raise
+        return len(timesheets)
+
+    def refresh(self, db, month: str) -> asyncio.Task:
+        """
+        Recompute a whole month in the background. Callers for a month already
+        being recomputed get the running task, so a burst of reads of a stale
+        month runs one recompute, not one each.
+        """
+        task = self._refreshes.get(month)
+        if task is None:
+            task = asyncio.create_task(self.run(db, month))
+            self._refreshes[month] = task
+            task.add_done_callback(lambda done: self._refreshed(month, done))
+        return task
+
+    def _refreshed(self, month: str, task: asyncio.Task):
+        self._refreshes.pop(month, None)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Timesheet recompute for {month} failed: {task.exception()}")
+
+    async def shutdown(self):
+        tasks = list(self._refreshes.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# Singleton instance
+timesheet_engine = TimesheetEngine(
+    shift_start=os.getenv("TIMESHEET_SHIFT_START", "09:30"),
+    grace_minutes=int(os.getenv("TIMESHEET_GRACE_MINUTES", "10")),
+    standard_hours=float(os.getenv("TIMESHEET_STANDARD_HOURS", "8")),
+    overtime_after_hours=float(os.getenv("TIMESHEET_OVERTIME_AFTER_HOURS", "9")),
+)
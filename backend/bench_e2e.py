@@ -0,0 +1,316 @@
+"""
+End-to-end benchmark of app.main:socket_app against a local mongod.
+
+HTTP scenarios run in-process through httpx's ASGI transport; the Socket.IO
+scenario needs a real socket, so the same app is also served by an in-process
+uvicorn on an ephemeral port. Seed a database first (seed_dataset.py) and point
+MONGO_DB_NAME at it -- the check-in and payroll scenarios write data.
+
+    MONGO_DB_NAME=ys_bench python bench_e2e.py --save-baseline bench_baseline.json
+    MONGO_DB_NAME=ys_bench python bench_e2e.py --compare bench_baseline.json
+
+Requires httpx, uvicorn and python-socketio's asyncio client (aiohttp).
+"""
+import argparse
+import asyncio
+import json
+import sys
+import os
+import time
+from datetime import datetime
+
+# Add the current directory to sys.path to make the app module importable
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+import socketio
+import uvicorn
+
+from app.main import app, socket_app
+
+# A real month in a year no live payroll uses, so the bench never touches real records
+BENCH_PAYROLL_MONTH = "January"
+BENCH_PAYROLL_YEAR = 1970
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class ScenarioResult:
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies = []
+        self.errors = 0
+        self.wall_seconds = 0.0
+
+    def summary(self) -> dict:
+        values = sorted(self.latencies)
+        return {
+            "ops": len(values),
+            "errors": self.errors,
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+            "throughput_ops": round(len(values) / self.wall_seconds, 2) if self.wall_seconds else 0.0,
+        }
+
+
+async def run_scenario(name: str, op, iterations: int, concurrency: int) -> ScenarioResult:
+    """Run `op(i)` `iterations` times from `concurrency` workers; op returns True on success."""
+    result = ScenarioResult(name)
+    counter = iter(range(iterations))
+
+    async def worker():
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                ok = await op(i)
+            except Exception as e:
+                print(f"  {name}: {e}")
+                ok = False
+            result.latencies.append(time.perf_counter() - start)
+            if not ok:
+                result.errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.wall_seconds = time.perf_counter() - started
+    return result
+
+
+class Bench:
+    def __init__(self, args):
+        self.args = args
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=socket_app), base_url="http://bench", timeout=120)
+        self.db = None
+        self.server = None
+        self.port = None
+
+    async def start(self):
+        # ASGITransport doesn't send lifespan events; run the startup hooks ourselves
+        await app.router.startup()
+        self.db = app.database
+
+        config = uvicorn.Config(socket_app, host="127.0.0.1", port=0, lifespan="off", log_level="warning")
+        self.server = uvicorn.Server(config)
+        self.server_task = asyncio.create_task(self.server.serve())
+        while not self.server.started:
+            await asyncio.sleep(0.05)
+        self.port = self.server.servers[0].sockets[0].getsockname()[1]
+
+    async def stop(self):
+        await self.db["payroll"].delete_many({"month": BENCH_PAYROLL_MONTH, "year": BENCH_PAYROLL_YEAR})
+        await self.db["payroll_jobs"].delete_many({"month": BENCH_PAYROLL_MONTH, "year": BENCH_PAYROLL_YEAR})
+        self.server.should_exit = True
+        await self.server_task
+        await self.client.aclose()
+        await app.router.shutdown()
+
+    async def login(self, email: str) -> str:
+        response = await self.client.post("/auth/token", data={"username": email, "password": self.args.password})
+        response.raise_for_status()
+        return response.json()["access_token"]
+
+    async def prepare(self):
+        employees = await self.db["employees"].find(
+            {"status": "Active"}, {"email": 1}
+        ).limit(self.args.burst_size).to_list(self.args.burst_size)
+        if len(employees) < 2:
+            raise SystemExit("Need at least two active employees; run seed_dataset.py first")
+
+        self.employee_ids = [str(e["_id"]) for e in employees]
+        self.employee_emails = [e["email"] for e in employees]
+        self.employer_token = await self.login(self.args.employer_email)
+        self.employee_token = await self.login(self.employee_emails[0])
+        self.peer_token = await self.login(self.employee_emails[1])
+
+        peer = await self.client.get("/auth/users/me", headers=self.auth(self.peer_token))
+        conversation = await self.client.post(
+            "/chat/conversations",
+            json={"type": "direct", "participants": [peer.json()["_id"]]},
+            headers=self.auth(self.employee_token),
+        )
+        self.conversation_id = conversation.json()["_id"]
+
+    @staticmethod
+    def auth(token: str) -> dict:
+        return {"Authorization": f"Bearer {token}"}
+
+    # --- Scenarios ---
+
+    async def op_login(self, i):
+        email = self.employee_emails[i % len(self.employee_emails)]
+        response = await self.client.post("/auth/token", data={"username": email, "password": self.args.password})
+        return response.status_code == 200
+
+    async def op_dashboard_employer(self, i):
+        response = await self.client.get("/dashboard/stats", headers=self.auth(self.employer_token))
+        return response.status_code == 200
+
+    async def op_dashboard_employee(self, i):
+        response = await self.client.get("/dashboard/stats", headers=self.auth(self.employee_token))
+        return response.status_code == 200
+
+    async def op_chat_send(self, i):
+        response = await self.client.post(
+            "/chat/messages",
+            json={"conversation_id": self.conversation_id, "content": f"bench message {i}"},
+            headers=self.auth(self.employee_token),
+        )
+        return response.status_code == 200
+
+    async def op_chat_history(self, i):
+        response = await self.client.get(
+            f"/chat/conversations/{self.conversation_id}/messages", headers=self.auth(self.peer_token)
+        )
+        return response.status_code == 200
+
+    async def op_checkin_burst(self, i):
+        """Every employee in the burst checks in and out concurrently."""
+        async def punch(employee_id):
+            check_in = await self.client.post("/attendance/checkin", json={"employee_id": employee_id})
+            check_out = await self.client.post("/attendance/checkout", json={"employee_id": employee_id})
+            return check_in.status_code == 200 and check_out.status_code == 200
+
+        results = await asyncio.gather(*(punch(e) for e in self.employee_ids))
+        return all(results)
+
+    async def op_payroll_generate(self, i):
+        """Queue a payroll job and wait for it to complete."""
+        response = await self.client.post(
+            "/payroll/generate", json={"month": BENCH_PAYROLL_MONTH, "year": BENCH_PAYROLL_YEAR}
+        )
+        if response.status_code != 202:
+            return False
+        job_id = response.json()["job_id"]
+        while True:
+            job = (await self.client.get(f"/payroll/jobs/{job_id}")).json()
+            if job["status"] in ("completed", "failed"):
+                return job["status"] == "completed"
+            await asyncio.sleep(0.05)
+
+    async def chat_round_trips(self, iterations: int) -> ScenarioResult:
+        """Socket.IO send_message from one client until the other receives new_message."""
+        url = f"http://127.0.0.1:{self.port}"
+        sender, receiver = socketio.AsyncClient(), socketio.AsyncClient()
+        waiting = {}
+
+        @receiver.on("new_message")
+        async def on_message(data):
+            future = waiting.pop(data.get("bench_seq"), None)
+            if future and not future.done():
+                future.set_result(time.perf_counter())
+
+        await sender.connect(url, auth={"token": self.employee_token}, transports=["websocket"])
+        await receiver.connect(url, auth={"token": self.peer_token}, transports=["websocket"])
+        await receiver.emit("join_conversation", {"conversation_id": self.conversation_id})
+        await asyncio.sleep(0.2)
+
+        loop = asyncio.get_running_loop()
+
+        async def op(i):
+            future = waiting[i] = loop.create_future()
+            await sender.emit("send_message", {"conversation_id": self.conversation_id, "content": "ping", "bench_seq": i})
+            await asyncio.wait_for(future, timeout=5)
+            return True
+
+        # Round trips are serial so each one is attributable
+        result = await run_scenario("chat_receive_socketio", op, iterations, 1)
+        await sender.disconnect()
+        await receiver.disconnect()
+        return result
+
+    async def run(self) -> dict:
+        args = self.args
+        await self.start()
+        try:
+            await self.prepare()
+            scenarios = [
+                ("login", self.op_login, args.iterations, args.concurrency),
+                ("dashboard_employer", self.op_dashboard_employer, args.iterations, args.concurrency),
+                ("dashboard_employee", self.op_dashboard_employee, args.iterations, args.concurrency),
+                ("chat_send", self.op_chat_send, args.iterations, args.concurrency),
+                ("chat_history", self.op_chat_history, args.iterations, args.concurrency),
+                ("attendance_checkin_burst", self.op_checkin_burst, args.bursts, 1),
+                ("payroll_generate", self.op_payroll_generate, args.payroll_runs, 1),
+            ]
+            results = {}
+            for name, op, iterations, concurrency in scenarios:
+                if args.only and name not in args.only:
+                    continue
+                print(f"Running {name}...")
+                results[name] = (await run_scenario(name, op, iterations, concurrency)).summary()
+
+            if not args.only or "chat_receive_socketio" in args.only:
+                print("Running chat_receive_socketio...")
+                results["chat_receive_socketio"] = (await self.chat_round_trips(args.iterations)).summary()
+            return results
+        finally:
+            await self.stop()
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Scenarios whose p95 grew, or throughput shrank, by more than `tolerance`."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        if previous["throughput_ops"] and current["throughput_ops"] < previous["throughput_ops"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {previous['throughput_ops']}/s -> {current['throughput_ops']}/s")
+        if current["errors"] > previous["errors"]:
+            regressions.append(f"{name}: errors {previous['errors']} -> {current['errors']}")
+    return regressions
+
+
+def print_table(results: dict):
+    print(f"\n{'scenario':<26}{'ops':>7}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>10}")
+    print("-" * 78)
+    for name, r in results.items():
+        print(f"{name:<26}{r['ops']:>7}{r['errors']:>5}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['throughput_ops']:>10}")
+
+
+async def main(args) -> int:
+    results = await Bench(args).run()
+    print_table(results)
+
+    report = {"generated_at": datetime.utcnow().isoformat(), "config": vars(args), "scenarios": results}
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline saved to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\nREGRESSIONS (tolerance {args.tolerance:.0%}):")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print(f"\nNo regressions against {args.compare} (tolerance {args.tolerance:.0%}).")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end HTTP + Socket.IO benchmark")
+    parser.add_argument("--iterations", type=int, default=200, help="operations per request scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--bursts", type=int, default=5, help="check-in bursts")
+    parser.add_argument("--burst-size", type=int, default=200, help="employees per check-in burst")
+    parser.add_argument("--payroll-runs", type=int, default=3)
+    parser.add_argument("--employer-email", default="employer@ys.local")
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--only", nargs="*", help="run only these scenarios")
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--compare", metavar="PATH")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative slowdown")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,99 @@
+"""
+Micro-benchmark: vectorised PayrollEngine vs the scalar reference calculation
+on a synthetic company (no database needed). Also cross-checks the results.
+
+    python bench_payroll.py --employees 20000
+"""
+import argparse
+import random
+import sys
+import os
+import time
+
+# Add the current directory to sys.path to make the app module importable
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from app.services.payroll_engine import COMPONENTS, PayrollEngine, reference_payroll
+
+TOTALS = ("basic_salary", "total_allowances", "total_deductions", "net_salary", "lop_deduction")
+MONTH_WORKING_DAYS = 22
+
+
+def synthetic_employees(count: int, structured_ratio: float, seed: int) -> list:
+    rng = random.Random(seed)
+    employees = []
+    for i in range(count):
+        emp = {"_id": f"{i:024x}", "first_name": "Bench", "last_name": str(i), "salary": rng.randrange(300_000, 4_000_000, 1000)}
+        if rng.random() < structured_ratio:
+            gross = emp["salary"] / 12
+            emp["salary_structure"] = {
+                "basic_salary": round(gross * rng.uniform(0.4, 0.6), 2),
+                "hra": round(gross * 0.2, 2),
+                "special_allowance": round(gross * rng.uniform(0.1, 0.3), 2),
+                "medical_allowance": 1250.0,
+                "pf_deduction": round(gross * 0.06, 2),
+                "professional_tax": 200.0,
+                "tds": round(gross * rng.uniform(0.05, 0.2), 2),
+            }
+        employees.append(emp)
+    return employees
+
+
+def synthetic_inputs(count: int, seed: int) -> list:
+    """Attendance inputs as MonthAttendance.inputs produces them; most employees lose no pay."""
+    rng = random.Random(seed + 1)
+    return [
+        {"days_present": 20.0, "leave_days": 2.0, "lop_days": float(rng.choice((0, 0, 0, 0.5, 1, 3))), "month_working_days": MONTH_WORKING_DAYS}
+        for _ in range(count)
+    ]
+
+
+def best_of(repeat: int, fn) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main(args) -> int:
+    employees = synthetic_employees(args.employees, args.structured_ratio, args.seed)
+    inputs = synthetic_inputs(args.employees, args.seed)
+    engine = PayrollEngine()
+
+    scalar = [reference_payroll(emp, values) for emp, values in zip(employees, inputs)]
+    vectorised = engine.compute(engine.load(employees, inputs))
+
+    # Cross-check: both round to cents, so allow one cent for binary rounding differences
+    worst = max(
+        float(np.max(np.abs(np.round(vectorised[name], 2) - np.array([row[name] for row in scalar]))))
+        for name in TOTALS
+    )
+    print(f"{args.employees} employees ({args.structured_ratio:.0%} with a salary structure, {len(COMPONENTS)} components)")
+    print(f"max difference vs reference: {worst:.4f}")
+
+    scalar_seconds = best_of(args.repeat, lambda: [reference_payroll(emp, values) for emp, values in zip(employees, inputs)])
+    load_seconds = best_of(args.repeat, lambda: engine.load(employees, inputs))
+    columns = engine.load(employees, inputs)
+    compute_seconds = best_of(args.repeat, lambda: engine.compute(columns))
+
+    print(f"\n{'implementation':<28}{'best ms':>10}")
+    print("-" * 38)
+    print(f"{'scalar reference':<28}{scalar_seconds * 1000:>10.1f}")
+    print(f"{'vectorised load':<28}{load_seconds * 1000:>10.1f}")
+    print(f"{'vectorised compute':<28}{compute_seconds * 1000:>10.1f}")
+    print(f"{'vectorised total':<28}{(load_seconds + compute_seconds) * 1000:>10.1f}")
+    print(f"\nspeed-up: {scalar_seconds / (load_seconds + compute_seconds):.1f}x")
+    return 0 if worst <= 0.01 + 1e-9 else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vectorised vs scalar payroll calculation")
+    parser.add_argument("--employees", type=int, default=20000)
+    parser.add_argument("--structured-ratio", type=float, default=0.3, help="share of employees with a salary_structure")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,54 @@
+import asyncio
+import sys
+import os
+
+# Add the current directory to sys.path to make the app module importable
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import db_manager
+# Importing the routers registers their indexes and query shapes
+from app.routes import attendance, auth, chat, leaves, payroll, recruitment
+from app.services.index_registry import IndexBuildError, index_registry
+
+async def check_indexes(apply: bool, rebuild: bool):
+    db = db_manager.connect()
+
+    if apply:
+        print("Applying registered indexes...")
+        try:
+            await index_registry.ensure_indexes(db)
+        except IndexBuildError as e:
+            print(f"FAILED: {e}")
+
+    if rebuild:
+        # Drops and recreates conflicting indexes: run it in a maintenance window, not from the app
+        print("Rebuilding indexes whose definition changed...")
+        for name in await index_registry.rebuild_indexes(db):
+            print(f"rebuilt {name}")
+
+    print("--- Index definitions ---")
+    status = await index_registry.index_status(db)
+    for entry in status:
+        marker = "[CONFLICT]" if entry["state"] == "conflict" else "[MISSING] "
+        print(f"{marker} {entry['collection']}.{entry['index']} {entry.get('detail', '')}")
+    if not status:
+        print("All registered indexes match.")
+
+    print("\n--- Query plan report ---")
+    collscans = 0
+    for q in await index_registry.explain_queries(db):
+        if "error" in q:
+            print(f"[ERROR]    {q['query']}: {q['error']}")
+            continue
+        marker = "[COLLSCAN]" if q["collscan"] else "[OK]      "
+        if q["collscan"]:
+            collscans += 1
+        print(f"{marker} {q['query']} -> {' > '.join(q['stages'])} {q['index'] or ''}")
+
+    db_manager.close()
+    print(f"\n{collscans} query shape(s) fall back to COLLSCAN, {len(status)} index(es) missing or conflicting.")
+    return collscans == 0 and not status
+
+if __name__ == "__main__":
+    ok = asyncio.run(check_indexes(apply="--apply" in sys.argv, rebuild="--rebuild" in sys.argv))
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,78 @@
+import os
+import uuid
+
+import pytest
+import pytest_asyncio
+
+# Tests that need a database run against a throwaway one here, and skip when none is reachable
+MONGO_TEST_URL = os.getenv("MONGO_TEST_URL", "mongodb://localhost:27017")
+
+
+@pytest.fixture
+def n_plus_one_guard():
+    """
+    Fails the test if any request it drives issues the same query shape
+    N_PLUS_ONE_THRESHOLD (default 5) or more times. Requests must go through
+    the app (e.g. httpx.AsyncClient with ASGITransport) so the metrics middleware sees them.
+    """
+    from app.services.n_plus_one import n_plus_one_detector
+
+    was_enabled = n_plus_one_detector.enabled
+    n_plus_one_detector.enabled = True
+    seen = len(n_plus_one_detector.violations)
+    try:
+        yield n_plus_one_detector
+    finally:
+        n_plus_one_detector.enabled = was_enabled
+
+    violations = n_plus_one_detector.violations[seen:]
+    if violations:
+        pytest.fail("N+1 queries detected:\n" + n_plus_one_detector.format_violations(violations), pytrace=False)
+
+
+@pytest.fixture(scope="session")
+def mongo_available() -> bool:
+    from pymongo import MongoClient
+    from pymongo.errors import PyMongoError
+
+    try:
+        MongoClient(MONGO_TEST_URL, serverSelectionTimeoutMS=1000).admin.command("ping")
+    except PyMongoError:
+        return False
+    return True
+
+
+@pytest_asyncio.fixture
+async def db(mongo_available):
+    """
+    A fresh database, dropped afterwards. Its client carries the app's
+    command listeners, so n_plus_one_guard sees the test's queries.
+    """
+    if not mongo_available:
+        pytest.skip(f"No MongoDB at {MONGO_TEST_URL} (set MONGO_TEST_URL)")
+    from motor.motor_asyncio import AsyncIOMotorClient
+    import app.main  # noqa: F401 - registers the routers' indexes and the command listeners
+    from app.database import db_manager
+
+    client = AsyncIOMotorClient(MONGO_TEST_URL, event_listeners=db_manager.event_listeners)
+    name = f"ys_hr_test_{uuid.uuid4().hex[:12]}"
+    try:
+        yield client[name]
+    finally:
+        await client.drop_database(name)
+        client.close()
+
+
+@pytest_asyncio.fixture
+async def client(db):
+    """An httpx.AsyncClient that drives the app in-process against `db`; the app's own database is put back afterwards."""
+    httpx = pytest.importorskip("httpx")
+    from app.main import app
+
+    previous = getattr(app, "database", None)
+    app.database = db
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            yield client
+    finally:
+        app.database = previous
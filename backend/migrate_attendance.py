@@ -0,0 +1,53 @@
+import argparse
+import asyncio
+import sys
+import os
+
+# Add the current directory to sys.path to make the app module importable
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import db_manager
+from app.services.attendance_schema import ATTENDANCE_SCHEMA_VERSION, dedupe_attendance_days, migrate_attendance
+# Importing the router registers its attendance indexes
+from app.routes import attendance
+from app.services.index_registry import IndexBuildError, index_registry
+from pymongo.errors import OperationFailure
+
+DAY_INDEX = "attendance.employee_id_1_date_1"
+
+async def run(args):
+    db = db_manager.connect()
+    pending = {"schema_version": {"$ne": ATTENDANCE_SCHEMA_VERSION}}
+
+    print(f"--- Attendance documents below schema v{ATTENDANCE_SCHEMA_VERSION} ---")
+    print(await db["attendance"].count_documents(pending))
+
+    if not args.dry_run:
+        print("\nMigrating...")
+        migrated = await migrate_attendance(db, batch_size=args.batch_size, restart=args.restart)
+        print(f"\n{migrated} documents migrated")
+
+        print("\n--- Remaining ---")
+        print(await db["attendance"].count_documents(pending))
+
+        # The unique (employee_id, date) index can only be built once duplicates are gone
+        print("\nRemoving duplicate day records...")
+        await dedupe_attendance_days(db)
+        print("Building attendance indexes...")
+        try:
+            # Replaces a non-unique (employee_id, date) index left by an older build
+            for name in await index_registry.rebuild_indexes(db, names=[DAY_INDEX]):
+                print(f"rebuilt {name}")
+            await index_registry.ensure_indexes(db)
+        except (IndexBuildError, OperationFailure) as e:
+            db_manager.close()
+            sys.exit(f"FAILED: {e}")
+
+    db_manager.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Normalise attendance documents to the current schema")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--restart", action="store_true", help="ignore the saved checkpoint and start from the first document")
+    parser.add_argument("--dry-run", action="store_true", help="only count unversioned documents")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,31 @@
+import asyncio
+import sys
+import os
+
+# Add the current directory to sys.path to make the app module importable
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import db_manager
+from app.services.id_resolver import count_legacy_ids, migrate_legacy_ids
+
+async def migrate_ids(dry_run: bool):
+    db = db_manager.connect()
+
+    print("--- Legacy-typed ids ---")
+    for field, count in (await count_legacy_ids(db)).items():
+        print(f"{field}: {count}")
+
+    if not dry_run:
+        print("\nMigrating...")
+        migrated = await migrate_legacy_ids(db)
+        for field, count in migrated.items():
+            print(f"{field}: {count} converted")
+
+        print("\n--- Remaining ---")
+        for field, count in (await count_legacy_ids(db)).items():
+            print(f"{field}: {count}")
+
+    db_manager.close()
+
+if __name__ == "__main__":
+    asyncio.run(migrate_ids(dry_run="--dry-run" in sys.argv))
@@ -0,0 +1,37 @@
+import argparse
+import asyncio
+import sys
+import os
+from datetime import date, timedelta
+
+# Add the current directory to sys.path to make the app module importable
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import db_manager
+from app.services.attendance_rollups import rebuild_rollups
+
+# Days recomputed per aggregation
+CHUNK_DAYS = 31
+
+async def run(args):
+    db = db_manager.connect()
+
+    if args.days:
+        dates = [(date.today() - timedelta(days=i)).isoformat() for i in range(args.days)]
+    else:
+        dates = sorted(await db["attendance"].distinct("date"))
+    print(f"Rebuilding attendance_daily for {len(dates)} days...")
+
+    groups = 0
+    for start in range(0, len(dates), CHUNK_DAYS):
+        chunk = dates[start:start + CHUNK_DAYS]
+        groups += await rebuild_rollups(db, chunk)
+        print(f"{chunk[0]} .. {chunk[-1]}: done")
+
+    print(f"\n{groups} (date, department) rollups written")
+    db_manager.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute the attendance_daily rollups from attendance records")
+    parser.add_argument("--days", type=int, help="only the last N days (default: every day with attendance)")
+    asyncio.run(run(parser.parse_args()))
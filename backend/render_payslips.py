@@ -0,0 +1,32 @@
+import argparse
+import asyncio
+import sys
+import os
+import time
+
+# Add the current directory to sys.path to make the app module importable
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import db_manager
+from app.services.payslips import payslip_renderer
+
+async def run(args):
+    db = db_manager.connect()
+    if args.workers:
+        payslip_renderer.pool_size = args.workers
+
+    print(f"Rendering payslips for {args.month} {args.year} with {payslip_renderer.pool_size} workers...")
+    started = time.perf_counter()
+    result = await payslip_renderer.render_period(db, args.month, args.year)
+    elapsed = time.perf_counter() - started
+
+    print(f"{result['rendered']} rendered, {result['records'] - result['rendered']} already on disk ({elapsed:.1f}s)")
+    await payslip_renderer.shutdown()
+    db_manager.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-render payslip PDFs for a payroll period into uploads/payslips/")
+    parser.add_argument("--month", required=True, help='payroll month as stored, e.g. "January"')
+    parser.add_argument("--year", type=int, required=True)
+    parser.add_argument("--workers", type=int, help="render processes (default: PAYSLIP_POOL_SIZE)")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,394 @@
+"""
+Seed a synthetic tenant at production scale for load testing.
+
+    python seed_dataset.py --employees 20000 --days 730 --messages 5000000 --drop
+
+Documents follow the shapes the routers write and read (including the legacy
+"09:00" check_in strings older attendance rows carry), and are bulk-inserted
+with insert_many in unordered batches. Every user's password is --password.
+"""
+import argparse
+import asyncio
+import random
+import sys
+import os
+import time
+from datetime import date, datetime, timedelta, timezone
+from bson import ObjectId
+
+# Add the current directory to sys.path to make the app module importable
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import db_manager
+from app.auth_utils import get_password_hash
+
+FIRST_NAMES = ["Aarav", "Vivaan", "Aditya", "Ananya", "Diya", "Ishaan", "Kavya", "Meera", "Rohan", "Sara",
+               "Arjun", "Nisha", "Rahul", "Priya", "Karan", "Fatima", "Hasheem", "Raees", "Zara", "Neha"]
+LAST_NAMES = ["Sharma", "Patel", "Khan", "Iyer", "Nair", "Reddy", "Gupta", "Singh", "Das", "Menon",
+              "Joshi", "Kapoor", "Yodhin", "Ali", "Rao", "Pillai", "Bose", "Mehta", "Shah", "Verma"]
+DEPARTMENTS = ["Engineering", "Sales", "Marketing", "Finance", "HR", "Operations", "Support", "Design"]
+ROLES = ["Software Engineer", "Senior Engineer", "Account Executive", "Analyst", "Manager", "Designer", "Associate"]
+LEAVE_TYPES = ["Annual Leave", "Sick Leave", "Casual Leave", "Maternity Leave", "Paternity Leave"]
+MONTHS = ["January", "February", "March", "April", "May", "June", "July",
+          "August", "September", "October", "November", "December"]
+CANDIDATE_STATUSES = ["New", "Screening", "Interview", "Offered", "Hired", "Rejected"]
+WORDS = ("please review the latest update on the project timeline and share feedback before the meeting "
+         "tomorrow thanks for the quick turnaround on the report lunch at one works for me").split()
+
+
+class Seeder:
+    def __init__(self, db, args):
+        self.db = db
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.semaphore = asyncio.Semaphore(args.concurrency)
+        self.pending = set()
+        self.inserted = {}
+        self.employees = []  # (employee_id, user_id, full_name, department, role, salary, joined)
+
+    async def insert(self, collection: str, docs: list):
+        """Queue one insert_many; at most --concurrency batches are in flight."""
+        await self.semaphore.acquire()
+
+        async def run():
+            try:
+                await self.db[collection].insert_many(docs, ordered=False)
+                self.inserted[collection] = self.inserted.get(collection, 0) + len(docs)
+            finally:
+                self.semaphore.release()
+
+        task = asyncio.create_task(run())
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+
+    async def insert_stream(self, collection: str, docs):
+        batch = []
+        for doc in docs:
+            batch.append(doc)
+            if len(batch) >= self.args.batch_size:
+                await self.insert(collection, batch)
+                batch = []
+        if batch:
+            await self.insert(collection, batch)
+        await self.flush()
+        print(f"  {collection}: {self.inserted.get(collection, 0)} documents")
+
+    async def flush(self):
+        if self.pending:
+            await asyncio.gather(*list(self.pending))
+
+    def sentence(self, words: int = 8) -> str:
+        return " ".join(self.rng.choice(WORDS) for _ in range(words)).capitalize()
+
+    # --- Employees & users ---
+
+    def employees_and_users(self):
+        today = date.today()
+        hashed_password = get_password_hash(self.args.password)
+        employees, users = [], []
+
+        # One employer account to log in with
+        users.append({
+            "_id": ObjectId(),
+            "email": "employer@ys.local",
+            "full_name": "YS Employer",
+            "role": "Employer",
+            "hashed_password": hashed_password,
+            "is_active": True,
+            "is_online": False,
+            "current_status": "offline",
+            "two_factor_enabled": False,
+            "password_reset_requested": False,
+        })
+
+        for i in range(self.args.employees):
+            first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+            email = f"{first}.{last}.{i}@ys.local".lower()
+            department = self.rng.choice(DEPARTMENTS)
+            role = self.rng.choice(ROLES)
+            joined = today - timedelta(days=self.rng.randint(0, 365 * 6))
+            salary = float(self.rng.randrange(300_000, 3_000_000, 10_000))
+            status = self.rng.choices(["Active", "On Leave", "Terminated"], weights=[92, 5, 3])[0]
+            employee_id, user_id = ObjectId(), ObjectId()
+
+            employees.append({
+                "_id": employee_id,
+                "employee_id": f"EMP{i + 1:05d}",
+                "first_name": first,
+                "last_name": last,
+                "email": email,
+                "phone": f"+91{self.rng.randint(7_000_000_000, 9_999_999_999)}",
+                "role": role,
+                "department": department,
+                "status": status,
+                "date_of_joining": joined.isoformat(),
+                "relieving_date": None,
+                "salary": salary,
+            })
+            users.append({
+                "_id": user_id,
+                "email": email,
+                "full_name": f"{first} {last}",
+                "role": "Employee",
+                "hashed_password": hashed_password,
+                "is_active": status != "Terminated",
+                "department": department,
+                "joining_date": joined.isoformat(),
+                "designation": role,
+                "dob": date(self.rng.randint(1970, 2002), self.rng.randint(1, 12), self.rng.randint(1, 28)).isoformat(),
+                "is_online": False,
+                "current_status": "offline",
+                "two_factor_enabled": False,
+                "password_reset_requested": False,
+            })
+            self.employees.append((employee_id, user_id, f"{first} {last}", department, role, salary, joined))
+        return employees, users
+
+    # --- Attendance ---
+
+    def attendance(self):
+        today = date.today()
+        legacy_cutoff = today - timedelta(days=int(self.args.days * self.args.legacy_ratio))
+        for offset in range(self.args.days, 0, -1):
+            day = today - timedelta(days=offset)
+            if day.weekday() >= 5:
+                continue
+            for employee_id, _, name, department, _, _, joined in self.employees:
+                if joined > day:
+                    continue
+                status = self.rng.choices(["Present", "Absent", "On Leave", "Half-Day"], weights=[85, 5, 7, 3])[0]
+                doc = {
+                    "employee_id": str(employee_id),
+                    "employee_name": name,
+                    "department": department,
+                    "date": day.isoformat(),
+                    "check_in": None,
+                    "check_out": None,
+                    "status": status,
+                    "work_hours": 0.0,
+                    "break_time": 0,
+                    "location": self.rng.choice(["Office", "Office", "Remote"]),
+                }
+                if status in ("Present", "Half-Day"):
+                    start = datetime(day.year, day.month, day.day, 3, 0, tzinfo=timezone.utc) + timedelta(minutes=self.rng.randint(0, 150))
+                    hours = self.rng.uniform(3.5, 5) if status == "Half-Day" else self.rng.uniform(7, 10)
+                    end = start + timedelta(hours=hours)
+                    work_hours = 9.0 if hours >= 8 else round(hours, 2)
+                    doc["work_hours"] = work_hours
+                    doc["break_time"] = 60 if work_hours >= 9 else 30 if work_hours >= 4 else 0
+                    if day < legacy_cutoff:
+                        # Older rows: "HH:MM" strings or ISO strings, and some missing optional fields
+                        if self.rng.random() < 0.5:
+                            doc["check_in"], doc["check_out"] = start.strftime("%H:%M"), end.strftime("%H:%M")
+                        else:
+                            doc["check_in"], doc["check_out"] = start.replace(tzinfo=None).isoformat(), end.replace(tzinfo=None).isoformat()
+                        for field in ("department", "break_time", "location"):
+                            if self.rng.random() < 0.2:
+                                doc.pop(field)
+                    else:
+                        doc["check_in"], doc["check_out"] = start, end
+                yield doc
+
+    # --- Chat ---
+
+    def conversations(self):
+        users = [(str(user_id), name) for _, user_id, name, *_ in self.employees]
+        conversations = []
+        now = datetime.utcnow()
+        for i in range(self.args.conversations):
+            kind = self.rng.choices(["direct", "group", "ai"], weights=[75, 20, 5])[0]
+            if kind == "ai":
+                members = [self.rng.choice(users)]
+            elif kind == "group":
+                members = self.rng.sample(users, min(len(users), self.rng.randint(3, 12)))
+            else:
+                members = self.rng.sample(users, min(len(users), 2))
+            created = now - timedelta(days=self.rng.randint(1, self.args.days))
+            conversations.append({
+                "_id": ObjectId(),
+                "type": kind,
+                "name": "YS AI" if kind == "ai" else (f"{self.rng.choice(DEPARTMENTS)} Team {i}" if kind == "group" else None),
+                "participants": [user_id for user_id, _ in members],
+                "members": members,
+                "created_at": created,
+                "updated_at": created,
+                "last_message": None,
+                "last_message_time": None,
+            })
+        return conversations
+
+    def messages(self, conversations):
+        now = datetime.utcnow()
+        for i in range(self.args.messages):
+            conv = conversations[i % len(conversations)]
+            if conv["type"] == "ai" and self.rng.random() < 0.5:
+                sender_id, sender_name, metadata = "YS_AI_BOT", "YS AI", {"is_ai": True}
+            else:
+                sender_id, sender_name = self.rng.choice(conv["members"])
+                metadata = None
+            timestamp = now - timedelta(seconds=self.rng.randint(0, self.args.days * 86400))
+            if conv["last_message_time"] is None or timestamp > conv["last_message_time"]:
+                conv["last_message_time"] = timestamp
+            deleted = self.rng.random() < 0.01
+            yield {
+                "conversation_id": str(conv["_id"]),
+                "sender_id": sender_id,
+                "sender_name": sender_name,
+                "content": "This message was deleted" if deleted else self.sentence(self.rng.randint(3, 20)),
+                "attachments": [],
+                "message_type": "text",
+                "metadata": metadata,
+                "timestamp": timestamp,
+                "read_by": [sender_id],
+                "edited": False,
+                "deleted": deleted,
+            }
+
+    # --- Leaves, payroll, recruitment ---
+
+    def leaves(self):
+        today = date.today()
+        for _, user_id, name, department, role, _, _ in self.employees:
+            for _ in range(self.rng.randint(0, self.args.leaves_per_employee)):
+                start = today - timedelta(days=self.rng.randint(-30, self.args.days))
+                applied = start - timedelta(days=self.rng.randint(1, 20))
+                yield {
+                    "leave_type": self.rng.choice(LEAVE_TYPES),
+                    "start_date": start.isoformat(),
+                    "end_date": (start + timedelta(days=self.rng.randint(0, 4))).isoformat(),
+                    "reason": self.sentence(6),
+                    "user_id": str(user_id),
+                    "employee_name": name,
+                    "department": department,
+                    "designation": role,
+                    "profile_photo": None,
+                    "status": self.rng.choices(["Approved", "Pending", "Rejected"], weights=[70, 20, 10])[0],
+                    "applied_on": applied.isoformat(),
+                    "comment": None,
+                }
+
+    def payroll(self):
+        today = date.today()
+        for back in range(self.args.months, 0, -1):
+            month_index = (today.month - 1 - back) % 12
+            year = today.year + (today.month - 1 - back) // 12
+            generated = datetime(year, month_index + 1, 28)
+            for employee_id, _, name, _, _, salary, joined in self.employees:
+                if joined > generated.date():
+                    continue
+                monthly_gross = salary / 12
+                basic = monthly_gross * 0.5
+                deductions = basic * 0.12 + 200 + monthly_gross * 0.1
+                yield {
+                    "employee_id": str(employee_id),
+                    "employee_name": name,
+                    "month": MONTHS[month_index],
+                    "year": year,
+                    "basic_salary": round(basic, 2),
+                    "total_allowances": round(monthly_gross * 0.5, 2),
+                    "total_deductions": round(deductions, 2),
+                    "net_salary": round(monthly_gross - deductions, 2),
+                    "status": "Paid" if back > 1 else "Processed",
+                    "generated_at": generated,
+                }
+
+    def jobs(self):
+        now = datetime.utcnow()
+        return [{
+            "_id": ObjectId(),
+            "title": self.rng.choice(ROLES),
+            "department": self.rng.choice(DEPARTMENTS),
+            "location": self.rng.choice(["Bengaluru", "Kochi", "Remote"]),
+            "type": self.rng.choice(["Full-time", "Part-time", "Contract"]),
+            "description": self.sentence(15),
+            "status": self.rng.choices(["Open", "Closed", "Draft"], weights=[60, 30, 10])[0],
+            "created_at": now - timedelta(days=self.rng.randint(0, self.args.days)),
+        } for _ in range(self.args.jobs)]
+
+    def candidates(self, jobs):
+        for i in range(self.args.candidates):
+            job = self.rng.choice(jobs)
+            first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+            yield {
+                "job_id": str(job["_id"]),
+                "first_name": first,
+                "last_name": last,
+                "email": f"{first}.{last}.c{i}@example.com".lower(),
+                "phone": None,
+                "resume_link": None,
+                "status": self.rng.choice(CANDIDATE_STATUSES),
+                "applied_at": job["created_at"] + timedelta(days=self.rng.randint(0, 60)),
+            }
+
+    async def run(self):
+        started = time.perf_counter()
+
+        print("Seeding employees and users...")
+        employees, users = self.employees_and_users()
+        await self.insert_stream("employees", employees)
+        await self.insert_stream("users", users)
+
+        print("Seeding attendance...")
+        await self.insert_stream("attendance", self.attendance())
+
+        print("Seeding conversations and messages...")
+        conversations = self.conversations() if self.employees else []
+        if conversations:
+            await self.insert_stream("messages", self.messages(conversations))
+            for conv in conversations:
+                conv.pop("members")
+                if conv["last_message_time"]:
+                    conv["updated_at"] = conv["last_message_time"]
+                    conv["last_message"] = "New message"
+            await self.insert_stream("conversations", conversations)
+
+        print("Seeding leaves...")
+        await self.insert_stream("leaves", self.leaves())
+
+        print("Seeding payroll history...")
+        await self.insert_stream("payroll", self.payroll())
+
+        print("Seeding recruitment...")
+        jobs = self.jobs()
+        if jobs:
+            await self.insert_stream("jobs", jobs)
+            await self.insert_stream("candidates", self.candidates(jobs))
+
+        elapsed = time.perf_counter() - started
+        total = sum(self.inserted.values())
+        print(f"\nInserted {total} documents in {elapsed:.1f}s ({total / elapsed:.0f} docs/s)")
+        print("Run rebuild_rollups.py to populate the attendance_daily rollups for the seeded history.")
+
+
+async def seed(args):
+    db = db_manager.connect()
+    if args.db:
+        db = db_manager.client[args.db]
+
+    if args.drop:
+        print(f"Dropping seeded collections in {db.name}...")
+        for collection in ("employees", "users", "attendance", "attendance_daily", "conversations", "messages", "leaves", "payroll", "jobs", "candidates"):
+            await db.drop_collection(collection)
+
+    await Seeder(db, args).run()
+    db_manager.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed a synthetic YS HR tenant for load testing")
+    parser.add_argument("--employees", type=int, default=20000)
+    parser.add_argument("--days", type=int, default=730, help="days of attendance history")
+    parser.add_argument("--conversations", type=int, default=20000)
+    parser.add_argument("--messages", type=int, default=5_000_000)
+    parser.add_argument("--leaves-per-employee", type=int, default=6)
+    parser.add_argument("--months", type=int, default=24, help="months of payroll history")
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--candidates", type=int, default=20000)
+    parser.add_argument("--legacy-ratio", type=float, default=0.5, help="oldest share of attendance stored in legacy formats")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=4, help="insert_many batches in flight")
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", default=None, help="target database (default: ys_hr_db)")
+    parser.add_argument("--drop", action="store_true", help="drop the seeded collections first")
+    asyncio.run(seed(parser.parse_args()))
@@ -0,0 +1,135 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+
+from app.services.attendance_events import CHECKPOINT_ID, EVENTS_COLLECTION, AttendanceEventDeriver, backfill_derived_flags, derive_pending, punch_event
+from app.services.index_registry import index_registry
+
+
+async def _employees(db, count: int):
+    employees = [
+        {"_id": ObjectId(), "first_name": f"First{n}", "last_name": "Last", "email": f"e{n}@example.com", "department": "Engineering", "status": "Active"}
+        for n in range(count)
+    ]
+    await db["employees"].insert_many(employees)
+    return employees
+
+
+@pytest.mark.asyncio
+async def test_punches_derive_into_day_records(db, client, n_plus_one_guard):
+    await index_registry.ensure_indexes(db)
+    [employee] = await _employees(db, 1)
+    payload = {"employee_id": str(employee["_id"])}
+
+    checked_in = await client.post("/attendance/checkin", json=payload)
+    twice = await client.post("/attendance/checkin", json=payload)
+    checked_out = await client.post("/attendance/checkout", json=payload)
+    stray = await client.post("/attendance/checkout", json=payload)
+    unknown = await client.post("/attendance/checkin", json={"employee_id": str(ObjectId())})
+
+    assert checked_in.status_code == 200 and checked_out.status_code == 200
+    assert twice.status_code == 400 and twice.json()["detail"] == "Already checked in. Please check out first."
+    assert stray.status_code == 400 and stray.json()["detail"] == "No check-in record found for today"
+    assert unknown.status_code == 404
+
+    assert await derive_pending(db) == 2
+    assert await db[EVENTS_COLLECTION].count_documents({"derived": False}) == 0
+    record = await db["attendance"].find_one({"employee_id": str(employee["_id"])})
+    assert record["check_in"] is not None and record["check_out"] is not None
+
+
+@pytest.mark.asyncio
+async def test_batch_ingest_is_one_round_trip_per_batch(db, client, n_plus_one_guard):
+    await index_registry.ensure_indexes(db)
+    employees = await _employees(db, 20)
+    at = datetime.now(timezone.utc).replace(microsecond=0) - timedelta(minutes=5)
+    punches = [{"employee_id": str(emp["_id"]), "timestamp": at.isoformat(), "direction": "in", "device": "gate-1"} for emp in employees]
+    punches.append({"employee_id": str(ObjectId()), "timestamp": at.isoformat(), "direction": "in"})
+    # An ObjectId in upper case still resolves to its employee
+    punches.append({"employee_id": str(employees[0]["_id"]).upper(), "timestamp": (at + timedelta(minutes=1)).isoformat(), "direction": "out"})
+
+    first = (await client.post("/attendance/punches:batch", json={"punches": punches})).json()
+    resent = (await client.post("/attendance/punches:batch", json={"punches": punches})).json()
+    await derive_pending(db)
+
+    assert (first["accepted"], first["rejected"], first["duplicate"]) == (21, 1, 0)
+    assert (resent["accepted"], resent["rejected"], resent["duplicate"]) == (0, 1, 21)
+    assert await db["attendance"].count_documents({}) == 20
+
+
+@pytest.mark.asyncio
+async def test_late_event_behind_derived_ones_is_still_derived(db):
+    await index_registry.ensure_indexes(db)
+    [employee] = await _employees(db, 1)
+    entry = {"_id": str(employee["_id"]), "name": "First0 Last", "department": "Engineering"}
+    now = datetime.now(timezone.utc)
+    await db[EVENTS_COLLECTION].insert_one(punch_event(entry, now - timedelta(hours=1), "in"))
+    assert await derive_pending(db) == 1
+
+    # Committed late by another worker: its _id sorts before the event already derived
+    late = punch_event(entry, now - timedelta(minutes=30), "out")
+    late["_id"] = ObjectId.from_datetime(now - timedelta(days=1))
+    await db[EVENTS_COLLECTION].insert_one(late)
+    assert await derive_pending(db) == 1
+
+    record = await db["attendance"].find_one({"employee_id": entry["_id"]})
+    assert record["check_out"] is not None
+
+
+@pytest.mark.asyncio
+async def test_backfill_converts_the_old_checkpoint(db):
+    ids = [ObjectId() for _ in range(3)]
+    await db[EVENTS_COLLECTION].insert_many([{"_id": event_id, "employee_id": "x", "date": "2024-01-01"} for event_id in ids])
+    await db["checkpoints"].insert_one({"_id": CHECKPOINT_ID, "last_id": ids[1]})
+
+    assert await backfill_derived_flags(db) == 1
+    assert [event["derived"] async for event in db[EVENTS_COLLECTION].find({}).sort("_id", 1)] == [True, True, False]
+    assert "last_id" not in await db["checkpoints"].find_one({"_id": CHECKPOINT_ID})
+    assert await backfill_derived_flags(db) == 0
+
+
+@pytest.mark.asyncio
+async def test_one_leader_derives(db):
+    first, second = AttendanceEventDeriver(lease_seconds=60), AttendanceEventDeriver(lease_seconds=60)
+    assert [await first._acquire(db), await second._acquire(db), await first._acquire(db)] == [True, False, True]
+
+    # The leader stops renewing: once its lease lapses the other worker takes over
+    await db["checkpoints"].update_one({"_id": CHECKPOINT_ID}, {"$set": {"lease_until": datetime.utcnow() - timedelta(seconds=1)}})
+    assert [await second._acquire(db), await first._acquire(db)] == [True, False]
+
+    # A clean stop hands the lease over at once
+    second.leader, second._db = True, db
+    await second.stop()
+    assert await first._acquire(db)
+
+
+@pytest.mark.asyncio
+async def test_racing_punches_make_one_transition(db, client):
+    await index_registry.ensure_indexes(db)
+    [employee] = await _employees(db, 1)
+    payload = {"employee_id": str(employee["_id"])}
+
+    # A double tap: every request reads "not checked in" before any of them inserts
+    check_ins = await asyncio.gather(*(client.post("/attendance/checkin", json=payload) for _ in range(5)))
+    check_outs = await asyncio.gather(*(client.post("/attendance/checkout", json=payload) for _ in range(5)))
+
+    assert sorted(r.status_code for r in check_ins) == [200, 400, 400, 400, 400]
+    assert sorted(r.status_code for r in check_outs) == [200, 400, 400, 400, 400]
+    assert {r.json()["detail"] for r in check_outs if r.status_code == 400} == {"No check-in record found for today"}
+    events = await db[EVENTS_COLLECTION].find({}).sort("at", 1).to_list(None)
+    assert [event["direction"] for event in events] == ["in", "out"]
+    assert events[0]["after"] is None and events[1]["after"] == events[0]["_id"]
+
+    # The responses come from the punches themselves
+    [checked_in] = [r.json() for r in check_ins if r.status_code == 200]
+    [checked_out] = [r.json() for r in check_outs if r.status_code == 200]
+    assert checked_in["_id"] == str(events[0]["_id"]) and checked_in["check_out"] is None
+    # The stored check-in (read back at millisecond precision) opened the session being closed
+    assert abs(datetime.fromisoformat(checked_out["check_in"]) - datetime.fromisoformat(checked_in["check_in"])) < timedelta(milliseconds=1)
+    assert checked_out["check_out"] is not None
+    assert checked_out["work_hours"] >= 0.0
+
+    await derive_pending(db)
+    assert await db["attendance"].count_documents({"employee_id": str(employee["_id"])}) == 1
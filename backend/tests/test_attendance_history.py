@@ -0,0 +1,58 @@
+import base64
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from app.routes.attendance import _decode_cursor, _encode_cursor
+
+
+def test_cursor_round_trip():
+    document = {"date": "2024-01-02", "_id": ObjectId()}
+    assert _decode_cursor(_encode_cursor(document)) == ("2024-01-02", document["_id"])
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    base64.urlsafe_b64encode(b"2024-01-02").decode(),
+    base64.urlsafe_b64encode(b"2024-01-02|not-an-object-id").decode(),
+    base64.urlsafe_b64encode(b"\xff\xfe|").decode(),
+])
+def test_malformed_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        _decode_cursor(cursor)
+    assert error.value.status_code == 400 and error.value.detail == "Invalid cursor"
+
+
+async def _history(db, days: int):
+    await db["attendance"].insert_many([
+        {"employee_id": "e1", "employee_name": "Ada", "date": f"2024-01-{day:02d}", "status": "Present", "schema_version": 1}
+        for day in range(1, days + 1)
+    ])
+
+
+@pytest.mark.asyncio
+async def test_without_limit_or_cursor_the_whole_history_is_returned(db, client):
+    await _history(db, 5)
+
+    response = await client.get("/attendance/")
+
+    assert [row["date"] for row in response.json()] == [f"2024-01-{day:02d}" for day in range(5, 0, -1)]
+    assert "X-Next-Cursor" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_pages_follow_the_cursor(db, client, n_plus_one_guard):
+    await _history(db, 5)
+
+    dates, cursor = [], None
+    for _ in range(5):
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = await client.get("/attendance/", params=params)
+        dates.append([row["date"] for row in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    assert dates == [["2024-01-05", "2024-01-04"], ["2024-01-03", "2024-01-02"], ["2024-01-01"]]
+    assert (await client.get("/attendance/", params={"cursor": "garbage"})).status_code == 400
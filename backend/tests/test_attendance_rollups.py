@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+
+from app.services.attendance_events import derive_pending, punch_event
+from app.services.attendance_rollups import ROLLUP_COLLECTION, ROLLUP_COUNTERS, rebuild_rollups, rollup_deltas
+from app.services.index_registry import index_registry
+
+DAY = "2024-01-02"
+
+
+def _record(employee_id: str, **fields) -> dict:
+    return {"employee_id": employee_id, "date": DAY, "department": "Engineering", **fields}
+
+
+def test_new_day_record_counts_as_present_and_live():
+    after = [_record("a", status="Present", check_in=datetime(2024, 1, 2, 9), check_out=None, work_hours=0.0)]
+    assert rollup_deltas([], after) == {(DAY, "Engineering"): {"present": 1, "on_leave": 0, "live": 1, "total_hours": 0.0}}
+
+
+def test_check_out_moves_live_and_hours_only():
+    checked_in = _record("a", status="Present", check_in=datetime(2024, 1, 2, 9), check_out=None, work_hours=0.0)
+    checked_out = {**checked_in, "check_out": datetime(2024, 1, 2, 17, 30), "work_hours": 8.5}
+    assert rollup_deltas([checked_in], [checked_out]) == {(DAY, "Engineering"): {"present": 0, "on_leave": 0, "live": -1, "total_hours": 8.5}}
+
+
+def test_unchanged_records_add_no_delta():
+    records = [
+        _record("a", status="Present", check_in=datetime(2024, 1, 2, 9), check_out=datetime(2024, 1, 2, 17), work_hours=8.1),
+        _record("b", status="On Leave", department=None),
+    ]
+    # Re-deriving a batch rewrites the same records
+    assert rollup_deltas(records, [dict(record) for record in records]) == {}
+
+
+def test_department_change_moves_the_record_between_rollups():
+    before = _record("a", status="Present", check_in=datetime(2024, 1, 2, 9), check_out=datetime(2024, 1, 2, 12), work_hours=3.1)
+    after = {**before, "department": None, "work_hours": 3.3}
+    deltas = rollup_deltas([before], [after])
+    assert deltas[(DAY, "Engineering")] == {"present": -1, "on_leave": 0, "live": 0, "total_hours": -3.1}
+    # A missing department rolls up under "N/A", as rebuild_rollups groups it
+    assert deltas[(DAY, "N/A")] == {"present": 1, "on_leave": 0, "live": 0, "total_hours": 3.3}
+
+
+def test_hours_deltas_carry_no_float_noise():
+    before = _record("a", check_in=datetime(2024, 1, 2, 9), check_out=datetime(2024, 1, 2, 9, 6), work_hours=0.1)
+    after = {**before, "work_hours": 0.3}
+    assert rollup_deltas([before], [after])[(DAY, "Engineering")]["total_hours"] == 0.2
+
+
+async def _rollups(db) -> dict:
+    return {
+        (rollup["date"], rollup["department"]): {name: round(rollup[name], 2) for name in ROLLUP_COUNTERS}
+        async for rollup in db[ROLLUP_COLLECTION].find({})
+    }
+
+
+@pytest.mark.asyncio
+async def test_derived_deltas_match_a_rebuild(db):
+    await index_registry.ensure_indexes(db)
+    entries = [
+        {"_id": str(ObjectId()), "name": f"Employee {n}", "department": department}
+        for n, department in enumerate(["Engineering", "Engineering", "Sales"])
+    ]
+    start = datetime.now(timezone.utc).replace(microsecond=0) - timedelta(hours=3)
+    batches = [
+        [punch_event(entry, start, "in") for entry in entries],
+        [punch_event(entries[0], start + timedelta(hours=1), "out"), punch_event(entries[2], start + timedelta(hours=2), "out")],
+        # Re-opened after checking out
+        [punch_event(entries[0], start + timedelta(hours=2), "in")],
+    ]
+    for batch in batches:
+        await db["attendance_events"].insert_many(batch)
+        await derive_pending(db)
+
+    derived = await _rollups(db)
+    await rebuild_rollups(db, await db["attendance"].distinct("date"))
+    assert derived == await _rollups(db)
+    assert sum(counts["live"] for counts in derived.values()) == 2
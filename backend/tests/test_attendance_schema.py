@@ -0,0 +1,113 @@
+from datetime import datetime, timezone
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+from app.services.attendance_schema import ATTENDANCE_SCHEMA_VERSION, MIGRATION_ID, dedupe_attendance_days, migrate_attendance, normalize_attendance, parse_punch_time
+from app.services.index_registry import IndexBuildError, index_registry
+
+NINE_THIRTY = datetime(2024, 1, 2, 9, 30, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("value,day,expected", [
+    (None, "2024-01-02", None),
+    ("", "2024-01-02", None),
+    ("09:30", "2024-01-02", NINE_THIRTY),
+    # A bare "HH:MM" means nothing without its day
+    ("09:30", None, None),
+    ("2024-01-02T09:30:00", None, NINE_THIRTY),
+    ("2024-01-02T15:00:00+05:30", None, NINE_THIRTY),
+    (datetime(2024, 1, 2, 9, 30), None, NINE_THIRTY),
+    (NINE_THIRTY, None, NINE_THIRTY),
+    ("half past nine", "2024-01-02", None),
+    (930, "2024-01-02", None),
+])
+def test_parse_punch_time(value, day, expected):
+    assert parse_punch_time(value, day) == expected
+
+
+def test_normalize_legacy_document():
+    employee_id = ObjectId()
+    normalized = normalize_attendance({
+        "employee_id": employee_id, "date": "2024-01-02", "check_in": "09:30", "check_out": "2024-01-02T18:00:00",
+        "status": "Half-Day", "work_hours": "4", "break_time": "15",
+    })
+    assert normalized == {
+        "employee_id": str(employee_id),
+        "check_in": NINE_THIRTY,
+        "check_out": datetime(2024, 1, 2, 18, 0, tzinfo=timezone.utc),
+        "status": "Half-Day",
+        "work_hours": 4.0,
+        "break_time": 15,
+        "department": "N/A",
+        "location": "Office",
+        "schema_version": ATTENDANCE_SCHEMA_VERSION,
+    }
+
+
+def test_normalize_fills_missing_fields():
+    normalized = normalize_attendance({"date": "2024-01-02"})
+    assert (normalized["check_in"], normalized["check_out"], normalized["status"]) == (None, None, "Absent")
+    assert (normalized["work_hours"], normalized["break_time"], normalized["department"], normalized["location"]) == (0.0, 0, "N/A", "Office")
+    assert "employee_id" not in normalized
+
+
+def test_missing_status_follows_the_check_in():
+    assert normalize_attendance({"date": "2024-01-02", "check_in": "09:30"})["status"] == "Present"
+    # An unparseable check-in is no evidence of attendance
+    assert normalize_attendance({"date": "2024-01-02", "check_in": "late"})["status"] == "Absent"
+    assert normalize_attendance({"date": "2024-01-02", "check_in": "09:30", "status": "Absent"})["status"] == "Absent"
+
+
+@pytest.mark.asyncio
+async def test_migration_resumes_after_its_checkpoint(db):
+    ids = [ObjectId() for _ in range(5)]
+    await db["attendance"].insert_many([{"_id": _id, "employee_id": "e1", "date": f"2024-01-0{n + 1}", "check_in": "09:30"} for n, _id in enumerate(ids)])
+
+    class Interrupted(Exception):
+        pass
+
+    def crash_after_first_batch(message):
+        if "documents migrated" in message:
+            raise Interrupted()
+
+    with pytest.raises(Interrupted):
+        await migrate_attendance(db, batch_size=2, log=crash_after_first_batch)
+    checkpoint = await db["migrations"].find_one({"_id": MIGRATION_ID})
+    assert (checkpoint["last_id"], checkpoint["migrated"]) == (ids[1], 2)
+
+    # The rerun picks up after the checkpoint instead of rescanning from the start
+    messages = []
+    assert await migrate_attendance(db, batch_size=2, log=messages.append) == 5
+    assert messages[0] == f"Resuming {MIGRATION_ID} after {ids[1]} (2 migrated so far)"
+    assert await db["attendance"].count_documents({"schema_version": ATTENDANCE_SCHEMA_VERSION, "status": "Present"}) == 5
+    assert "completed_at" in await db["migrations"].find_one({"_id": MIGRATION_ID})
+
+    # restart drops the checkpoint; every document is already current, so nothing is rewritten
+    assert await migrate_attendance(db, restart=True, log=messages.append) == 0
+
+
+@pytest.mark.asyncio
+async def test_unique_day_index_needs_the_dedupe_first(db):
+    employee_id = str(ObjectId())
+    await db["attendance"].insert_many([
+        {"employee_id": employee_id, "date": "2024-01-02", "work_hours": 4.0},
+        {"employee_id": employee_id, "date": "2024-01-02", "work_hours": 8.0},
+        {"employee_id": employee_id, "date": "2024-01-03", "work_hours": 8.0},
+    ])
+    await db["attendance_events"].insert_one({"employee_id": employee_id, "date": "2024-01-02", "derived": True})
+
+    # Duplicates left by racing check-ins: the unique index can't be built, and that is fatal
+    with pytest.raises(IndexBuildError):
+        await index_registry.ensure_indexes(db)
+
+    assert await dedupe_attendance_days(db, log=lambda message: None) == 1
+    await index_registry.ensure_indexes(db)
+    kept = await db["attendance"].find_one({"employee_id": employee_id, "date": "2024-01-02"})
+    assert kept["work_hours"] == 8.0
+    # The day's punches are derived again so the kept record regains every punch
+    assert await db["attendance_events"].count_documents({"derived": False}) == 1
+    with pytest.raises(DuplicateKeyError):
+        await db["attendance"].insert_one({"employee_id": employee_id, "date": "2024-01-03"})
+    assert await dedupe_attendance_days(db, log=lambda message: None) == 0
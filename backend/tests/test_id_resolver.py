@@ -0,0 +1,69 @@
+import pytest
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+from app.services.id_resolver import canonical_id, count_legacy_ids, id_candidates, id_match, legacy_id_filter, migrate_legacy_ids
+
+OID = ObjectId("65a0000000000000000000ab")
+
+
+@pytest.mark.parametrize("value", [OID, "65a0000000000000000000ab", "65A0000000000000000000AB"])
+def test_canonical_id_is_the_lower_case_hex_string(value):
+    assert canonical_id(value) == "65a0000000000000000000ab"
+
+
+def test_canonical_id_leaves_other_ids_alone():
+    assert canonical_id("EMP-7") == "EMP-7"
+    assert canonical_id(7) == "7"
+
+
+def test_id_match_covers_both_stored_types():
+    assert id_match(OID) == {"$in": [OID, "65a0000000000000000000ab"]}
+    assert id_match("65a0000000000000000000ab") == {"$in": ["65a0000000000000000000ab", OID]}
+    # Not an ObjectId: matched as-is, without an $in
+    assert id_match("EMP-7") == "EMP-7"
+    assert id_candidates("EMP-7") == ["EMP-7"]
+
+
+def test_legacy_filter_only_matches_convertible_strings():
+    assert legacy_id_filter("_id", "string") == {"_id": {"$type": "string", "$regex": "^[0-9a-fA-F]{24}$"}}
+    assert legacy_id_filter("employee_id", "objectId") == {"employee_id": {"$type": "objectId"}}
+
+
+def _employee(_id, email: str) -> dict:
+    return {"_id": _id, "first_name": "Ada", "last_name": "Lovelace", "email": email}
+
+
+@pytest.mark.asyncio
+async def test_migration_finishes_an_interrupted_run(db):
+    interrupted, legacy = ObjectId(), ObjectId()
+    await db["employees"].insert_many([
+        # A run that stopped between inserting the ObjectId copy and deleting the string one
+        _employee(str(interrupted), "ada@example.com"),
+        _employee(interrupted, "ada@example.com"),
+        _employee(str(legacy), "grace@example.com"),
+        _employee("EMP-7", "alan@example.com"),
+    ])
+    await db["attendance"].insert_one({"employee_id": legacy, "date": "2024-01-02"})
+
+    migrated = await migrate_legacy_ids(db)
+
+    assert migrated == {"attendance.employee_id": 1, "payroll.employee_id": 0, "employees._id": 2}
+    assert sorted(map(str, await db["employees"].distinct("_id"))) == sorted([str(interrupted), str(legacy), "EMP-7"])
+    assert await db["employees"].count_documents({"_id": {"$type": "objectId"}}) == 2
+    assert (await db["attendance"].find_one({}))["employee_id"] == str(legacy)
+    # Nothing is left to convert, and a rerun changes nothing
+    assert set((await count_legacy_ids(db)).values()) == {0}
+    assert set((await migrate_legacy_ids(db)).values()) == {0}
+
+
+@pytest.mark.asyncio
+async def test_migration_keeps_an_employee_it_cannot_convert(db):
+    await db["employees"].create_index("email", unique=True)
+    legacy = str(ObjectId())
+    await db["employees"].insert_one(_employee(legacy, "ada@example.com"))
+
+    # The ObjectId copy clashes with the string one on email, not on _id
+    with pytest.raises(DuplicateKeyError):
+        await migrate_legacy_ids(db)
+    assert await db["employees"].count_documents({"_id": legacy}) == 1
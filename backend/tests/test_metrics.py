@@ -0,0 +1,135 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import metrics
+from app.services.metrics import CommandCounter, Counter, Histogram, RequestMetrics, RequestMetricsMiddleware, render_prometheus
+
+
+@pytest.fixture
+def fresh_metrics(monkeypatch):
+    """Module-level request metrics and command counter that start empty."""
+    request_metrics, command_counter = RequestMetrics(), CommandCounter()
+    monkeypatch.setattr(metrics, "request_metrics", request_metrics)
+    monkeypatch.setattr(metrics, "command_counter", command_counter)
+    return request_metrics, command_counter
+
+
+def _command(name: str):
+    return SimpleNamespace(command_name=name, command={name: "employees", "filter": {}})
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.5, 3.0):
+        histogram.observe(("GET", "/a"), value)
+    histogram.observe(("GET", "/b"), 0.1)
+
+    lines = []
+    histogram.render("latency", ("method", "route"), lines)
+    assert lines == [
+        'latency_bucket{method="GET",route="/a",le="0.1"} 1',
+        'latency_bucket{method="GET",route="/a",le="1.0"} 2',
+        'latency_bucket{method="GET",route="/a",le="+Inf"} 3',
+        'latency_sum{method="GET",route="/a"} 3.55',
+        'latency_count{method="GET",route="/a"} 3',
+        # A value on a bound falls in that bucket
+        'latency_bucket{method="GET",route="/b",le="0.1"} 1',
+        'latency_bucket{method="GET",route="/b",le="1.0"} 1',
+        'latency_bucket{method="GET",route="/b",le="+Inf"} 1',
+        'latency_sum{method="GET",route="/b"} 0.1',
+        'latency_count{method="GET",route="/b"} 1',
+    ]
+
+
+def test_label_values_are_escaped():
+    counter = Counter()
+    counter.inc(('say "hi"\\\n',), 2)
+    lines = []
+    counter.render("things_total", ("name",), lines)
+    assert lines == ['things_total{name="say \\"hi\\"\\\\\\n"} 2']
+
+
+def test_prometheus_text_format(fresh_metrics):
+    request_metrics, command_counter = fresh_metrics
+    request_metrics.observe("GET", "/employees/{id}", 200, 0.02, 3)
+    command_counter.started(_command("find"))
+    command_counter.failed(_command("insert"))
+
+    text = render_prometheus({"workers_busy": ("Busy workers", "gauge", 2)})
+
+    assert text.endswith("\n")
+    lines = text.splitlines()
+    assert "# TYPE http_request_duration_seconds histogram" in lines
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/employees/{id}",le="0.025"} 1' in lines
+    assert 'http_request_mongo_commands_bucket{method="GET",route="/employees/{id}",le="2"} 0' in lines
+    assert 'http_request_mongo_commands_bucket{method="GET",route="/employees/{id}",le="5"} 1' in lines
+    assert 'http_requests_total{method="GET",route="/employees/{id}",status="200"} 1' in lines
+    assert 'mongo_commands_total{command="find"} 1' in lines
+    assert 'mongo_command_failures_total{command="insert"} 1' in lines
+    assert lines[-3:] == ["# HELP workers_busy Busy workers", "# TYPE workers_busy gauge", "workers_busy 2"]
+
+
+async def _call(app, scope: dict):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    return sent
+
+
+def _endpoint(status: int, route: str = None, commands: int = 0):
+    """A bare ASGI app standing in for the router: it records the matched route and issues Mongo commands."""
+
+    async def app(scope, receive, send):
+        if route is not None:
+            scope["route"] = SimpleNamespace(path=route)
+        for _ in range(commands):
+            metrics.command_counter.started(_command("find"))
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    return app
+
+
+@pytest.mark.asyncio
+async def test_middleware_labels_requests_by_route_template(fresh_metrics):
+    request_metrics, _ = fresh_metrics
+    for employee_id in ("1", "2"):
+        await _call(RequestMetricsMiddleware(_endpoint(200, "/employees/{id}", commands=2)), {"type": "http", "method": "GET", "path": f"/employees/{employee_id}"})
+    await _call(RequestMetricsMiddleware(_endpoint(404)), {"type": "http", "method": "GET", "path": "/nowhere"})
+
+    assert request_metrics.requests.series == {("GET", "/employees/{id}", "200"): 2, ("GET", "<unmatched>", "404"): 1}
+    # Both requests' commands were counted against them, not just globally
+    assert request_metrics.mongo_commands.series[("GET", "/employees/{id}")][-2:] == [4.0, 2]
+
+
+@pytest.mark.asyncio
+async def test_middleware_records_a_failed_handler_as_500(fresh_metrics):
+    request_metrics, _ = fresh_metrics
+
+    async def broken(scope, receive, send):
+        scope["route"] = SimpleNamespace(path="/payroll/generate")
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await _call(RequestMetricsMiddleware(broken), {"type": "http", "method": "POST", "path": "/payroll/generate"})
+    assert request_metrics.requests.series == {("POST", "/payroll/generate", "500"): 1}
+    assert metrics.current_request_stats.get() is None
+
+
+@pytest.mark.asyncio
+async def test_middleware_ignores_other_scopes(fresh_metrics):
+    request_metrics, _ = fresh_metrics
+    seen = []
+
+    async def lifespan(scope, receive, send):
+        seen.append(scope["type"])
+
+    await _call(RequestMetricsMiddleware(lifespan), {"type": "lifespan"})
+    assert seen == ["lifespan"] and request_metrics.requests.series == {}
@@ -0,0 +1,62 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.services.n_plus_one import NPlusOneDetector, QueryProfile, command_shape
+
+
+def _find(collection: str, predicate: dict):
+    return SimpleNamespace(command_name="find", command={"find": collection, "filter": predicate})
+
+
+def test_values_are_blanked_out_of_the_shape():
+    assert command_shape(_find("employees", {"_id": 1})) == command_shape(_find("employees", {"_id": 2}))
+    assert command_shape(_find("employees", {"_id": 1})) != command_shape(_find("employees", {"email": 1}))
+    assert command_shape(_find("employees", {"_id": 1})) != command_shape(_find("users", {"_id": 1}))
+    assert command_shape(_find("employees", {"_id": {"$in": [1, 2]}})) == command_shape(_find("employees", {"_id": {"$in": [3, 4]}}))
+    update = SimpleNamespace(command_name="update", command={"update": "attendance", "updates": [{"q": {"date": "2024-01-02"}, "u": {}}]})
+    assert command_shape(update) == ("update", "attendance", (("date", "?"),))
+    assert command_shape(SimpleNamespace(command_name="getMore", command={"getMore": 1})) is None
+
+
+def test_profile_reports_shapes_at_the_threshold():
+    async def request():
+        profile = QueryProfile(threshold=3)
+        for value in range(3):
+            profile.record(_find("employees", {"_id": value}))
+        for value in range(2):
+            profile.record(_find("attendance", {"employee_id": value}))
+        profile.record(SimpleNamespace(command_name="getMore", command={"getMore": 1}))
+        return profile.violations()
+
+    [violation] = asyncio.run(request())
+    assert violation["count"] == 3
+    assert violation["shape"] == "find employees {_id: ?}"
+
+
+def test_profile_captures_the_call_site():
+    async def handler():
+        profile = QueryProfile(threshold=2)
+        profile.record(_find("employees", {"_id": 1}))
+        profile.record(_find("employees", {"_id": 2}))
+        return profile.violations()
+
+    [violation] = asyncio.run(handler())
+    assert any("in handler" in line for line in violation["call_site"])
+
+
+def test_detector_collects_violations_only_when_enabled():
+    assert NPlusOneDetector(enabled=False).start() is None
+    detector = NPlusOneDetector(enabled=True, threshold=2)
+
+    async def request():
+        profile = detector.start()
+        for value in range(2):
+            profile.record(_find("employees", {"_id": value}))
+        detector.finish(profile, "/employees/")
+        detector.finish(None, "/health")
+
+    asyncio.run(request())
+
+    [violation] = detector.violations
+    assert violation["route"] == "/employees/"
+    assert "/employees/: find employees {_id: ?} x2" in detector.format_violations(detector.violations)
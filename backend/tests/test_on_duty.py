@@ -0,0 +1,137 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import orjson
+import pytest
+
+from app.services import on_duty as on_duty_module
+from app.services.attendance_events import punch_event
+from app.services.on_duty import EMPLOYER_ROOM, ON_DUTY_CHANNEL, OnDutyRegistry
+from app.services.punches import punch_day
+
+AT = datetime(2024, 1, 2, 12, 0, tzinfo=timezone.utc)
+ADA = {"_id": "65a000000000000000000001", "name": "Ada Lovelace", "department": "Engineering"}
+GRACE = {"_id": "65a000000000000000000002", "name": "Grace Hopper", "department": "Research"}
+
+
+class Today:
+    def __init__(self, day: str):
+        self.day = day
+
+    def __call__(self) -> str:
+        return self.day
+
+
+@pytest.fixture
+def today(monkeypatch):
+    today = Today(punch_day(AT))
+    monkeypatch.setattr(on_duty_module, "_today", today)
+    return today
+
+
+def _entry(employee: dict, at: datetime) -> dict:
+    return OnDutyRegistry()._entry(punch_event(employee, at, "in"))
+
+
+def test_fold_tracks_check_ins_and_outs(today):
+    registry = OnDutyRegistry()
+    checked_in = _entry(ADA, AT)
+
+    assert registry._fold("in", checked_in) == ("checked_in", checked_in)
+    # A repeated check-in changes nothing
+    assert registry._fold("in", _entry(ADA, AT + timedelta(minutes=1))) is None
+    # Check-out announces the entry it closes
+    assert registry._fold("out", _entry(ADA, AT + timedelta(hours=1))) == ("checked_out", checked_in)
+    assert registry._fold("out", _entry(GRACE, AT)) is None
+    assert registry.snapshot() == []
+
+
+def test_fold_ignores_punches_behind_the_latest(today):
+    registry = OnDutyRegistry()
+    registry._fold("in", _entry(ADA, AT))
+    registry._fold("out", _entry(ADA, AT + timedelta(hours=1)))
+
+    # A check-in that arrives late, from before the check-out, does not reopen the day
+    assert registry._fold("in", _entry(ADA, AT + timedelta(minutes=30))) is None
+    assert registry._fold("in", {**_entry(GRACE, AT), "time": None}) is None
+    assert registry._fold("in", _entry(GRACE, AT - timedelta(days=1))) is None
+    assert registry.stats()["on_duty"] == 0
+
+
+def test_day_rollover_drops_yesterdays_entries(today):
+    registry = OnDutyRegistry()
+    registry._fold("in", _entry(ADA, AT))
+    registry._fold("in", _entry(GRACE, AT))
+    registry._fold("out", _entry(GRACE, AT + timedelta(hours=1)))
+    assert [entry["name"] for entry in registry.snapshot()] == ["Ada Lovelace"]
+
+    # Nobody checked out at midnight; a new day starts empty
+    tomorrow = AT + timedelta(days=1)
+    today.day = punch_day(tomorrow)
+    assert registry.snapshot() == []
+    assert registry._last_punch == {}
+    assert registry._fold("in", _entry(ADA, tomorrow))[0] == "checked_in"
+    assert registry.stats()["on_duty"] == 1
+
+
+class FakeRedis:
+    def __init__(self):
+        self.published = []
+
+    async def publish(self, channel: str, message: bytes):
+        self.published.append((channel, message))
+
+
+class FakePubSub:
+    def __init__(self):
+        self.messages = asyncio.Queue()
+
+    async def listen(self):
+        while True:
+            yield await self.messages.get()
+
+
+class FakeSio:
+    def __init__(self):
+        self.emitted = []
+
+    async def emit(self, event: str, data: dict, room: str):
+        self.emitted.append((event, data, room))
+
+
+def _json_entry(employee: dict) -> dict:
+    return orjson.loads(orjson.dumps(_entry(employee, AT)))
+
+
+@pytest.mark.asyncio
+async def test_deltas_reach_the_other_workers(today):
+    taking, other = OnDutyRegistry(), OnDutyRegistry()
+    taking._redis, taking.sio, other.sio = FakeRedis(), FakeSio(), FakeSio()
+    pubsub = FakePubSub()
+    listener = asyncio.create_task(other._listen(pubsub))
+    try:
+        await taking.apply(punch_event(ADA, AT, "in"))
+        await taking.apply(punch_event(ADA, AT + timedelta(minutes=1), "in"))
+
+        # Only the change is published, and the worker that took the punch emits it
+        [(channel, message)] = taking._redis.published
+        assert channel == ON_DUTY_CHANNEL
+        [(event, data, room)] = taking.sio.emitted
+        assert (event, data["action"], data["employee_id"], room) == ("on_duty_update", "checked_in", ADA["_id"], EMPLOYER_ROOM)
+
+        await pubsub.messages.put({"type": "subscribe", "data": 1})
+        # A worker's own delta comes back to it on the channel and is skipped
+        await pubsub.messages.put({"type": "message", "data": orjson.dumps({**orjson.loads(message), "worker": other.worker_id, "entry": _json_entry(GRACE)})})
+        await pubsub.messages.put({"type": "message", "data": message})
+        for _ in range(100):
+            if other._entries:
+                break
+            await asyncio.sleep(0)
+    finally:
+        listener.cancel()
+        await asyncio.gather(listener, return_exceptions=True)
+
+    assert list(other._entries) == [ADA["_id"]]
+    assert other._entries[ADA["_id"]]["time"] == AT
+    # Dashboards already heard it from the worker that took the punch
+    assert other.sio.emitted == []
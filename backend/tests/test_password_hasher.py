@@ -0,0 +1,65 @@
+import asyncio
+import os
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.password_hasher import PasswordHasher
+from app.services.process_pool import ProcessPool
+
+
+class HeldPool(ProcessPool):
+    """Runs nothing in a process: calls wait until released."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = asyncio.Event()
+
+    async def run(self, fn, *args):
+        await self.release.wait()
+        if args == ("boom",):
+            raise ValueError("boom")
+        return f"hashed:{args[0]}"
+
+
+@pytest.mark.asyncio
+async def test_calls_beyond_the_queue_limit_get_503():
+    hasher = PasswordHasher(max_queue=2)
+    hasher.pool = HeldPool()
+    held = [asyncio.create_task(hasher.hash(password)) for password in ("a", "b")]
+    await asyncio.sleep(0)
+    assert hasher.stats()["in_flight"] == 2
+
+    with pytest.raises(HTTPException) as rejected:
+        await hasher.verify("c", "hashed:c")
+    assert rejected.value.status_code == 503
+    assert rejected.value.headers == {"Retry-After": "1"}
+    assert hasher.rejected == 1
+
+    hasher.pool.release.set()
+    assert await asyncio.gather(*held) == ["hashed:a", "hashed:b"]
+    assert hasher.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_a_failed_call_frees_its_slot():
+    hasher = PasswordHasher(max_queue=1)
+    hasher.pool = HeldPool()
+    hasher.pool.release.set()
+
+    with pytest.raises(ValueError):
+        await hasher.hash("boom")
+    assert await hasher.hash("a") == "hashed:a"
+    assert hasher.stats()["in_flight"] == 0 and hasher.rejected == 0
+
+
+@pytest.mark.asyncio
+async def test_process_pool_runs_calls_in_a_worker():
+    pool = ProcessPool(size=1)
+    try:
+        assert await pool.run(os.getpid) != os.getpid()
+    finally:
+        pool.shutdown()
+    # Shutting down twice is harmless
+    pool.shutdown()
+    assert pool._executor is None
@@ -0,0 +1,119 @@
+import random
+from datetime import date
+
+import numpy as np
+import pytest
+
+from app.services.payroll_attendance import MonthAttendance, month_name, period_month
+from app.services.payroll_engine import payroll_engine, payroll_fingerprint, reference_payroll
+
+
+def _employees(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    employees = []
+    for row in range(count):
+        emp = {"_id": f"{row:024x}", "first_name": f"First{row}", "last_name": "Last", "salary": rng.choice([0, 1, 360000, rng.uniform(1e5, 5e6)])}
+        if row % 3 == 0:
+            emp["salary_structure"] = {
+                "basic_salary": rng.uniform(1e4, 2e5),
+                "hra": rng.uniform(0, 5e4),
+                "special_allowance": rng.uniform(0, 5e4),
+                "medical_allowance": rng.choice([0, 1250]),
+                "pf_deduction": rng.uniform(0, 2e4),
+                "professional_tax": 200,
+                "tds": rng.uniform(0, 3e4),
+            }
+        employees.append(emp)
+    return employees
+
+
+# (lop_days, month_working_days): none, some, every day, more than the month, a month with no working days
+LOP_CASES = [(0, 22), (3.5, 22), (22, 22), (40, 22), (5, 0)]
+
+
+@pytest.mark.parametrize("lop_days,working_days", LOP_CASES)
+def test_engine_matches_reference(lop_days, working_days):
+    employees = _employees(60)
+    inputs = [{"days_present": 10.0, "leave_days": 1.0, "lop_days": float(lop_days), "month_working_days": working_days} for _ in employees]
+
+    records = payroll_engine.records(employees, "January", 2024, None, inputs)
+
+    for emp, values, record in zip(employees, inputs, records):
+        for field, value in reference_payroll(emp, values).items():
+            assert record[field] == pytest.approx(value, abs=0.01), (emp["_id"], field)
+        assert record["input_fingerprint"] == payroll_fingerprint(emp, values)
+
+
+def test_lop_never_exceeds_gross():
+    emp = _employees(1)[0]
+    full = reference_payroll(emp, {"lop_days": 22, "month_working_days": 22})
+    beyond = reference_payroll(emp, {"lop_days": 40, "month_working_days": 22})
+    assert beyond["lop_deduction"] == full["lop_deduction"] == pytest.approx(full["basic_salary"] + full["total_allowances"], abs=0.01)
+
+
+def test_engine_without_inputs_charges_no_lop():
+    employees = _employees(5)
+    for emp, record in zip(employees, payroll_engine.records(employees, "January", 2024, None)):
+        assert record["lop_deduction"] == 0.0
+        assert record["net_salary"] == pytest.approx(reference_payroll(emp)["net_salary"], abs=0.01)
+
+
+def test_fingerprint_tracks_the_payroll_inputs():
+    emp = _employees(1)[0]
+    assert payroll_fingerprint(emp) == payroll_fingerprint(dict(emp))
+    assert payroll_fingerprint(emp) != payroll_fingerprint({**emp, "salary": emp["salary"] + 1})
+    assert payroll_fingerprint(emp, {"lop_days": 1.0}) != payroll_fingerprint(emp, {"lop_days": 2.0})
+    assert payroll_fingerprint(emp, {"lop_days": 1.0}) == payroll_fingerprint(dict(emp), {"lop_days": 1.0})
+
+
+@pytest.mark.parametrize("value,expected", [("January", "January"), ("march", "March"), ("DECEMBER", "December"), ("1", "January"), (12, "December")])
+def test_month_name_accepts_names_and_numbers(value, expected):
+    assert month_name(value) == expected
+
+
+@pytest.mark.parametrize("value", ["Jan", "Sept", "0", "13", "", "Janvier", "2024-01"])
+def test_month_name_rejects_anything_else(value):
+    with pytest.raises(ValueError):
+        month_name(value)
+
+
+def test_period_month():
+    assert period_month("february", 2024) == "2024-02"
+    with pytest.raises(ValueError):
+        period_month("February", 0)
+
+
+def _attendance(by_employee=None, by_email=None, today=date(2024, 3, 15)):
+    # January 2024: 23 working days (Mon-Fri)
+    return MonthAttendance("2024-01", by_employee or {}, by_email or {}, today)
+
+
+def test_month_attendance_lop_days():
+    employees = [
+        {"_id": "a", "email": "a@example.com", "date_of_joining": "2020-01-01"},
+        # Present and on leave for more days than the month has: clipped to no LOP
+        {"_id": "b", "email": "B@Example.com", "date_of_joining": "2020-01-01"},
+        # Joined on Monday the 15th: only 13 working days are charged
+        {"_id": "c", "email": "c@example.com", "date_of_joining": "2024-01-15"},
+        # Joined after the month ended
+        {"_id": "d", "email": "d@example.com", "date_of_joining": "2024-02-01"},
+        {"_id": "e", "email": None, "date_of_joining": "not a date"},
+    ]
+    attendance = _attendance(
+        by_employee={"a": {"days_present": 20.5, "leave_days": 0}, "b": {"days_present": 20, "leave_days": 0}},
+        by_email={"b@example.com": {"days_present": 0, "leave_days": 10}},
+    )
+    columns = attendance.columns(employees)
+
+    assert attendance.month_working_days == 23
+    np.testing.assert_allclose(columns["working_days"], [23, 23, 13, 0, 23])
+    np.testing.assert_allclose(columns["lop_days"], [2.5, 0, 13, 0, 23])
+    assert attendance.inputs(columns, 1) == {"days_present": 20.0, "leave_days": 10.0, "lop_days": 0.0, "month_working_days": 23}
+
+
+def test_month_attendance_part_way_through_the_month():
+    # Through Wednesday the 10th: 8 working days have passed
+    attendance = _attendance(today=date(2024, 1, 10))
+    columns = attendance.columns([{"_id": "a", "date_of_joining": "2020-01-01"}])
+    assert columns["working_days"][0] == 8
+    assert attendance.month_working_days == 23
@@ -0,0 +1,50 @@
+import orjson
+import pytest
+from bson import ObjectId
+
+
+async def _payroll(db):
+    employees = [ObjectId(), ObjectId()]
+    await db["employees"].insert_many([
+        {"_id": employees[0], "first_name": "Ada", "department": "Engineering"},
+        {"_id": employees[1], "first_name": "Grace", "department": "Sales"},
+    ])
+    await db["payroll"].insert_many([
+        {"employee_id": str(employee_id), "employee_name": "x", "month": month, "year": 2024, "basic_salary": 1, "total_allowances": 0, "total_deductions": 0, "net_salary": 1}
+        for employee_id in employees
+        for month in ("February", "March")
+    ])
+    return employees
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("month", ["March", "march", "MARCH", "3", "03"])
+async def test_export_month_accepts_what_generate_accepts(db, client, month):
+    await _payroll(db)
+
+    response = await client.get("/payroll/export", params={"format": "ndjson", "month": month, "year": 2024})
+
+    assert response.status_code == 200
+    rows = [orjson.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == 2 and {row["month"] for row in rows} == {"March"}
+    assert 'filename="payroll-March-2024.ndjson"' in response.headers["content-disposition"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("month", ["Mar", "13", "2024-03", "Smarch"])
+async def test_export_rejects_an_unknown_month(db, client, month):
+    await _payroll(db)
+    response = await client.get("/payroll/export", params={"month": month})
+    assert response.status_code == 422
+    assert "Unknown payroll month" in response.json()["detail"]
+
+
+@pytest.mark.asyncio
+async def test_export_filters_compose(db, client):
+    engineering, sales = await _payroll(db)
+
+    by_department = await client.get("/payroll/export", params={"format": "ndjson", "month": "2", "department": "Engineering"})
+    outside = await client.get("/payroll/export", params={"format": "ndjson", "employee_id": str(sales).upper(), "department": "Engineering"})
+
+    assert [orjson.loads(line)["employee_id"] for line in by_department.text.splitlines()] == [str(engineering)]
+    assert outside.text == ""
@@ -0,0 +1,149 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from app.services.payroll_engine import reference_payroll
+from app.services.payroll_jobs import JOBS_COLLECTION, PayrollJobRunner, payroll_job_runner
+from app.services.payslips import payslip_renderer
+
+
+@pytest.fixture(autouse=True)
+def no_payslips(monkeypatch):
+    # Rendering after a run is covered in test_payslips; here it would only spawn a process pool
+    monkeypatch.setattr(payslip_renderer, "schedule_period", lambda db, month, year: None)
+
+
+async def _employees(db, count: int):
+    employees = [
+        {
+            "_id": ObjectId(), "first_name": f"First{n}", "last_name": "Last", "email": f"e{n}@example.com",
+            "department": "Engineering", "status": "Active", "date_of_joining": "2020-01-01", "salary": 600000 + n * 12000,
+        }
+        for n in range(count)
+    ]
+    await db["employees"].insert_many(employees)
+    return employees
+
+
+async def _run(runner: PayrollJobRunner, db, month: str = "January", force: bool = False) -> dict:
+    job = await runner.submit(db, month, 2024, force=force)
+    await asyncio.gather(*list(runner._tasks.values()))
+    return await db[JOBS_COLLECTION].find_one({"_id": job["_id"]})
+
+
+@pytest.mark.asyncio
+async def test_generate_and_poll(db, client, n_plus_one_guard):
+    employees = await _employees(db, 25)
+    await db["attendance"].insert_many([
+        {"employee_id": str(employees[0]["_id"]), "date": f"2024-01-{day:02d}", "status": "Present"} for day in (2, 3, 4)
+    ])
+    try:
+        queued = await client.post("/payroll/generate", json={"month": "1", "year": 2024})
+        job_id = queued.json()["job_id"]
+        for _ in range(100):
+            job = (await client.get(f"/payroll/jobs/{job_id}")).json()
+            if job["status"] not in ("queued", "running"):
+                break
+            await asyncio.sleep(0.05)
+        records = (await client.get(f"/payroll/jobs/{job_id}/records")).json()
+        invalid = await client.post("/payroll/generate", json={"month": "Smarch", "year": 2024})
+    finally:
+        await payroll_job_runner.stop(db)
+
+    assert queued.status_code == 202
+    assert job["status"] == "completed" and job["month"] == "January"
+    assert (job["processed"], job["written"], job["skipped"]) == (25, 25, 0)
+    assert "lease_token" not in job
+    assert invalid.status_code == 400
+
+    by_id = {str(emp["_id"]): emp for emp in employees}
+    assert len(records) == 25
+    for record in records:
+        # January 2024 has 23 working days
+        expected = reference_payroll(by_id[record["employee_id"]], {"lop_days": record["lop_days"], "month_working_days": 23})
+        assert record["net_salary"] == pytest.approx(expected["net_salary"], abs=0.01)
+    first = next(r for r in records if r["employee_id"] == str(employees[0]["_id"]))
+    assert (first["days_present"], first["lop_days"]) == (3.0, 20.0)
+
+
+@pytest.mark.asyncio
+async def test_unchanged_employees_are_skipped_unless_forced(db):
+    runner = PayrollJobRunner(chunk_size=4)
+    employees = await _employees(db, 10)
+    runs = [await _run(runner, db), await _run(runner, db)]
+    await db["employees"].update_one({"_id": employees[3]["_id"]}, {"$set": {"salary": 1}})
+    runs.append(await _run(runner, db))
+    runs.append(await _run(runner, db, force=True))
+
+    assert [(run["written"], run["skipped"]) for run in runs] == [(10, 0), (0, 10), (1, 9), (10, 0)]
+    assert await db["payroll"].count_documents({}) == 10
+
+
+@pytest.mark.asyncio
+async def test_interrupted_job_resumes_after_its_checkpoint(db):
+    employees = await _employees(db, 10)
+    now = datetime.utcnow().replace(microsecond=0)
+    # A run that died after checkpointing the first four employees; its lease has lapsed
+    job = {
+        "month": "January", "year": 2024, "status": "running", "active": True, "total": 10, "force": False,
+        "processed": 4, "written": 4, "skipped": 0, "last_employee_id": employees[3]["_id"],
+        "generated_at": now, "created_at": now, "updated_at": now,
+        "lease_until": now - timedelta(seconds=1), "lease_token": "dead-worker", "error": None,
+    }
+    job["_id"] = (await db[JOBS_COLLECTION].insert_one(job)).inserted_id
+    runner = PayrollJobRunner(chunk_size=3)
+    await runner.resume(db)
+    await asyncio.gather(*list(runner._tasks.values()))
+
+    job = await db[JOBS_COLLECTION].find_one({"_id": job["_id"]})
+    assert job["status"] == "completed" and not job["active"] and job["lease_token"] is None
+    assert job["processed"] == 10
+    assert sorted(await db["payroll"].distinct("employee_id")) == sorted(str(emp["_id"]) for emp in employees[4:])
+
+
+@pytest.mark.asyncio
+async def test_worker_that_lost_its_lease_stops(db):
+    await _employees(db, 6)
+    runner = PayrollJobRunner(chunk_size=2)
+    changed = runner._changed
+
+    async def taken_over(db_, job, employees, inputs):
+        # Another worker claims the job while this one is mid-chunk
+        await db[JOBS_COLLECTION].update_one({"_id": job["_id"]}, {"$set": {"lease_token": "other-worker"}})
+        return await changed(db_, job, employees, inputs)
+
+    runner._changed = taken_over
+    job = await runner.submit(db, "January", 2024)
+    await asyncio.gather(*list(runner._tasks.values()))
+
+    # Neither the checkpoint nor the completion was written over the new owner's claim
+    job = await db[JOBS_COLLECTION].find_one({"_id": job["_id"]})
+    assert job["status"] == "running" and job["active"] and job["lease_token"] == "other-worker"
+    assert job["processed"] == 0
+    assert runner._tokens == {}
+
+
+@pytest.mark.asyncio
+async def test_failed_chunk_does_not_advance_the_checkpoint(db):
+    employees = await _employees(db, 7)
+    rejected = str(employees[4]["_id"])
+    # The second chunk's bulk_write fails for one record; unordered, its other records still land
+    await db.create_collection("payroll", validator={"employee_id": {"$ne": rejected}})
+    runner = PayrollJobRunner(chunk_size=3)
+
+    failed = await _run(runner, db)
+    assert failed["status"] == "failed" and not failed["active"]
+    assert "batch op errors" in failed["error"]
+    # Checkpointed after the first chunk only: a rerun covers every id from the failed chunk on
+    assert failed["last_employee_id"] == employees[2]["_id"]
+    assert (failed["processed"], failed["written"]) == (3, 3)
+    assert sorted(await db["payroll"].distinct("employee_id")) == sorted(str(emp["_id"]) for emp in employees[:6] if str(emp["_id"]) != rejected)
+
+    await db.command("collMod", "payroll", validator={})
+    rerun = await _run(runner, db)
+    # Records the failed chunk did write match their fingerprints and are skipped
+    assert rerun["status"] == "completed"
+    assert (rerun["processed"], rerun["written"], rerun["skipped"]) == (7, 2, 5)
+    assert await db["payroll"].count_documents({}) == 7
@@ -0,0 +1,83 @@
+import re
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from app.services.payslips import FIELDS, payslip_address, payslip_fields, payslip_renderer, render_batch, render_payslip
+
+RECORD = {
+    "employee_id": "65a000000000000000000001",
+    "employee_name": "Ada Lovelace (Eng)",
+    "month": "January",
+    "year": 2024,
+    "basic_salary": 50000,
+    "total_allowances": 25000.5,
+    "total_deductions": 12000,
+    "net_salary": 63000.5,
+    "days_present": 20.5,
+    "leave_days": 1,
+    "lop_days": 1.5,
+    "lop_deduction": 4891.3,
+    "generated_at": datetime(2024, 2, 1, 9, 30),
+}
+
+
+def _check_pdf(pdf: bytes):
+    """The xref table and startxref must point at the objects they name."""
+    assert pdf.startswith(b"%PDF-1.4\n") and pdf.endswith(b"%%EOF\n")
+    startxref = int(re.search(rb"startxref\n(\d+)\n", pdf).group(1))
+    assert pdf[startxref:].startswith(b"xref\n0 7\n")
+    offsets = [int(offset) for offset in re.findall(rb"(\d{10}) 00000 n ", pdf[startxref:])]
+    assert len(offsets) == 6
+    for number, offset in enumerate(offsets, start=1):
+        assert pdf[offset:].startswith(b"%d 0 obj\n" % number)
+    length = int(re.search(rb"<< /Length (\d+) >>\nstream\n", pdf).group(1))
+    stream = pdf.index(b"stream\n") + len(b"stream\n")
+    assert pdf[stream + length:].startswith(b"\nendstream")
+
+
+def test_payslip_is_a_valid_pdf():
+    fields = payslip_fields(RECORD, {"department": "Engineering"}, "YS HR")
+    assert set(fields) == set(FIELDS)
+    pdf = render_payslip(fields)
+    _check_pdf(pdf)
+    # Delimiters in values are escaped, not allowed to end the string early
+    assert b"Ada Lovelace \\(Eng\\)" in pdf
+    assert b"63,000.50" in pdf
+
+
+def test_payslip_address_is_content_based():
+    fields = payslip_fields(RECORD, {"department": "Engineering"}, "YS HR")
+    assert payslip_address(fields) == payslip_address(payslip_fields(dict(RECORD), {"department": "Engineering"}, "YS HR"))
+    assert payslip_address(fields) != payslip_address(payslip_fields({**RECORD, "net_salary": 63000.51}, {"department": "Engineering"}, "YS HR"))
+    assert payslip_address(fields) != payslip_address(payslip_fields(RECORD, {"department": "Sales"}, "YS HR"))
+
+
+def test_render_batch_skips_payslips_on_disk(tmp_path):
+    fields = payslip_fields(RECORD)
+    address = payslip_address(fields)
+    assert render_batch(str(tmp_path), [(address, fields)]) == 1
+    assert render_batch(str(tmp_path), [(address, fields)]) == 0
+    _check_pdf((tmp_path / f"{address}.pdf").read_bytes())
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+@pytest.mark.asyncio
+async def test_payslip_route_renders_on_demand(db, client, n_plus_one_guard, monkeypatch, tmp_path):
+    monkeypatch.setattr(payslip_renderer, "directory", str(tmp_path))
+    employee_id = ObjectId()
+    await db["employees"].insert_one({"_id": employee_id, "first_name": "Ada", "last_name": "Lovelace", "department": "Engineering"})
+    result = await db["payroll"].insert_one({**RECORD, "employee_id": str(employee_id)})
+    try:
+        first = await client.get(f"/payroll/{result.inserted_id}/payslip")
+        again = await client.get(f"/payroll/{result.inserted_id}/payslip")
+        missing = await client.get(f"/payroll/{ObjectId()}/payslip")
+    finally:
+        await payslip_renderer.shutdown()
+
+    assert first.status_code == 200 and first.headers["content-type"] == "application/pdf"
+    _check_pdf(first.content)
+    assert again.content == first.content
+    assert len(list(tmp_path.glob("*.pdf"))) == 1
+    assert missing.status_code == 404
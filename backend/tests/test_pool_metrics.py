@@ -0,0 +1,75 @@
+import pytest
+
+from app import database
+from app.database import MongoConnectionManager, PoolMetricsListener
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(database.time, "perf_counter", clock)
+    return clock
+
+
+def _checkout(listener: PoolMetricsListener, clock: Clock, seconds: float, failed: bool = False):
+    listener.connection_check_out_started(None)
+    clock.now += seconds
+    if failed:
+        listener.connection_check_out_failed(None)
+    else:
+        listener.connection_checked_out(None)
+
+
+def test_checkout_latency_histogram_is_cumulative(clock):
+    listener = PoolMetricsListener()
+    for seconds in (0.0005, 0.003, 0.2, 7.0):
+        _checkout(listener, clock, seconds)
+    _checkout(listener, clock, 1.0, failed=True)
+
+    snapshot = listener.snapshot()
+    # Each bucket counts the checkouts at or under its bound; 7s is only in the total
+    assert snapshot["checkout_latency_buckets"] == {0.001: 1, 0.005: 2, 0.01: 2, 0.05: 2, 0.1: 2, 0.5: 3, 1.0: 3, 5.0: 3}
+    assert snapshot["checkouts_total"] == 4 and snapshot["checkout_failures_total"] == 1
+    assert snapshot["checkout_latency_seconds_sum"] == pytest.approx(7.2035)
+    assert snapshot["checkout_latency_avg_ms"] == pytest.approx(1800.875)
+    assert snapshot["wait_queue_length"] == 0
+
+
+def test_checked_out_and_open_connections(clock):
+    listener = PoolMetricsListener()
+    listener.connection_created(None)
+    listener.connection_created(None)
+    _checkout(listener, clock, 0.001)
+    listener.connection_check_out_started(None)
+    assert (listener.snapshot()["checked_out"], listener.snapshot()["wait_queue_length"]) == (1, 1)
+
+    listener.connection_checked_in(None)
+    listener.connection_checked_in(None)
+    listener.connection_closed(None)
+    snapshot = listener.snapshot()
+    assert (snapshot["checked_out"], snapshot["open_connections"]) == (0, 1)
+
+
+@pytest.mark.asyncio
+async def test_pool_endpoint_renders_the_buckets(clock, monkeypatch):
+    httpx = pytest.importorskip("httpx")
+    from app.main import app
+
+    manager = MongoConnectionManager(url="mongodb://localhost:27017")
+    _checkout(manager.pool_listener, clock, 0.02)
+    monkeypatch.setattr("app.routes.metrics.db_manager", manager)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        pool = (await client.get("/metrics/pool")).json()
+
+    assert pool["max_pool_size"] == manager.max_pool_size
+    assert pool["checkouts_total"] == 1
+    assert pool["checkout_latency_buckets"] == {"0.001": 0, "0.005": 0, "0.01": 0, "0.05": 1, "0.1": 1, "0.5": 1, "1.0": 1, "5.0": 1}
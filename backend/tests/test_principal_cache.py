@@ -0,0 +1,106 @@
+import pytest
+from bson import ObjectId
+
+from app.services import principal_cache as principal_cache_module
+from app.services.principal_cache import PrincipalCache, principal_cache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(principal_cache_module.time, "monotonic", clock)
+    return clock
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = PrincipalCache(ttl_seconds=60)
+    cache.set("ada@example.com", {"email": "ada@example.com"})
+
+    clock.now += 59
+    assert cache.get("ada@example.com") == {"email": "ada@example.com"}
+    clock.now += 2
+    assert cache.get("ada@example.com") is None
+    assert cache.stats()["size"] == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = PrincipalCache(max_size=2)
+    cache.set("a", {"email": "a"})
+    cache.set("b", {"email": "b"})
+    # Reading "a" makes "b" the least recently used
+    cache.get("a")
+    cache.set("c", {"email": "c"})
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.evictions == 1
+
+
+def test_size_zero_disables_the_cache(clock):
+    cache = PrincipalCache(max_size=0)
+    cache.set("a", {"email": "a"})
+    assert cache.get("a") is None
+
+
+def test_cached_principals_are_isolated_copies(clock):
+    cache = PrincipalCache()
+    user = {"email": "a", "roles": ["Employee"]}
+    cache.set("a", user)
+    # Neither the caller's document nor a handed-out copy reaches the cache
+    user["roles"].append("Admin")
+    cache.get("a")["roles"].append("Admin")
+    assert cache.get("a")["roles"] == ["Employee"]
+
+
+def test_invalidate_by_subject_and_by_id(clock):
+    cache = PrincipalCache()
+    user_id = ObjectId()
+    cache.set("a", {"_id": user_id, "email": "a"})
+    cache.set("b", {"_id": ObjectId(), "email": "b"})
+
+    cache.invalidate_id(str(user_id))
+    cache.invalidate("b")
+    cache.invalidate(None)
+    assert cache.get("a") is None and cache.get("b") is None
+
+
+async def _employee_with_login(db, email: str):
+    employee = {
+        "_id": ObjectId(), "first_name": "Ada", "last_name": "Lovelace", "email": email, "role": "Engineer",
+        "department": "Engineering", "status": "Active", "date_of_joining": "2020-01-01", "salary": 600000,
+    }
+    await db["employees"].insert_one(employee)
+    await db["users"].insert_one({"email": email, "full_name": "Ada Lovelace", "department": "Engineering"})
+    principal_cache.set(email, {"email": email, "department": "Engineering"})
+    return employee
+
+
+@pytest.mark.asyncio
+async def test_employee_update_drops_the_cached_principal(db, client):
+    employee = await _employee_with_login(db, "ada@example.com")
+
+    response = await client.put(f"/employees/{employee['_id']}", json={"department": "Research", "email": "ada@research.example.com"})
+
+    assert response.status_code == 200
+    assert principal_cache.get("ada@example.com") is None
+    assert principal_cache.get("ada@research.example.com") is None
+    assert (await db["users"].find_one({"email": "ada@research.example.com"}))["department"] == "Research"
+
+
+@pytest.mark.asyncio
+async def test_employee_delete_drops_the_cached_principal(db, client):
+    employee = await _employee_with_login(db, "grace@example.com")
+
+    response = await client.delete(f"/employees/{employee['_id']}")
+
+    assert response.status_code == 200
+    assert principal_cache.get("grace@example.com") is None
@@ -0,0 +1,65 @@
+from datetime import datetime, timezone
+
+import orjson
+import pytest
+from bson import ObjectId
+from pydantic import ValidationError
+
+from app.models.attendance import AttendanceRecord
+from app.models.employee import Employee
+from app.models.payroll import PayrollRecord
+from app.services.serialization import MongoJSONResponse, dump_json, fill_defaults, model_projection
+
+OID = ObjectId("65a0000000000000000000ab")
+
+
+def test_mongo_types_are_rendered():
+    document = {"_id": OID, "at": datetime(2024, 1, 2, 9, 30), "aware": datetime(2024, 1, 2, 9, 30, tzinfo=timezone.utc)}
+    assert orjson.loads(dump_json(document)) == {"_id": "65a0000000000000000000ab", "at": "2024-01-02T09:30:00Z", "aware": "2024-01-02T09:30:00Z"}
+    with pytest.raises(TypeError):
+        dump_json({"value": {1, 2}})
+
+
+def test_legacy_values_go_out_as_stored():
+    # A pre-migration record: check_in as "HH:MM" and work_hours as a numeric string
+    legacy = {"_id": OID, "employee_id": "e1", "employee_name": "Ada", "date": "2024-01-02", "check_in": "09:30", "work_hours": "7.5"}
+    with pytest.raises(ValidationError):
+        AttendanceRecord.model_validate(legacy)
+
+    [body] = orjson.loads(MongoJSONResponse([dict(legacy)], model=AttendanceRecord).body)
+
+    # No coercion and no validation error: the stored values reach the client unchanged
+    assert (body["check_in"], body["work_hours"]) == ("09:30", "7.5")
+    assert body["_id"] == "65a0000000000000000000ab"
+    # Missing fields still get the model's defaults
+    assert (body["status"], body["location"], body["department"], body["check_out"], body["break_time"]) == ("Absent", "Office", "N/A", None, 0)
+
+
+def test_fill_defaults():
+    documents = [
+        {"employee_id": "e1", "salary_structure": {"basic_salary": 100.0}, "status": "Terminated"},
+        "not a document",
+    ]
+    fill_defaults(documents, Employee)
+
+    employee = documents[0]
+    # Defaults fill gaps without overwriting stored values, nested models included
+    assert employee["status"] == "Terminated"
+    assert employee["salary_structure"] == {"basic_salary": 100.0, "hra": 0.0, "special_allowance": 0.0, "medical_allowance": 0.0, "pf_deduction": 0.0, "professional_tax": 0.0, "tds": 0.0}
+    assert employee["phone"] is None and employee["_id"] == ""
+    # Required fields are left missing rather than invented
+    assert "first_name" not in employee and "salary" not in employee
+    assert documents[1] == "not a document"
+
+
+def test_fill_defaults_calls_default_factories():
+    record = fill_defaults({"employee_id": "e1"}, PayrollRecord)
+    assert isinstance(record["generated_at"], datetime)
+    assert (record["status"], record["lop_deduction"], record["lop_days"]) == ("Processed", 0.0, None)
+
+
+def test_model_projection_uses_aliases():
+    assert model_projection(AttendanceRecord) == {
+        "_id": 1, "employee_id": 1, "employee_name": 1, "department": 1, "date": 1, "check_in": 1,
+        "check_out": 1, "status": 1, "work_hours": 1, "break_time": 1, "location": 1,
+    }
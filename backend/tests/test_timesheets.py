@@ -0,0 +1,88 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from app.services.timesheets import TIMESHEET_COLLECTION, TIMESHEET_STATE_COLLECTION, TimesheetEngine, mark_months_stale, month_range, timesheet_engine
+
+
+def test_month_range_is_half_open():
+    assert month_range("2024-02") == {"$gte": "2024-02-01", "$lt": "2024-03-01"}
+    assert month_range("2023-12") == {"$gte": "2023-12-01", "$lt": "2024-01-01"}
+    bounds = month_range("2024-01")
+    # Everything on the last day matches, whatever follows the date
+    assert bounds["$gte"] <= "2024-01-31T18:00:00" < bounds["$lt"]
+    assert not bounds["$gte"] <= "2024-02-01" < bounds["$lt"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_refreshes_share_one_run():
+    engine = TimesheetEngine(utc_offset_minutes=0)
+    release, runs = asyncio.Event(), []
+
+    async def run(db, month, department=None):
+        runs.append(month)
+        await release.wait()
+        return 3
+
+    engine.run = run
+    tasks = [engine.refresh(None, "2024-01") for _ in range(5)] + [engine.refresh(None, "2024-02")]
+    assert len({id(task) for task in tasks}) == 2
+    release.set()
+    assert await asyncio.gather(*tasks) == [3] * 6
+    assert sorted(runs) == ["2024-01", "2024-02"]
+
+    # Once finished, the next stale read starts a fresh recompute
+    await asyncio.sleep(0)
+    assert engine._refreshes == {}
+    assert await engine.refresh(None, "2024-01") == 3
+
+
+@pytest.mark.asyncio
+async def test_failed_refresh_is_logged_and_forgotten(capsys):
+    engine = TimesheetEngine(utc_offset_minutes=0)
+
+    async def run(db, month, department=None):
+        raise RuntimeError("boom")
+
+    engine.run = run
+    task = engine.refresh(None, "2024-01")
+    await asyncio.gather(task, return_exceptions=True)
+    await asyncio.sleep(0)
+    assert engine._refreshes == {}
+    assert "Timesheet recompute for 2024-01 failed: boom" in capsys.readouterr().out
+
+
+async def _attendance(db, count: int, month: str = "2024-01"):
+    await db["attendance"].insert_many([
+        {
+            "employee_id": str(ObjectId()), "employee_name": f"Employee {n}", "department": "Engineering",
+            "date": f"{month}-02", "status": "Present", "work_hours": 8.0,
+            "check_in": datetime(2024, 1, 2, 9), "check_out": datetime(2024, 1, 2, 17),
+        }
+        for n in range(count)
+    ])
+
+
+@pytest.mark.asyncio
+async def test_stale_month_is_served_while_it_recomputes(db, client):
+    await _attendance(db, 2)
+
+    # Nothing stored yet: the first read waits for the compute
+    first = await client.get("/attendance/timesheet", params={"month": "2024-01"})
+    assert first.status_code == 200 and "X-Timesheets-Stale" not in first.headers
+    assert len(first.json()) == 2
+
+    await _attendance(db, 1)
+    await mark_months_stale(db, ["2024-01"])
+    stale = await client.get("/attendance/timesheet", params={"month": "2024-01"})
+    assert stale.headers["X-Timesheets-Stale"] == "true"
+    assert len(stale.json()) == 2
+
+    await asyncio.gather(*list(timesheet_engine._refreshes.values()))
+    fresh = await client.get("/attendance/timesheet", params={"month": "2024-01"})
+    assert "X-Timesheets-Stale" not in fresh.headers
+    assert len(fresh.json()) == 3
+    assert await db[TIMESHEET_COLLECTION].count_documents({}) == 3
+    assert not (await db[TIMESHEET_STATE_COLLECTION].find_one({"_id": "2024-01"}))["stale"]
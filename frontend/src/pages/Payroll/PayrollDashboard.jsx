@@ -7,6 +7,7 @@ export default function PayrollDashboard() {
     const [payrollHistory, setPayrollHistory] = useState([]);
     const [loading, setLoading] = useState(true);
     const [runningPayroll, setRunningPayroll] = useState(false);
+    const [jobProgress, setJobProgress] = useState(null);
 
     const fetchPayroll = async () => {
         try {
@@ -22,10 +23,27 @@ export default function PayrollDashboard() {
         }
     };
 
+    // Generation runs as a background job: poll it until it finishes
+    const waitForJob = async (jobId) => {
+        while (true) {
+            const response = await fetch(`http://localhost:8000/payroll/jobs/${jobId}`);
+            if (!response.ok) {
+                throw new Error(`Payroll job ${jobId} could not be read`);
+            }
+            const job = await response.json();
+            setJobProgress({ processed: job.processed, total: job.total });
+            if (job.status === 'completed' || job.status === 'failed') {
+                return job;
+            }
+            await new Promise((resolve) => setTimeout(resolve, 1000));
+        }
+    };
+
     const handleRunPayroll = async () => {
         setRunningPayroll(true);
         const today = new Date();
-        const month = today.toLocaleString('default', { month: 'long' });
+        // The API expects the English month name
+        const month = today.toLocaleString('en-US', { month: 'long' });
         const year = today.getFullYear();
 
         try {
@@ -36,15 +54,23 @@ export default function PayrollDashboard() {
             });
 
             if (response.ok) {
+                const { job_id } = await response.json();
+                const job = await waitForJob(job_id);
                 await fetchPayroll();
-                alert(`Payroll processed successfully for ${month} ${year}`);
+                if (job.status === 'completed') {
+                    alert(`Payroll processed successfully for ${month} ${year} (${job.written} updated, ${job.skipped} unchanged)`);
+                } else {
+                    alert(`Payroll run failed: ${job.error || 'unknown error'}`);
+                }
             } else {
                 alert("Failed to run payroll");
             }
         } catch (error) {
             console.error("Error running payroll", error);
+            alert("Failed to run payroll");
         } finally {
             setRunningPayroll(false);
+            setJobProgress(null);
         }
     };
 
@@ -72,7 +98,9 @@ export default function PayrollDashboard() {
                         disabled={runningPayroll}
                     >
                         <Play size={18} />
-                        {runningPayroll ? 'Processing...' : 'Run This Month Payroll'}
+                        {runningPayroll
+                            ? (jobProgress ? `Processing ${jobProgress.processed}/${jobProgress.total}...` : 'Processing...')
+                            : 'Run This Month Payroll'}
                     </button>
                 )}
             </div>